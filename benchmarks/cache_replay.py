@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Rejoue une trace d'accès sur chaque politique de cache (LRU, W-TinyLFU)
+et compare les taux de hit.
+
+Usage :
+    python benchmarks/cache_replay.py                     # trace synthétique
+    python benchmarks/cache_replay.py access.log          # un chemin par ligne
+    python benchmarks/cache_replay.py trace.jsonl --cache-mb 8
+
+Formats de trace acceptés (une requête par ligne) :
+    - texte : le chemin demandé (ex: /static/css/style.css)
+    - JSON  : un objet avec "path" et éventuellement "size" en octets
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from handlers.cache import CACHE_POLICIES, create_cache
+
+
+def load_trace(path: str, document_root: str):
+    """
+    Charge une trace d'accès.
+
+    Args:
+        path: Fichier de trace
+        document_root: Racine pour retrouver la taille réelle des fichiers
+
+    Returns:
+        list: [(chemin, taille), ...]
+    """
+    trace = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            size = None
+            if line.startswith('{'):
+                record = json.loads(line)
+                key = record.get('path') or record.get('request_id') or line
+                size = record.get('size')
+            else:
+                key = line.split()[0]
+            if size is None:
+                local = os.path.join(document_root, key.lstrip('/'))
+                size = os.path.getsize(local) if os.path.isfile(local) else 16 * 1024
+            trace.append((key, int(size)))
+    return trace
+
+
+def synthetic_trace(length: int = 200_000, hot_files: int = 500,
+                    scan_files: int = 20_000, seed: int = 42):
+    """
+    Génère une trace réaliste : accès Zipf sur des assets populaires,
+    interrompus par un crawler qui parcourt une fois chaque fichier du listing.
+
+    Returns:
+        list: [(chemin, taille), ...]
+    """
+    rng = random.Random(seed)
+    sizes = {f'/static/asset{i}': rng.choice([2, 8, 32, 128]) * 1024 for i in range(hot_files)}
+    weights = [1 / (rank + 1) for rank in range(hot_files)]
+    hot = list(sizes)
+
+    trace = []
+    scan_every = length // 4
+    scan_position = 0
+    for i in range(length):
+        if i % scan_every < scan_every // 3:
+            # Phase de crawl : fichiers vus une seule fois
+            trace.append((f'/archive/file{scan_position}', 16 * 1024))
+            scan_position = (scan_position + 1) % scan_files
+        else:
+            key = rng.choices(hot, weights)[0]
+            trace.append((key, sizes[key]))
+    return trace
+
+
+def replay(policy: str, trace, max_bytes: int, max_entry_bytes: int):
+    """
+    Rejoue la trace comme handle_static_file : get(), puis put() sur un miss.
+
+    Returns:
+        dict: Statistiques du cache + taux de hit (requêtes et octets) + durée
+    """
+    cache = create_cache(policy, max_bytes, max_entry_bytes)
+    hit_bytes = total_bytes = 0
+
+    start = time.perf_counter()
+    for key, size in trace:
+        total_bytes += size
+        if cache.get(key) is not None:
+            hit_bytes += size
+        else:
+            cache.put(key, key, size=size)
+    elapsed = time.perf_counter() - start
+
+    stats = cache.get_stats()
+    requests = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = stats['hits'] / requests if requests else 0
+    stats['byte_hit_ratio'] = hit_bytes / total_bytes if total_bytes else 0
+    stats['ops_per_sec'] = len(trace) / elapsed if elapsed else 0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare les politiques de cache sur une trace d'accès")
+    parser.add_argument('trace', nargs='?', help="Fichier de trace (synthétique si absent)")
+    parser.add_argument('--cache-mb', type=float, default=4, help="Taille du cache en Mo (défaut: 4)")
+    parser.add_argument('--entry-mb', type=float, default=2, help="Taille max d'une entrée en Mo (défaut: 2)")
+    parser.add_argument('--document-root', default='www', help="Racine pour les tailles réelles")
+    args = parser.parse_args()
+
+    if args.trace:
+        trace = load_trace(args.trace, args.document_root)
+        source = args.trace
+    else:
+        trace = synthetic_trace()
+        source = 'synthétique (Zipf + crawl)'
+
+    max_bytes = int(args.cache_mb * 1024 * 1024)
+    max_entry_bytes = int(args.entry_mb * 1024 * 1024)
+
+    print(f"Trace : {source}, {len(trace)} accès, {len({k for k, _ in trace})} clés distinctes")
+    print(f"Cache : {args.cache_mb} Mo\n")
+    print(f"{'Politique':<10} {'Hit ratio':>10} {'Byte hit':>10} {'Évictions':>10} {'Ops/s':>10}")
+    for policy in CACHE_POLICIES:
+        stats = replay(policy, trace, max_bytes, max_entry_bytes)
+        print(f"{policy:<10} {stats['hit_ratio']:>9.1%} {stats['byte_hit_ratio']:>9.1%} "
+              f"{stats['evictions']:>10} {stats['ops_per_sec']:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
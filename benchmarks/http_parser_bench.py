@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Compare le parser HTTP (utils/http_parser.py) à l'ancienne version qui
+décodait toute la tête en str puis la découpait ligne par ligne.
+
+Usage :
+    python benchmarks/http_parser_bench.py
+    python benchmarks/http_parser_bench.py --iterations 200000
+
+Mesures par requête :
+    - temps de parsing
+    - mémoire allouée au pic pendant le parsing (tracemalloc)
+    - blocs mémoire conservés par le résultat
+"""
+
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.http_parser import parse_http_request
+
+
+# Requêtes typiques : navigateur (beaucoup de headers), curl, asset en keep-alive
+REQUESTS = {
+    'navigateur': (
+        b'GET /api/test_prog_sys/index.php?page=2&sort=name HTTP/1.1\r\n'
+        b'Host: localhost:4610\r\n'
+        b'Connection: keep-alive\r\n'
+        b'sec-ch-ua: "Chromium";v="124", "Not-A.Brand";v="99"\r\n'
+        b'sec-ch-ua-mobile: ?0\r\n'
+        b'sec-ch-ua-platform: "Linux"\r\n'
+        b'Upgrade-Insecure-Requests: 1\r\n'
+        b'User-Agent: Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+        b'(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36\r\n'
+        b'Accept: text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,'
+        b'image/webp,*/*;q=0.8\r\n'
+        b'Sec-Fetch-Site: same-origin\r\n'
+        b'Sec-Fetch-Mode: navigate\r\n'
+        b'Sec-Fetch-User: ?1\r\n'
+        b'Sec-Fetch-Dest: document\r\n'
+        b'Referer: http://localhost:4610/\r\n'
+        b'Accept-Encoding: gzip, deflate, br, zstd\r\n'
+        b'Accept-Language: fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7\r\n'
+        b'Cookie: PHPSESSID=8f1c2a7e9b3d4f5a6c7e8d9f0a1b2c3d; theme=dark\r\n'
+        b'If-None-Match: "5d41402abc4b2a76b9719d911017c592"\r\n'
+        b'\r\n'
+    ),
+    'curl': (
+        b'GET /index.html HTTP/1.1\r\n'
+        b'Host: localhost:4610\r\n'
+        b'User-Agent: curl/8.5.0\r\n'
+        b'Accept: */*\r\n'
+        b'\r\n'
+    ),
+    'asset': (
+        b'GET /static/css/style.css HTTP/1.1\r\n'
+        b'Host: localhost:4610\r\n'
+        b'Connection: keep-alive\r\n'
+        b'User-Agent: Mozilla/5.0 (X11; Linux x86_64) Firefox/125.0\r\n'
+        b'Accept: text/css,*/*;q=0.1\r\n'
+        b'Accept-Encoding: gzip, deflate, br\r\n'
+        b'Referer: http://localhost:4610/\r\n'
+        b'If-Modified-Since: Tue, 14 May 2024 08:12:31 GMT\r\n'
+        b'\r\n'
+    ),
+}
+
+
+def legacy_parse_http_request(data: bytes):
+    """Ancien parser (référence) : décodage complet puis découpage en str."""
+    try:
+        text = data.decode('utf-8', errors='ignore')
+        header_part, _, body = text.partition('\r\n\r\n')
+        lines = header_part.split('\r\n')
+        if not lines:
+            raise ValueError("Requête vide")
+        request_line = lines[0]
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise ValueError(f"Ligne de requête invalide: {request_line}")
+        method, raw_path, version = parts
+        path = urllib.parse.unquote(raw_path)
+        headers = {}
+        for line in lines[1:]:
+            if ': ' in line:
+                key, value = line.split(': ', 1)
+                headers[key.lower()] = value
+        return method, path, version, headers, body
+    except Exception as e:
+        raise ValueError(f"Erreur de parsing HTTP: {e}")
+
+
+def measure_time(parser, data: bytes, iterations: int) -> float:
+    """Temps moyen d'un parsing, en microsecondes."""
+    timer = timeit.Timer(lambda: parser(data))
+    return min(timer.repeat(repeat=5, number=iterations)) / iterations * 1e6
+
+
+def measure_memory(parser, data: bytes, samples: int = 1000):
+    """
+    Mémoire allouée au pic pendant un parsing et blocs conservés par le résultat.
+
+    Returns:
+        tuple: (octets au pic, blocs conservés) par requête
+    """
+    parser(data)  # Remplir les caches (noms de headers) hors mesure
+    tracemalloc.start()
+    peak_total = 0
+    for _ in range(samples):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = parser(data)
+        peak_total += tracemalloc.get_traced_memory()[1] - baseline
+        del result
+
+    kept = []
+    before = tracemalloc.take_snapshot()
+    for _ in range(samples):
+        kept.append(parser(data))
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    # Le list.append de kept n'est pas imputable au parser
+    blocks -= 1
+    return peak_total / samples, blocks / samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=50_000,
+                        help="Parsings par mesure de temps")
+    args = parser.parse_args()
+
+    print(f"{'requête':<12} {'parser':<8} {'µs/req':>8} {'pic (o)':>9} {'blocs':>7}")
+    for label, data in REQUESTS.items():
+        for name, func in (('ancien', legacy_parse_http_request), ('nouveau', parse_http_request)):
+            micros = measure_time(func, data, args.iterations)
+            peak, blocks = measure_memory(func, data)
+            print(f"{label:<12} {name:<8} {micros:>8.2f} {peak:>9.0f} {blocks:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
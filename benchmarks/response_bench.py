@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Compare la construction des réponses (utils/response.py) à l'ancienne
+méthode : ligne de statut et headers concaténés à chaque requête, puis
+encodés et concaténés au corps.
+
+Usage :
+    python benchmarks/response_bench.py
+    python benchmarks/response_bench.py --iterations 500000 --body-kb 64
+
+Affiche le nombre de réponses construites par seconde pour chaque cas.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.response import build_response, error_response
+
+
+def legacy_build_http_response(status_code, body="", content_type="text/plain",
+                               extra_headers=None, keep_alive=False):
+    """Ancien build_http_response (référence) : le corps est encodé deux fois."""
+    reason = {200: "OK", 304: "Not Modified", 404: "Not Found"}.get(status_code, "OK")
+    headers = {
+        "Content-Type": content_type,
+        "Content-Length": str(len(body.encode('utf-8'))),
+        "Connection": "keep-alive" if keep_alive else "close",
+    }
+    if extra_headers:
+        headers.update(extra_headers)
+    response_lines = [f"HTTP/1.1 {status_code} {reason}"]
+    for key, value in headers.items():
+        response_lines.append(f"{key}: {value}")
+    response_lines.append("")
+    response_lines.append(body)
+    return '\r\n'.join(response_lines).encode('utf-8')
+
+
+def legacy_static_response(content, extra_headers, keep_alive):
+    """Ancienne réponse 200 d'un fichier statique (référence)."""
+    connection_header = "Connection: keep-alive\r\n" if keep_alive else "Connection: close\r\n"
+    status_line = "HTTP/1.1 200 OK\r\n"
+    headers_str = f"Content-Length: {len(content)}\r\n"
+    for key, value in extra_headers.items():
+        headers_str += f"{key}: {value}\r\n"
+    headers_str += connection_header + "\r\n"
+    return (status_line + headers_str).encode() + content
+
+
+def static_headers():
+    """Headers d'un fichier statique tels que retournés par handlers/static.py."""
+    return {
+        'Content-Type': 'text/css',
+        'Accept-Ranges': 'bytes',
+        'ETag': '"5d41402abc4b2a76b9719d911017c592"',
+        'Last-Modified': 'Tue, 14 May 2024 08:12:31 GMT',
+        'Cache-Control': 'public, max-age=3600',
+        'Vary': 'Accept-Encoding',
+    }
+
+
+def rate(func, iterations: int) -> float:
+    """Réponses construites par seconde (meilleure de 5 mesures)."""
+    best = min(timeit.Timer(func).repeat(repeat=5, number=iterations))
+    return iterations / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=100_000,
+                        help="Réponses construites par mesure")
+    parser.add_argument('--body-kb', type=int, default=16,
+                        help="Taille du corps des réponses statiques (Ko)")
+    args = parser.parse_args()
+
+    content = b'x' * (args.body_kb * 1024)
+    cases = {
+        f'statique 200 ({args.body_kb} Ko)': (
+            lambda: legacy_static_response(content, static_headers(), True),
+            lambda: build_response(200, content, headers=static_headers(), keep_alive=True),
+        ),
+        '304 Not Modified': (
+            lambda: legacy_build_http_response(304, "", extra_headers=static_headers(), keep_alive=True),
+            lambda: build_response(304, headers=static_headers(), keep_alive=True),
+        ),
+        '404 Not Found': (
+            lambda: legacy_build_http_response(404, "Not Found", keep_alive=True),
+            lambda: error_response(404, True),
+        ),
+    }
+
+    print(f"{'réponse':<24} {'ancien (rép/s)':>15} {'nouveau (rép/s)':>16} {'gain':>6}")
+    for label, (legacy, new) in cases.items():
+        before = rate(legacy, args.iterations)
+        after = rate(new, args.iterations)
+        print(f"{label:<24} {before:>15,.0f} {after:>16,.0f} {after / before:>5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Compare l'encodage JSON d'un résultat SQL large (utils/sql_encoding.py) à
+l'ancienne méthode : lignes en dictionnaires (DictCursor), conversion des
+dates par hasattr(value, 'isoformat') cellule par cellule, puis json.dumps.
+
+Usage :
+    python benchmarks/sql_encoding_bench.py
+    python benchmarks/sql_encoding_bench.py --rows 100000 --columns 24
+
+L'ancienne méthode plante sur les colonnes DECIMAL : elle est mesurée avec
+default=str, la correction minimale. Le moteur orjson n'est mesuré que
+s'il est installé.
+"""
+
+import argparse
+import datetime
+import decimal
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from handlers.database import rows_as_objects
+from utils.sql_encoding import column_converters, convert_rows, orjson
+
+# Types MySQL (FIELD_TYPE) des colonnes générées, répétés jusqu'à la largeur voulue
+COLUMN_TYPES = (
+    ('id', 3), ('user_id', 3), ('quantity', 2), ('price', 246), ('ratio', 5),
+    ('name', 253), ('email', 253), ('status', 254), ('created_at', 12),
+    ('birth_date', 10), ('comment', 252), ('score', 4),
+)
+
+
+def make_result(rows: int, columns: int):
+    """Génère (description, lignes) comme les retournerait un curseur aiomysql."""
+    description = []
+    for i in range(columns):
+        name, type_code = COLUMN_TYPES[i % len(COLUMN_TYPES)]
+        description.append((f"{name}_{i // len(COLUMN_TYPES)}", type_code))
+    base = datetime.datetime(2024, 1, 1, 8, 30)
+    samples = {
+        3: lambda n: n,
+        2: lambda n: n % 100,
+        246: lambda n: decimal.Decimal(n % 10000) / 100,
+        5: lambda n: n / 7,
+        253: lambda n: f"utilisateur-{n}@exemple.fr",
+        254: lambda n: ('actif', 'inactif', 'supprimé')[n % 3],
+        12: lambda n: base + datetime.timedelta(minutes=n),
+        10: lambda n: datetime.date(1970, 1, 1) + datetime.timedelta(days=n % 20000),
+        252: lambda n: None if n % 4 else f"commentaire {n}",
+        4: lambda n: (n % 1000) / 10,
+    }
+    makers = [samples[type_code] for _, type_code in description]
+    data = [tuple(make(n) for make in makers) for n in range(rows)]
+    return description, data
+
+
+def legacy(description, rows, dumps):
+    """Ancien chemin : dictionnaires, boucle isoformat, json.dumps."""
+    names = [column[0] for column in description]
+    dict_rows = [dict(zip(names, row)) for row in rows]  # Fait par DictCursor
+    for row in dict_rows:
+        for key, value in row.items():
+            if hasattr(value, 'isoformat'):
+                row[key] = str(value)
+    return dumps({'success': True, 'result': {'rows': dict_rows, 'rowcount': len(dict_rows)}})
+
+
+def typed(description, rows, dumps, columnar):
+    """Nouveau chemin : convertisseurs par colonne, forme objets ou colonnes."""
+    result = {
+        'columns': [column[0] for column in description],
+        'rows': convert_rows(rows, column_converters(description, rows)),
+        'rowcount': len(rows),
+    }
+    if not columnar:
+        result = rows_as_objects(result)
+    return dumps({'success': True, 'result': result})
+
+
+def best_time(func, repeat: int):
+    """Meilleur temps (secondes) et résultat de func()."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000, help="Lignes du résultat")
+    parser.add_argument('--columns', type=int, default=24, help="Colonnes du résultat")
+    parser.add_argument('--repeat', type=int, default=3, help="Mesures par cas")
+    args = parser.parse_args()
+
+    description, rows = make_result(args.rows, args.columns)
+
+    legacy_encoder = json.JSONEncoder(ensure_ascii=False, default=str)
+    stdlib_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str)
+    backends = {'json': lambda obj: stdlib_encoder.encode(obj).encode('utf-8')}
+    if orjson is not None:
+        backends['orjson'] = lambda obj: orjson.dumps(obj, default=str)
+
+    cases = {'ancien (dict + isoformat)': lambda: legacy(description, rows,
+                                                         lambda obj: legacy_encoder.encode(obj).encode('utf-8'))}
+    for name, dumps in backends.items():
+        cases[f'typé objets, {name}'] = lambda dumps=dumps: typed(description, rows, dumps, False)
+        cases[f'typé colonnes, {name}'] = lambda dumps=dumps: typed(description, rows, dumps, True)
+
+    print(f"{args.rows:,} lignes x {args.columns} colonnes")
+    print(f"{'cas':<28} {'temps (s)':>10} {'lignes/s':>12} {'taille (Mo)':>12} {'gain':>6}")
+    reference = None
+    for label, func in cases.items():
+        elapsed, output = best_time(func, args.repeat)
+        reference = reference or elapsed
+        print(f"{label:<28} {elapsed:>10.3f} {args.rows / elapsed:>12,.0f} "
+              f"{len(output) / 1024 / 1024:>12.1f} {reference / elapsed:>5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
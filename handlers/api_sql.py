@@ -1,40 +1,310 @@
 """
 API pour exécuter des requêtes SQL depuis HTTP
+
+Avec "stream" ("json" ou "ndjson") dans le body ou la query string, un
+SELECT est lu avec un curseur côté serveur et envoyé au fil de l'eau
+(Transfer-Encoding: chunked) : mémoire constante quelle que soit la taille
+du résultat, et le client reçoit les premières lignes immédiatement.
+
+"params" en liste de listes exécute la requête une fois par jeu de
+paramètres, et un body en liste de requêtes ([{"sql": ...}, ...]) les
+exécute sur une seule connexion, dans une transaction.
+
+Avec "format": "columnar", les SELECT sont renvoyés en colonnes
+({"columns": [...], "rows": [[...]]}) sans répéter les noms à chaque ligne.
 """
+import asyncio
 import json
+import urllib.parse
+from typing import AsyncIterator
 from handlers import database as db
+from utils.response import response_head
+from utils.sql_encoding import dumps
+
+# Formats de streaming -> Content-Type
+STREAM_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Formes des résultats de SELECT
+RESULT_FORMATS = ('objects', 'columnar')
+
+
+class SQLStreamResponse:
+    """Corps de réponse produit au fil de la lecture d'un SELECT."""
+
+    def __init__(self, sql: str, result: db.QueryStream, fmt: str, columnar: bool = False):
+        """
+        Args:
+            sql: Requête exécutée (reprise dans la réponse JSON)
+            result: Résultat ouvert par db.open_query_stream()
+            fmt: 'json' (même structure que la réponse normale) ou 'ndjson'
+                 (un objet JSON par ligne)
+            columnar: True pour des lignes en listes de valeurs (en NDJSON,
+                 la première ligne donne alors les colonnes)
+        """
+        self.sql = sql
+        self.result = result
+        self.format = fmt
+        self.columnar = columnar
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """
+        Encode les lignes lot par lot.
+
+        Yields:
+            bytes: Morceau du corps (un lot de lignes)
+        """
+        columns = self.result.columns
+        if self.format == 'ndjson':
+            if self.columnar:
+                yield dumps({'columns': columns}) + b'\n'
+            async for rows in self.result.batches():
+                if not self.columnar:
+                    rows = [dict(zip(columns, row)) for row in rows]
+                yield b''.join([dumps(row) + b'\n' for row in rows])
+            return
+
+        head = b'{"success":true,"sql":' + dumps(self.sql) + b',"result":{'
+        if self.columnar:
+            head += b'"columns":' + dumps(columns) + b','
+        yield head + b'"rows":['
+        separator = b''
+        async for rows in self.result.batches():
+            if not self.columnar:
+                rows = [dict(zip(columns, row)) for row in rows]
+            # Un seul appel d'encodage par lot : la liste sans ses crochets
+            yield separator + dumps(rows)[1:-1]
+            separator = b','
+        yield b'],"rowcount":%d}}' % self.result.rowcount
+
+    async def close(self) -> None:
+        """Rend la connexion MySQL au pool."""
+        await self.result.close()
+
+
+def request_option(data: dict, query_string: str, name: str):
+    """Option lue dans le body JSON, sinon dans la query string (None si absente)."""
+    value = data.get(name)
+    if value is None and query_string:
+        value = urllib.parse.parse_qs(query_string).get(name, [None])[0]
+    return value
+
+
+def stream_format(data: dict, query_string: str):
+    """
+    Retourne le format de streaming demandé, ou None.
+
+    Args:
+        data: Body JSON de la requête
+        query_string: Query string brute
+
+    Raises:
+        ValueError: Format inconnu
+    """
+    fmt = request_option(data, query_string, 'stream')
+    if fmt in (None, False, '', '0'):
+        return None
+    if fmt is True:
+        return 'json'
+    if fmt not in STREAM_FORMATS:
+        raise ValueError(f"stream doit valoir {' ou '.join(STREAM_FORMATS)}")
+    return fmt
+
+
+def is_columnar(data: dict, query_string: str) -> bool:
+    """
+    True si la forme colonnaire est demandée ("format": "columnar").
+
+    Raises:
+        ValueError: Forme inconnue
+    """
+    fmt = request_option(data, query_string, 'format') or 'objects'
+    if fmt not in RESULT_FORMATS:
+        raise ValueError(f"format doit valoir {' ou '.join(RESULT_FORMATS)}")
+    return fmt == 'columnar'
+
+
+def statement_params(sql: str, params) -> list:
+    """
+    Valide les paramètres d'une requête et ses placeholders.
+
+    Args:
+        sql: Requête SQL
+        params: Valeur de "params" dans le body (None si absent)
+
+    Returns:
+        list: Paramètres (liste vide si absents)
+
+    Raises:
+        ValueError: params n'est pas une liste, ou placeholders ? et %s mélangés
+    """
+    if params is None:
+        params = []
+    elif not isinstance(params, list):
+        raise ValueError('params doit être une liste')
+    # Erreur de syntaxe des placeholders signalée avant toute exécution
+    db.translate_placeholders(sql)
+    return params
+
+
+def is_params_list(params) -> bool:
+    """True si params est une liste de jeux de paramètres (exécution par lots)."""
+    return bool(params) and all(isinstance(p, list) for p in params)
+
+
+def batch_statements(data: list) -> list:
+    """
+    Valide un lot de requêtes [{"sql": ..., "params": [...]}, ...].
+
+    Args:
+        data: Body JSON de la requête
+
+    Returns:
+        list: Liste de (sql, params)
+
+    Raises:
+        ValueError: Lot vide, requête sans SQL ou paramètres invalides
+    """
+    if not data:
+        raise ValueError('Lot vide')
+    statements = []
+    for index, statement in enumerate(data):
+        sql = statement.get('sql', '').strip() if isinstance(statement, dict) else ''
+        if not sql:
+            raise ValueError(f'SQL requis (requête {index})')
+        try:
+            params = statement_params(sql, statement.get('params'))
+        except ValueError as e:
+            raise ValueError(f'{e} (requête {index})') from None
+        statements.append((sql, tuple(params)))
+    return statements
+
+
+async def send_sql_stream(writer: asyncio.StreamWriter, body: SQLStreamResponse,
+                          keep_alive: bool, chunked: bool, head_only: bool = False) -> bool:
+    """
+    Envoie un résultat SQL au fil de sa lecture.
+
+    Chaque lot est envoyé (drain) avant de lire le suivant : un client lent
+    ralentit la lecture côté MySQL au lieu de faire grossir les buffers.
+
+    Args:
+        writer: Flux d'écriture vers le client
+        body: Résultat retourné par handle_api_sql()
+        keep_alive: True pour garder la connexion ouverte après la réponse
+        chunked: False en HTTP/1.0 (corps délimité par la fermeture)
+        head_only: True pour une requête HEAD (headers seuls, rien n'est lu)
+
+    Returns:
+        bool: False si la réponse a été tronquée (la connexion doit être fermée)
+    """
+    try:
+        writer.write(response_head(
+            200, STREAM_FORMATS[body.format],
+            {'Transfer-Encoding': 'chunked'} if chunked else None,
+            keep_alive=keep_alive
+        ))
+        if head_only:
+            await writer.drain()
+            return True
+        try:
+            async for data in body.chunks():
+                if chunked:
+                    writer.writelines((b"%x\r\n" % len(data), data, b"\r\n"))
+                else:
+                    writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            raise
+        except Exception as e:
+            # Headers déjà envoyés : réponse tronquée
+            print(f"Erreur API SQL (streaming): {e}")
+            return False
+        if chunked:
+            writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        return True
+    finally:
+        await body.close()
 
 
 async def handle_api_sql(method: str, path: str, body: bytes, query_string: str) -> tuple:
     """
     API pour exécuter des requêtes SQL
     POST /api/sql
-    Body: {"sql": "SELECT * FROM users", "params": []}
+    Body: {"sql": "SELECT * FROM users", "params": [], "stream": "ndjson", "format": "columnar"}
+          {"sql": "INSERT INTO t (a, b) VALUES (?, ?)", "params": [[1, 2], [3, 4]]}
+          [{"sql": "UPDATE ...", "params": [...]}, {"sql": "INSERT ..."}]
+
+    En streaming, le corps retourné est un SQLStreamResponse à envoyer avec
+    send_sql_stream().
     """
-    
+
     if method != 'POST':
         return (405, json.dumps({'error': 'Seul POST est autorisé'}).encode(), 'application/json')
-    
+
     try:
         data = json.loads(body.decode())
+
+        if isinstance(data, list):
+            # Lot transactionnel : une connexion, tout ou rien
+            try:
+                statements = batch_statements(data)
+                columnar = is_columnar({}, query_string)
+            except ValueError as e:
+                return (400, json.dumps({'error': str(e)}).encode(), 'application/json')
+            results = await db.execute_batch(statements, columnar)
+            response = {'success': True, 'results': results}
+            return (200, dumps(response), 'application/json')
+
         sql = data.get('sql', '').strip()
-        params = tuple(data.get('params', []))
-        
+
         if not sql:
             return (400, json.dumps({'error': 'SQL requis'}).encode(), 'application/json')
-        
-        # Exécuter la requête
-        result = await db.execute_query(sql, params)
-        
+
+        try:
+            params = statement_params(sql, data.get('params'))
+            fmt = stream_format(data, query_string)
+            columnar = is_columnar(data, query_string)
+        except ValueError as e:
+            return (400, json.dumps({'error': str(e)}).encode(), 'application/json')
+
+        if is_params_list(params):
+            if fmt:
+                return (400, json.dumps({'error': 'stream incompatible avec une exécution par lots'}).encode(),
+                        'application/json')
+            # Une requête, plusieurs jeux de paramètres (INSERT multi-lignes)
+            result = await db.execute_many(sql, [tuple(p) for p in params])
+        elif fmt:
+            # Erreurs SQL levées ici, avant l'envoi des headers
+            stream = await db.open_query_stream(sql, tuple(params))
+            if stream.columns:
+                return (200, SQLStreamResponse(sql, stream, fmt, columnar), STREAM_FORMATS[fmt])
+            # Pas de lignes à streamer (INSERT, UPDATE...) : réponse normale
+            await stream.close()
+            result = {'rows': [], 'rowcount': stream.rowcount, 'lastrowid': stream.lastrowid}
+        else:
+            # Exécuter la requête
+            result = await db.execute_query(sql, tuple(params), columnar)
+
         response = {
             'success': True,
             'sql': sql,
             'result': result
         }
-        
-        return (200, json.dumps(response, ensure_ascii=False).encode(), 'application/json')
-    
+
+        return (200, dumps(response), 'application/json')
+
     except json.JSONDecodeError as e:
         return (400, json.dumps({'error': 'JSON invalide'}).encode(), 'application/json')
+    except db.BatchStatementError as e:
+        # Transaction annulée : indiquer la requête fautive
+        return (500, json.dumps({'error': str(e.error), 'index': e.index, 'success': False},
+                                ensure_ascii=False).encode(), 'application/json')
+    except db.DatabaseUnavailableError as e:
+        # Base arrêtée ou pool saturé : le client peut réessayer
+        return (503, json.dumps({'error': str(e), 'success': False}).encode(), 'application/json')
     except Exception as e:
         return (500, json.dumps({'error': str(e), 'success': False}).encode(), 'application/json')
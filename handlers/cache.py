@@ -1,74 +1,89 @@
 """
 Système de cache LRU
 """
-# Implémenter le cache LRU
-from collections import OrderedDict
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
 import time
-import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 
-logger = logging.getLogger("cache")
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
 
+from handlers.file_watcher import stat_cache
+from utils.io_pool import run_io
 
-class LRUCache:
-    def __init__(self, capacity=100):
-        self.capacity = capacity
-        self.cache = OrderedDict()
-        self.hits = 0
-        self.miss = 0
-
-    def get(self, key):
-        if key not in self.cache:
-            self.miss += 1
-            return None
+# Surcoût mémoire approximatif d'une entrée (OrderedDict, tuple, objets Python)
+ENTRY_OVERHEAD = 200
 
-        # Marquer comme récemment utilisé
-        self.cache.move_to_end(key)
-        self.hits += 1
-        return self.cache[key]
-
-    def put(self, key, value):
-        if key in self.cache:
-            self.cache.move_to_end(key)
 
-        self.cache[key] = value
+def estimate_size(value: Any) -> int:
+    """
+    Estime la mémoire occupée par une valeur du cache : contenu, variantes
+    compressées et métadonnées (type MIME, ETag...).
 
-        if len(self.cache) > self.capacity:
-            evicted_key, _ = self.cache.popitem(last=False)
-            logger.info(f"Cache éviction : {evicted_key}")
+    Args:
+        value: Valeur à mesurer (bytes, str, tuple, dict...)
 
-    def clear(self):
-        self.cache.clear()
-        logger.warning("Cache vidé manuellement")
+    Returns:
+        int: Taille estimée en octets
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(item) for item in value)
+    return 8
 
-    def stats(self):
-        """Retourne les statistiques du cache (taille, hits, miss)."""
-        return {
-            "size": len(self.cache),
-            "hits": self.hits,
-            "miss": self.miss
-        }
-import hashlib
-import os
-import time
-from collections import OrderedDict
-from typing import Any, Optional, Tuple
 
 class LRUCache:
     """
-    Cache LRU (Least Recently Used) thread-safe pour les fichiers statiques.
+    Cache LRU (Least Recently Used) borné en octets pour les fichiers statiques.
     """
 
-    def __init__(self, capacity: int = 100):
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024,
+                 max_entry_bytes: int = 2 * 1024 * 1024,
+                 capacity: Optional[int] = None):
         """
         Initialise le cache.
 
         Args:
-            capacity: Nombre maximum d'éléments dans le cache
+            max_bytes: Mémoire totale maximale occupée par les entrées
+            max_entry_bytes: Taille maximale d'une entrée (au-delà, refusée)
+            capacity: Nombre maximum d'éléments (None = pas de limite)
         """
         self.cache = OrderedDict()
+        self.sizes = {}
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
         self.capacity = capacity
+        self.current_bytes = 0
         self.hits = 0
         self.misses = 0
+        self.evictions = 0
+        self.bytes_evicted = 0
+        self.rejected_too_large = 0
+
+    def configure(self, max_bytes: int, max_entry_bytes: int) -> None:
+        """
+        Modifie les limites du cache (évince si nécessaire).
+
+        Args:
+            max_bytes: Mémoire totale maximale
+            max_entry_bytes: Taille maximale d'une entrée
+        """
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._evict()
 
     def get(self, key: str) -> Optional[Any]:
         """
@@ -88,23 +103,49 @@ class LRUCache:
         self.misses += 1
         return None
 
-    def put(self, key: str, value: Any) -> None:
+    def put(self, key: str, value: Any, size: Optional[int] = None) -> bool:
         """
         Ajoute ou met à jour un élément dans le cache.
+        Rappeler put() sur une clé existante recalcule sa taille (ex: après
+        l'ajout d'une variante compressée).
 
         Args:
             key: Clé de l'élément
             value: Valeur à stocker
+            size: Taille en octets (estimée si None)
+
+        Returns:
+            bool: False si l'entrée est trop grosse pour être mise en cache
         """
+        if size is None:
+            size = estimate_size(value) + len(key) + ENTRY_OVERHEAD
+
+        if size > self.max_entry_bytes or size > self.max_bytes:
+            self.rejected_too_large += 1
+            self.invalidate(key)
+            return False
+
         if key in self.cache:
-            # Déplacer à la fin
+            self.current_bytes -= self.sizes[key]
             self.cache.move_to_end(key)
-        else:
-            # Nouveau élément - évincer le moins récemment utilisé si nécessaire
-            if len(self.cache) >= self.capacity:
-                self.cache.popitem(last=False)
 
         self.cache[key] = value
+        self.sizes[key] = size
+        self.current_bytes += size
+        self._evict()
+        return True
+
+    def _evict(self) -> None:
+        """Évince les éléments les moins récemment utilisés jusqu'à respecter les limites."""
+        while self.cache and (
+            self.current_bytes > self.max_bytes
+            or (self.capacity is not None and len(self.cache) > self.capacity)
+        ):
+            evicted_key, _ = self.cache.popitem(last=False)
+            evicted_size = self.sizes.pop(evicted_key)
+            self.current_bytes -= evicted_size
+            self.evictions += 1
+            self.bytes_evicted += evicted_size
 
     def invalidate(self, key: str) -> None:
         """
@@ -113,41 +154,624 @@ class LRUCache:
         Args:
             key: Clé à invalider
         """
-        self.cache.pop(key, None)
+        if self.cache.pop(key, None) is not None:
+            self.current_bytes -= self.sizes.pop(key)
 
     def clear(self) -> None:
         """Vide complètement le cache."""
         self.cache.clear()
+        self.sizes.clear()
+        self.current_bytes = 0
 
     def size(self) -> int:
         """Retourne le nombre d'éléments dans le cache."""
         return len(self.cache)
+
+    def __contains__(self, key: str) -> bool:
+        """Présence d'une clé, sans compter de hit/miss ni modifier l'ordre LRU."""
+        return key in self.cache
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Élément sans compter de hit/miss ni modifier l'ordre LRU (None si absent)."""
+        return self.cache.get(key)
     
     def get_stats(self):
         """Retourne les statistiques du cache."""
         return {
+            'policy': 'lru',
             'hits': self.hits,
             'misses': self.misses,
             'size': len(self.cache),
-            'capacity': self.capacity
+            'capacity': self.capacity or 0,
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+            'bytes_evicted': self.bytes_evicted,
+            'rejected_too_large': self.rejected_too_large
         }
 
-def generate_etag(content: bytes) -> str:
+class FrequencySketch:
+    """
+    Count-Min Sketch à compteurs 4 bits : estime la fréquence d'accès des clés
+    (y compris celles qui ne sont pas en cache) avec une mémoire fixe.
+    Les compteurs sont divisés par deux périodiquement pour oublier le passé.
+    """
+
+    DEPTH = 4
+    MAX_COUNT = 15
+
+    def __init__(self, width: int):
+        """
+        Args:
+            width: Nombre de compteurs par ligne (arrondi à une puissance de 2)
+        """
+        self.width = 1 << max(width - 1, 1).bit_length()
+        self.mask = self.width - 1
+        self.table = bytearray(self.DEPTH * self.width)
+        self.sample_size = 10 * self.width
+        self.additions = 0
+
+    def _indexes(self, key: str):
+        """Position du compteur de la clé dans chaque ligne."""
+        h = hash(key)
+        for row in range(self.DEPTH):
+            # Dérive une position indépendante par ligne à partir d'un seul hash
+            h = (h * 0x9E3779B1 + row) & 0xFFFFFFFFFFFF
+            yield row * self.width + ((h >> 16) & self.mask)
+
+    def increment(self, key: str) -> None:
+        """Enregistre un accès à la clé."""
+        for index in self._indexes(key):
+            if self.table[index] < self.MAX_COUNT:
+                self.table[index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._age()
+
+    def frequency(self, key: str) -> int:
+        """Estime le nombre d'accès récents à la clé."""
+        return min(self.table[index] for index in self._indexes(key))
+
+    def _age(self) -> None:
+        """Divise tous les compteurs par deux (vieillissement)."""
+        self.table = bytearray(count >> 1 for count in self.table)
+        self.additions //= 2
+
+
+class TinyLFUCache:
+    """
+    Cache W-TinyLFU borné en octets, résistant aux parcours (crawlers).
+
+    Les nouvelles entrées passent par une petite fenêtre LRU ; à sa sortie,
+    une entrée n'est admise dans le cache principal (SLRU probation/protégé)
+    que si elle est plus fréquente que la victime qu'elle remplacerait.
+    Un parcours de fichiers vus une seule fois n'évince donc pas les fichiers
+    populaires. Même interface que LRUCache.
     """
-    Génère un ETag basé sur le contenu.
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024,
+                 max_entry_bytes: int = 2 * 1024 * 1024,
+                 window_ratio: float = 0.01, protected_ratio: float = 0.8):
+        """
+        Initialise le cache.
+
+        Args:
+            max_bytes: Mémoire totale maximale occupée par les entrées
+            max_entry_bytes: Taille maximale d'une entrée (au-delà, refusée)
+            window_ratio: Part de la mémoire réservée à la fenêtre d'admission
+            protected_ratio: Part du cache principal réservée aux entrées protégées
+        """
+        self.window_ratio = window_ratio
+        self.protected_ratio = protected_ratio
+
+        self.window = OrderedDict()
+        self.probation = OrderedDict()
+        self.protected = OrderedDict()
+        self.sizes = {}
+        self.window_bytes = 0
+        self.probation_bytes = 0
+        self.protected_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_evicted = 0
+        self.rejected_too_large = 0
+        self.admission_rejections = 0
+
+        self.sketch = None
+        self.configure(max_bytes, max_entry_bytes)
+
+    def configure(self, max_bytes: int, max_entry_bytes: int) -> None:
+        """
+        Modifie les limites du cache (évince si nécessaire).
+
+        Args:
+            max_bytes: Mémoire totale maximale
+            max_entry_bytes: Taille maximale d'une entrée
+        """
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.window_max = int(max_bytes * self.window_ratio)
+        self.main_max = max_bytes - self.window_max
+        self.protected_max = int(self.main_max * self.protected_ratio)
+
+        # Environ un compteur par entrée de 4 Ko
+        width = min(max(max_bytes // 4096, 1024), 1 << 20)
+        if self.sketch is None or self.sketch.width < width:
+            self.sketch = FrequencySketch(width)
+
+        while self.main_bytes > self.main_max:
+            self._evict_main()
+        self._shrink_protected()
+        self._drain_window()
+
+    @property
+    def main_bytes(self) -> int:
+        """Mémoire occupée par le cache principal (probation + protégé)."""
+        return self.probation_bytes + self.protected_bytes
+
+    @property
+    def current_bytes(self) -> int:
+        """Mémoire totale occupée."""
+        return self.window_bytes + self.main_bytes
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Récupère un élément du cache (et compte l'accès dans le sketch).
+
+        Args:
+            key: Clé de l'élément
+
+        Returns:
+            L'élément ou None si absent
+        """
+        self.sketch.increment(key)
+
+        if key in self.window:
+            self.window.move_to_end(key)
+        elif key in self.protected:
+            self.protected.move_to_end(key)
+        elif key in self.probation:
+            # Deuxième accès : promotion dans la partie protégée
+            value = self.probation.pop(key)
+            size = self.sizes[key]
+            self.probation_bytes -= size
+            self.protected[key] = value
+            self.protected_bytes += size
+            self._shrink_protected()
+        else:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return self._segment(key)[key]
+
+    def put(self, key: str, value: Any, size: Optional[int] = None) -> bool:
+        """
+        Ajoute ou met à jour un élément dans le cache.
+
+        Args:
+            key: Clé de l'élément
+            value: Valeur à stocker
+            size: Taille en octets (estimée si None)
+
+        Returns:
+            bool: False si l'entrée est trop grosse pour être mise en cache
+        """
+        if size is None:
+            size = estimate_size(value) + len(key) + ENTRY_OVERHEAD
+
+        if size > self.max_entry_bytes or size > self.max_bytes:
+            self.rejected_too_large += 1
+            self.invalidate(key)
+            return False
+
+        if key in self.sizes:
+            # Mise à jour sur place
+            segment = self._segment(key)
+            self._add_bytes(segment, size - self.sizes[key])
+            self.sizes[key] = size
+            segment[key] = value
+            segment.move_to_end(key)
+            while self.main_bytes > self.main_max:
+                self._evict_main()
+            self._shrink_protected()
+            self._drain_window()
+            return True
+
+        self.window[key] = value
+        self.sizes[key] = size
+        self.window_bytes += size
+        self._drain_window()
+        return True
+
+    def _segment(self, key: str) -> OrderedDict:
+        """Segment contenant la clé."""
+        if key in self.window:
+            return self.window
+        if key in self.protected:
+            return self.protected
+        return self.probation
+
+    def _add_bytes(self, segment: OrderedDict, delta: int) -> None:
+        """Met à jour le compteur d'octets d'un segment."""
+        if segment is self.window:
+            self.window_bytes += delta
+        elif segment is self.protected:
+            self.protected_bytes += delta
+        else:
+            self.probation_bytes += delta
+
+    def _drop(self, key: str) -> None:
+        """Comptabilise l'éviction d'une clé déjà retirée de son segment."""
+        size = self.sizes.pop(key)
+        self.evictions += 1
+        self.bytes_evicted += size
+
+    def _evict_main(self) -> None:
+        """Évince la victime LRU du cache principal (probation d'abord)."""
+        segment = self.probation if self.probation else self.protected
+        key, _ = segment.popitem(last=False)
+        self._add_bytes(segment, -self.sizes[key])
+        self._drop(key)
+
+    def _shrink_protected(self) -> None:
+        """Rétrograde en probation les entrées protégées en excès."""
+        while self.protected_bytes > self.protected_max and self.protected:
+            key, value = self.protected.popitem(last=False)
+            size = self.sizes[key]
+            self.protected_bytes -= size
+            self.probation[key] = value
+            self.probation_bytes += size
+
+    def _drain_window(self) -> None:
+        """Fait sortir les entrées en excès de la fenêtre vers le filtre d'admission."""
+        while self.window_bytes > self.window_max and self.window:
+            key, value = self.window.popitem(last=False)
+            size = self.sizes[key]
+            self.window_bytes -= size
+            self._admit(key, value, size)
+
+    def _admit(self, key: str, value: Any, size: int) -> None:
+        """
+        Admet une entrée dans le cache principal si elle est plus fréquente
+        que les victimes qu'elle évincerait, sinon l'abandonne.
+        """
+        candidate_frequency = self.sketch.frequency(key)
+        while self.main_bytes + size > self.main_max:
+            if not self.probation and not self.protected:
+                break
+            segment = self.probation if self.probation else self.protected
+            victim = next(iter(segment))
+            if candidate_frequency <= self.sketch.frequency(victim):
+                self.admission_rejections += 1
+                self._drop(key)
+                return
+            self._evict_main()
+
+        if self.main_bytes + size > self.main_max:
+            self._drop(key)
+            return
+        self.probation[key] = value
+        self.probation_bytes += size
+
+    def invalidate(self, key: str) -> None:
+        """
+        Invalide un élément du cache.
+
+        Args:
+            key: Clé à invalider
+        """
+        if key not in self.sizes:
+            return
+        segment = self._segment(key)
+        del segment[key]
+        self._add_bytes(segment, -self.sizes.pop(key))
+
+    def clear(self) -> None:
+        """Vide complètement le cache (le sketch de fréquences est conservé)."""
+        for segment in (self.window, self.probation, self.protected):
+            segment.clear()
+        self.sizes.clear()
+        self.window_bytes = self.probation_bytes = self.protected_bytes = 0
+
+    def size(self) -> int:
+        """Retourne le nombre d'éléments dans le cache."""
+        return len(self.sizes)
+
+    def __contains__(self, key: str) -> bool:
+        """Présence d'une clé, sans compter d'accès."""
+        return key in self.sizes
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Élément sans compter d'accès (None si absent)."""
+        return self._segment(key)[key] if key in self.sizes else None
+
+    def get_stats(self):
+        """Retourne les statistiques du cache."""
+        return {
+            'policy': 'tinylfu',
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.sizes),
+            'capacity': 0,
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+            'bytes_evicted': self.bytes_evicted,
+            'rejected_too_large': self.rejected_too_large,
+            'admission_rejections': self.admission_rejections
+        }
+
+
+# Politiques d'éviction disponibles (clé "cache_policy" de config.json)
+CACHE_POLICIES = {
+    'lru': LRUCache,
+    'tinylfu': TinyLFUCache,
+}
+
+
+class SingleFlight:
+    """
+    Regroupe les chargements concurrents d'une même clé : pendant qu'un
+    chargement est en cours, les autres appelants attendent son résultat
+    au lieu de relire le disque.
+    """
+
+    def __init__(self):
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.loads = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Exécute load() pour la clé, ou attend le chargement déjà en cours.
+
+        Le chargement tourne dans sa propre tâche : l'annulation d'un appelant
+        (client déconnecté) n'interrompt pas les autres.
+
+        Args:
+            key: Clé du chargement (chemin du fichier)
+            load: Fonction asynchrone de chargement
+
+        Returns:
+            Le résultat de load() (ses exceptions sont propagées à tous les appelants)
+        """
+        task = self.inflight.get(key)
+        if task is None:
+            self.loads += 1
+            task = asyncio.ensure_future(load())
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> Dict:
+        """Retourne les statistiques (chargements effectués / évités)."""
+        return {
+            'loads': self.loads,
+            'coalesced_loads': self.coalesced,
+            'inflight_loads': len(self.inflight),
+        }
+
+
+def create_cache(policy: str = 'lru', max_bytes: int = 64 * 1024 * 1024,
+                 max_entry_bytes: int = 2 * 1024 * 1024):
+    """
+    Crée un cache selon la politique demandée.
+
+    Args:
+        policy: 'lru' ou 'tinylfu'
+        max_bytes: Mémoire totale maximale
+        max_entry_bytes: Taille maximale d'une entrée
+
+    Returns:
+        LRUCache ou TinyLFUCache
+
+    Raises:
+        ValueError: Si la politique est inconnue
+    """
+    if policy not in CACHE_POLICIES:
+        raise ValueError(f"Politique de cache inconnue: {policy}")
+    return CACHE_POLICIES[policy](max_bytes=max_bytes, max_entry_bytes=max_entry_bytes)
+
+
+def configure_cache(policy: str, max_bytes: int, max_entry_bytes: int) -> None:
+    """
+    Configure le cache global : change de politique si nécessaire
+    (l'instance est remplacée), sinon ajuste ses limites.
+
+    Args:
+        policy: 'lru' ou 'tinylfu'
+        max_bytes: Mémoire totale maximale
+        max_entry_bytes: Taille maximale d'une entrée
+    """
+    global cache
+    if CACHE_POLICIES.get(policy) is type(cache):
+        cache.configure(max_bytes, max_entry_bytes)
+    else:
+        cache = create_cache(policy, max_bytes, max_entry_bytes)
+
+# Stratégies d'ETag des fichiers mis en cache
+ETAG_STRATEGIES = ('md5', 'blake2', 'xxhash', 'stat')
+
+# Configuration (surchargée par "etag_strategy" / "etag_manifest" dans config.json)
+ETAG_CONFIG = {
+    'strategy': 'md5',
+    'manifest': None,       # Fichier JSON des hash déjà calculés (None = pas de persistance)
+}
+
+def generate_etag(content: bytes, strategy: str = 'md5') -> str:
+    """
+    Génère un ETag fort basé sur le contenu.
 
     Args:
         content: Contenu du fichier
+        strategy: 'md5', 'blake2' (BLAKE2b, 8 octets) ou 'xxhash' (xxh3, BLAKE2 si absent)
 
     Returns:
-        str: ETag (hash MD5)
+        str: ETag entre guillemets
     """
+    if strategy == 'xxhash' and xxhash is not None:
+        return f'"{xxhash.xxh3_64_hexdigest(content)}"'
+    if strategy in ('blake2', 'xxhash'):
+        return f'"{hashlib.blake2b(content, digest_size=8).hexdigest()}"'
     return f'"{hashlib.md5(content).hexdigest()}"'
 
+def stat_etag(st: os.stat_result) -> str:
+    """
+    ETag faible dérivé de l'inode, de la taille et de la date de
+    modification (à la nginx) : aucun octet du fichier n'est lu.
+
+    Args:
+        st: Résultat de os.stat()
+
+    Returns:
+        str: ETag faible (W/"...")
+    """
+    return f'W/"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+class ETagManifest:
+    """
+    Hash de contenu déjà calculés, persistés sur disque : après un
+    redémarrage, un fichier inchangé (même inode, taille et date) retrouve
+    son ETag fort sans être rehashé.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Fichier JSON du manifeste (None = en mémoire seulement)
+        """
+        self.path = path
+        # chemin -> [inode, taille, mtime_ns, stratégie, etag]
+        self.entries: Dict[str, list] = {}
+        self.dirty = False
+        self.reused = 0
+        # Les hash sont calculés dans les threads du pool d'I/O
+        self.lock = threading.Lock()
+
+    def load(self) -> None:
+        """Charge le manifeste depuis le disque (absent ou illisible = vide)."""
+        if not self.path:
+            return
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(entries, dict):
+            with self.lock:
+                self.entries = entries
+
+    def save(self) -> None:
+        """Écrit le manifeste s'il a changé (écriture atomique)."""
+        if not self.path or not self.dirty:
+            return
+        with self.lock:
+            data = json.dumps(self.entries)
+            self.dirty = False
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def etag(self, file_path: str, st: os.stat_result, content: bytes, strategy: str) -> str:
+        """
+        ETag fort du fichier, repris du manifeste s'il est encore valide.
+
+        Args:
+            file_path: Chemin du fichier
+            st: Stat du fichier au moment de la lecture
+            content: Contenu du fichier
+            strategy: Stratégie de hash
+
+        Returns:
+            str: ETag entre guillemets
+        """
+        signature = [st.st_ino, st.st_size, st.st_mtime_ns, strategy]
+        with self.lock:
+            entry = self.entries.get(file_path)
+            if entry is not None and entry[:4] == signature:
+                self.reused += 1
+                return entry[4]
+
+        etag = generate_etag(content, strategy)
+        with self.lock:
+            self.entries[file_path] = signature + [etag]
+            self.dirty = True
+        return etag
+
+    def get_stats(self) -> Dict:
+        """Retourne les statistiques du manifeste."""
+        return {'etag_manifest_size': len(self.entries), 'etag_manifest_reused': self.reused}
+
+# ETags déjà calculés (rechargé par configure_etags)
+etag_manifest = ETagManifest()
+
+def configure_etags(strategy: str = 'md5', manifest: Optional[str] = None) -> None:
+    """
+    Choisit la stratégie d'ETag et charge le manifeste des hash.
+
+    Args:
+        strategy: Une des ETAG_STRATEGIES
+        manifest: Fichier JSON du manifeste (None = pas de persistance)
+
+    Raises:
+        ValueError: Si la stratégie est inconnue
+    """
+    global etag_manifest
+    if strategy not in ETAG_STRATEGIES:
+        raise ValueError(f"Stratégie d'ETag inconnue: {strategy}")
+    if strategy == 'xxhash' and xxhash is None:
+        print("Module xxhash absent : ETags calculés avec BLAKE2")
+    ETAG_CONFIG.update(strategy=strategy, manifest=manifest)
+    etag_manifest = ETagManifest(manifest)
+    etag_manifest.load()
+
+def compute_etag(file_path: str, st: os.stat_result, content: bytes, persist: bool = True) -> str:
+    """
+    ETag d'un fichier selon ETAG_CONFIG['strategy'] (bloquant : hash éventuel).
+
+    Args:
+        file_path: Chemin du fichier
+        st: Stat du fichier au moment de la lecture
+        content: Contenu servi
+        persist: False si le contenu servi diffère du fichier (ex: widget injecté)
+
+    Returns:
+        str: ETag ('stat' : faible, autres stratégies : fort)
+    """
+    strategy = ETAG_CONFIG['strategy']
+    if strategy == 'stat':
+        return stat_etag(st)
+    if not persist:
+        return generate_etag(content, strategy)
+    return etag_manifest.etag(file_path, st, content, strategy)
+
 def should_use_cache(file_path: str, cached_mtime: float) -> bool:
     """
     Vérifie si le fichier n'a pas changé depuis la mise en cache.
 
+    Le stat passe par stat_cache (un appel système par TTL au plus).
+
+    Args:
+        file_path: Chemin du fichier
+        cached_mtime: Timestamp de modification en cache
+
+    Returns:
+        bool: True si le cache est valide
+    """
+    st = stat_cache.stat(file_path)
+    return st is not None and st.st_mtime <= cached_mtime
+
+async def check_cache_valid(file_path: str, cached_mtime: float) -> bool:
+    """
+    should_use_cache sans bloquer la boucle : le stat n'est délégué au pool
+    d'I/O que s'il n'est pas déjà dans stat_cache.
+
     Args:
         file_path: Chemin du fichier
         cached_mtime: Timestamp de modification en cache
@@ -155,11 +779,9 @@ def should_use_cache(file_path: str, cached_mtime: float) -> bool:
     Returns:
         bool: True si le cache est valide
     """
-    try:
-        current_mtime = os.path.getmtime(file_path)
-        return current_mtime <= cached_mtime
-    except OSError:
-        return False
+    if stat_cache.is_fresh(file_path):
+        return should_use_cache(file_path, cached_mtime)
+    return await run_io(should_use_cache, file_path, cached_mtime)
 
 # Instance globale du cache
 cache = LRUCache()
@@ -0,0 +1,229 @@
+"""
+Compression des réponses HTTP négociée avec Accept-Encoding
+(gzip toujours disponible, brotli et zstd si les modules sont installés)
+"""
+
+import gzip
+import zlib
+from typing import Dict, Optional, Tuple
+
+from utils.io_pool import run_io
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Configuration (surchargée par la section "compression" de config.json)
+COMPRESSION_CONFIG = {
+    'enabled': True,
+    'min_size': 256,        # En dessous, le gain ne compense pas le coût
+    'gzip_level': 6,        # 9 coûte beaucoup plus de CPU pour quelques %
+    'brotli_quality': 5,
+    'zstd_level': 3,
+}
+
+# Encodages supportés, par ordre de préférence à q-value égale
+SUPPORTED_ENCODINGS = ['br', 'zstd', 'gzip']
+
+COMPRESSIBLE_TYPES = {
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/javascript',
+    'text/xml',
+    'application/javascript',
+    'application/json',
+    'application/xml',
+    'image/svg+xml',
+}
+
+
+def available_encodings() -> list:
+    """Retourne les encodages utilisables avec les modules installés."""
+    encodings = []
+    for encoding in SUPPORTED_ENCODINGS:
+        if encoding == 'br' and brotli is None:
+            continue
+        if encoding == 'zstd' and zstandard is None:
+            continue
+        encodings.append(encoding)
+    return encodings
+
+
+def should_compress(mime_type: str) -> bool:
+    """
+    Vérifie si le type MIME doit être compressé (formats texte).
+
+    Args:
+        mime_type: Le type MIME du contenu (paramètres comme charset acceptés)
+
+    Returns:
+        True si le contenu doit être compressé, False sinon
+    """
+    base_type = mime_type.split(';', 1)[0].strip().lower()
+    return base_type in COMPRESSIBLE_TYPES
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """
+    Parse un header Accept-Encoding avec ses q-values.
+
+    Args:
+        header: Valeur du header (ex: 'gzip;q=0.8, br, *;q=0')
+
+    Returns:
+        Dict: encodage -> q-value
+    """
+    accepted = {}
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: Optional[str], mime_type: str) -> Optional[str]:
+    """
+    Choisit le meilleur encodage accepté par le client.
+
+    Args:
+        accept_encoding: Header Accept-Encoding (None si absent)
+        mime_type: Type MIME de la réponse
+
+    Returns:
+        str: 'br', 'zstd' ou 'gzip', ou None pour ne pas compresser
+    """
+    if not COMPRESSION_CONFIG['enabled'] or not should_compress(mime_type):
+        return None
+    return negotiate_encoding(accept_encoding, available_encodings())
+
+
+def negotiate_encoding(accept_encoding: Optional[str], candidates: list) -> Optional[str]:
+    """
+    Choisit, parmi des encodages candidats, celui que le client préfère.
+
+    Args:
+        accept_encoding: Header Accept-Encoding (None si absent)
+        candidates: Encodages disponibles pour cette réponse
+
+    Returns:
+        str: Encodage choisi, ou None (réponse non compressée)
+    """
+    if not accept_encoding or not candidates:
+        return None
+
+    accepted = parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get('*', 0.0)
+
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        if encoding not in candidates:
+            continue
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """
+    Compresse des données (bloquant, à exécuter hors de la boucle asyncio).
+
+    Args:
+        data: Les données à compresser
+        encoding: 'gzip', 'br' ou 'zstd'
+
+    Returns:
+        Les données compressées en bytes
+    """
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=COMPRESSION_CONFIG['gzip_level'])
+    if encoding == 'br':
+        return brotli.compress(data, quality=COMPRESSION_CONFIG['brotli_quality'])
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=COMPRESSION_CONFIG['zstd_level']).compress(data)
+    raise ValueError(f"Encodage non supporté: {encoding}")
+
+
+async def compress_async(data: bytes, encoding: str) -> bytes:
+    """Compresse dans le pool d'I/O pour ne pas bloquer la boucle asyncio."""
+    return await run_io(compress, data, encoding)
+
+
+async def compress_response(body: bytes, mime_type: str,
+                            accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """
+    Compresse un corps de réponse dynamique (PHP, listing) si le client l'accepte.
+
+    Args:
+        body: Corps de la réponse
+        mime_type: Type MIME de la réponse
+        accept_encoding: Header Accept-Encoding du client
+
+    Returns:
+        Tuple: (corps, encodage) ; encodage None si non compressé
+    """
+    if len(body) < COMPRESSION_CONFIG['min_size']:
+        return body, None
+
+    encoding = choose_encoding(accept_encoding, mime_type)
+    if encoding is None:
+        return body, None
+
+    compressed = await compress_async(body, encoding)
+    if len(compressed) >= len(body):
+        return body, None
+    return compressed, encoding
+
+
+class StreamCompressor:
+    """
+    Compression incrémentale d'une réponse envoyée en chunked (sortie PHP
+    streamée) : chaque morceau est compressé et vidé immédiatement.
+    """
+
+    def __init__(self, encoding: str):
+        """
+        Args:
+            encoding: 'gzip', 'br' ou 'zstd'
+        """
+        self.encoding = encoding
+        if encoding == 'gzip':
+            # wbits=31 : format gzip (en-tête + CRC)
+            self._compressor = zlib.compressobj(COMPRESSION_CONFIG['gzip_level'], zlib.DEFLATED, 31)
+        elif encoding == 'br':
+            self._compressor = brotli.Compressor(quality=COMPRESSION_CONFIG['brotli_quality'])
+        elif encoding == 'zstd':
+            self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_CONFIG['zstd_level']).compressobj()
+        else:
+            raise ValueError(f"Encodage non supporté: {encoding}")
+
+    def compress(self, data: bytes) -> bytes:
+        """Compresse un morceau ; le résultat est décodable sans attendre la suite."""
+        if self.encoding == 'gzip':
+            return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.flush()
+        return (self._compressor.compress(data)
+                + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK))
+
+    def finish(self) -> bytes:
+        """Termine le flux compressé."""
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
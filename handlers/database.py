@@ -1,26 +1,119 @@
 """
 Connecteur MySQL simple pour exécuter des requêtes SQL
+
+Le pool aiomysql est configuré par la section "database" de config.json.
+Une connexion qui n'arrive pas dans acquire_timeout secondes lève
+DatabaseUnavailableError (réponse 503) au lieu d'attendre sans fin, et
+l'occupation du pool est visible sur /_monitor.
+
+Les gros SELECT peuvent être lus au fil de l'eau avec open_query_stream() :
+curseur côté serveur (SSCursor), lignes lues par lots de stream_batch_size,
+sans jamais charger tout le résultat en mémoire.
+
+Les placeholders ? sont traduits en %s une seule fois par texte SQL (hors
+chaînes, identifiants et commentaires) ; execute_many() et execute_batch()
+exécutent plusieurs requêtes avec une seule connexion, dans une transaction.
+
+Avec la section "query_cache" activée, les SELECT d'execute_query() sont mis
+en cache (TTL, budget mémoire LRU) et invalidés par toute écriture sur une
+des tables qu'ils lisent.
 """
-import aiomysql
-from typing import Optional, List, Dict, Any
+import asyncio
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any, AsyncIterator, Awaitable, Callable, Sequence, Tuple
+
+try:
+    import aiomysql
+except ImportError:
+    aiomysql = None
+
+from handlers.cache import LRUCache
+from utils.sql_encoding import column_converters, convert_rows
 
 # Pool de connexions
-pool: Optional[aiomysql.Pool] = None
+pool: Optional["aiomysql.Pool"] = None
 
-# Configuration XAMPP MySQL/MariaDB (à adapter selon votre setup)
+# Configuration XAMPP MySQL/MariaDB (surchargée par la section "database" de config.json)
 DB_CONFIG = {
     'host': 'localhost',  # ou '127.0.0.1'
     'port': 3306,         # Port par défaut XAMPP
     'user': 'root',       # Utilisateur par défaut XAMPP
     'password': '',       # Pas de mot de passe par défaut XAMPP
     'db': 'serveur_db',   # Nom de votre base de données
-    'charset': 'utf8mb4'
+    'charset': 'utf8mb4',
+    # Pool
+    'minsize': 1,
+    'maxsize': 10,
+    'connect_timeout': 5,       # Secondes pour ouvrir une connexion
+    'acquire_timeout': 5,       # Secondes d'attente d'une connexion libre (puis 503)
+    'pool_recycle': 3600,       # Connexion inutilisée depuis N secondes : rouverte (-1 = jamais)
+    'ping_interval': 30,        # Connexion inutilisée depuis N secondes : ping avant usage (0 = jamais)
+    'stream_batch_size': 1000,  # Lignes lues par fetchmany() en mode streaming
 }
 
+# Bornes (secondes) de l'histogramme des temps d'attente d'une connexion
+ACQUIRE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+
+def _bucket_label(bound: Optional[float]) -> str:
+    if bound is None:
+        return f"> {ACQUIRE_BUCKETS[-1] * 1000:.0f} ms"
+    return f"≤ {bound * 1000:.0f} ms"
+
+
+_stats = {
+    'acquired': 0,          # Connexions obtenues
+    'waiting': 0,           # Requêtes en attente d'une connexion
+    'max_waiting': 0,
+    'timeouts': 0,          # Attentes abandonnées (503)
+    'pings': 0,
+    'ping_failures': 0,
+    'acquire_total': 0.0,   # Secondes cumulées d'attente
+    'acquire_max': 0.0,
+    'acquire_histogram': {_bucket_label(b): 0 for b in ACQUIRE_BUCKETS + (None,)},
+}
+
+
+class DatabaseUnavailableError(Exception):
+    """Base indisponible ou pool saturé (réponse 503)."""
+
+
+class BatchStatementError(Exception):
+    """Échec d'une requête d'un lot (la transaction a été annulée)."""
+
+    def __init__(self, index: int, error: Exception):
+        super().__init__(f"requête {index}: {error}")
+        self.index = index
+        self.error = error
+
+
+# Littéraux et commentaires (recopiés), placeholders ? et % à échapper
+_SQL_TOKENS = re.compile(
+    r"'(?:[^'\\]|\\.|'')*'"           # 'chaîne'
+    r'|"(?:[^"\\]|\\.|"")*"'          # "chaîne"
+    r"|`(?:[^`]|``)*`"                # `identifiant`
+    r"|--(?:[ \t\r\n][^\n]*|$)"       # -- commentaire
+    r"|#[^\n]*"                       # # commentaire
+    r"|/\*.*?\*/"                     # /* commentaire */
+    r"|%s(?!\w)"                      # placeholder %s
+    r"|[?%]",
+    re.S
+)
+
+# Texte SQL reçu -> texte au format aiomysql
+_translated: Dict[str, str] = {}
+
+# Borne du cache de traductions (le texte SQL vient des clients)
+MAX_TRANSLATED = 256
+
 
 async def init_db() -> None:
     """Initialise la connexion à MySQL"""
     global pool
+    if aiomysql is None:
+        raise RuntimeError("module aiomysql non installé")
     try:
         pool = await aiomysql.create_pool(
             host=DB_CONFIG['host'],
@@ -29,10 +122,14 @@ async def init_db() -> None:
             password=DB_CONFIG['password'],
             db=DB_CONFIG['db'],
             charset=DB_CONFIG['charset'],
-            minsize=1,
-            maxsize=10
+            minsize=DB_CONFIG['minsize'],
+            maxsize=DB_CONFIG['maxsize'],
+            connect_timeout=DB_CONFIG['connect_timeout'],
+            pool_recycle=DB_CONFIG['pool_recycle'],
+            # Fixé à la connexion : pas d'aller-retour à chaque acquisition
+            autocommit=True
         )
-        print("✅ Connexion MySQL établie")
+        print(f"✅ Connexion MySQL établie (pool {DB_CONFIG['minsize']}-{DB_CONFIG['maxsize']})")
     except Exception as e:
         print(f"❌ Erreur connexion MySQL: {e}")
         raise
@@ -44,50 +141,714 @@ async def close_db() -> None:
     if pool:
         pool.close()
         await pool.wait_closed()
+        pool = None
         print("✅ Connexion MySQL fermée")
 
 
-async def execute_query(sql: str, params: tuple = None) -> Dict[str, Any]:
+def _record_acquire(wait: float) -> None:
+    _stats['acquired'] += 1
+    _stats['acquire_total'] += wait
+    _stats['acquire_max'] = max(_stats['acquire_max'], wait)
+    for bound in ACQUIRE_BUCKETS:
+        if wait <= bound:
+            _stats['acquire_histogram'][_bucket_label(bound)] += 1
+            return
+    _stats['acquire_histogram'][_bucket_label(None)] += 1
+
+
+@asynccontextmanager
+async def acquire() -> AsyncIterator["aiomysql.Connection"]:
+    """
+    Emprunte une connexion au pool, vérifiée par un ping si elle est
+    restée inutilisée plus de ping_interval secondes.
+
+    Yields:
+        aiomysql.Connection: Connexion (autocommit activé)
+
+    Raises:
+        DatabaseUnavailableError: Pas de pool, aucune connexion libre après
+            acquire_timeout secondes, ou ping impossible
+    """
+    if pool is None:
+        raise DatabaseUnavailableError("MySQL non disponible")
+
+    _stats['waiting'] += 1
+    _stats['max_waiting'] = max(_stats['max_waiting'], _stats['waiting'])
+    start = time.monotonic()
+    try:
+        conn = await asyncio.wait_for(pool.acquire(), DB_CONFIG['acquire_timeout'])
+    except asyncio.TimeoutError:
+        _stats['timeouts'] += 1
+        raise DatabaseUnavailableError(
+            f"aucune connexion MySQL libre après {DB_CONFIG['acquire_timeout']} s "
+            f"({DB_CONFIG['maxsize']} connexions occupées)"
+        )
+    finally:
+        _stats['waiting'] -= 1
+    _record_acquire(time.monotonic() - start)
+
+    try:
+        ping_interval = DB_CONFIG['ping_interval']
+        if ping_interval and conn.loop.time() - conn.last_usage > ping_interval:
+            # Connexion peut-être coupée côté serveur (wait_timeout) : reconnecter si besoin
+            _stats['pings'] += 1
+            try:
+                await conn.ping(reconnect=True)
+            except Exception as e:
+                _stats['ping_failures'] += 1
+                conn.close()
+                raise DatabaseUnavailableError(f"MySQL ne répond pas: {e}")
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+def get_pool_stats() -> Dict:
+    """
+    Retourne l'occupation du pool et les temps d'attente.
+
+    Returns:
+        Dict: in_use, idle, size, maxsize, waiting, timeouts, histogramme...
+    """
+    size = pool.size if pool is not None else 0
+    idle = pool.freesize if pool is not None else 0
+    return {
+        **_stats,
+        'acquire_histogram': dict(_stats['acquire_histogram']),
+        'connected': pool is not None,
+        'in_use': size - idle,
+        'idle': idle,
+        'size': size,
+        'maxsize': DB_CONFIG['maxsize'],
+    }
+
+
+def translate_placeholders(sql: str) -> str:
+    """
+    Convertit les placeholders ? en %s pour aiomysql.
+
+    Les ? dans les chaînes, identifiants et commentaires sont conservés et
+    les % sont doublés (aiomysql formate la requête avec l'opérateur %).
+    Une requête sans placeholder ? (déjà au format %s) est retournée telle
+    quelle. Le résultat est mis en cache par texte SQL.
+
+    Args:
+        sql: Requête avec placeholders ?
+
+    Returns:
+        str: Requête avec placeholders %s
+
+    Raises:
+        ValueError: Placeholders ? et %s mélangés dans la même requête
+    """
+    translated = _translated.get(sql)
+    if translated is not None:
+        return translated
+
+    placeholders = 0
+    format_placeholders = 0
+
+    def replace(match: "re.Match") -> str:
+        nonlocal placeholders, format_placeholders
+        token = match.group(0)
+        if token == '?':
+            placeholders += 1
+            return '%s'
+        if token == '%s':
+            format_placeholders += 1
+        return token.replace('%', '%%')
+
+    translated = sql
+    if '?' in sql:
+        # Seuls les placeholders hors littéraux et commentaires sont comptés
+        result = _SQL_TOKENS.sub(replace, sql)
+        if placeholders and format_placeholders:
+            raise ValueError("Placeholders ? et %s mélangés dans la même requête")
+        if placeholders:
+            translated = result
+    if len(_translated) < MAX_TRANSLATED:
+        _translated[sql] = translated
+    return translated
+
+
+# Configuration du cache de résultats (surchargée par la section "query_cache" de config.json)
+QUERY_CACHE_CONFIG = {
+    'enabled': False,
+    'ttl': 30,              # Secondes (borne aussi le retard entre workers)
+    'max_size': 16,         # Mo
+    'max_entry_size': 1,    # Mo
+}
+
+# Requêtes en lecture seule (les autres invalident les tables qu'elles citent)
+READ_STATEMENTS = frozenset(('SELECT', 'SHOW', 'DESCRIBE', 'DESC', 'EXPLAIN'))
+
+# Fonctions et clauses dont le résultat change d'une exécution à l'autre
+_VOLATILE = re.compile(
+    r"\b(?:NOW|SYSDATE|CURDATE|CURTIME|UTC_DATE|UTC_TIME|UTC_TIMESTAMP|UNIX_TIMESTAMP"
+    r"|RAND|UUID|UUID_SHORT|LAST_INSERT_ID|FOUND_ROWS|ROW_COUNT|CONNECTION_ID|SLEEP"
+    r"|GET_LOCK|IS_FREE_LOCK|USER|DATABASE)\s*\("
+    r"|\b(?:CURRENT_DATE|CURRENT_TIME|CURRENT_TIMESTAMP|CURRENT_USER|LOCALTIME|LOCALTIMESTAMP"
+    r"|SQL_NO_CACHE)\b"
+    r"|\bFOR\s+(?:UPDATE|SHARE)\b|\bLOCK\s+IN\s+SHARE\s+MODE\b"
+    r"|@",
+    re.I
+)
+
+_SPACES = re.compile(r"\s+")
+
+# Mots-clés suivis d'une liste de tables
+_TABLE_KEYWORD = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE|TABLE|TABLES|TRUNCATE)\b", re.I)
+
+# Table (éventuellement base.table), alias et virgule vers la suivante
+_NAME = r"(?:`(?:[^`]|``)+`|[\w$]+)"
+_TABLE_REF = re.compile(
+    rf"\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?({_NAME}(?:\s*\.\s*{_NAME})?)(?:\s+(?:AS\s+)?{_NAME})?\s*(,?)",
+    re.I
+)
+
+
+class SQLStatement:
+    """Analyse d'une requête pour le cache de résultats."""
+
+    __slots__ = ('key', 'tables', 'read', 'cacheable')
+
+    def __init__(self, key: str, tables: Tuple[str, ...], read: bool, cacheable: bool):
+        """
+        Args:
+            key: Texte normalisé (espaces réduits hors littéraux)
+            tables: Tables citées (minuscules, sans base ni backquotes)
+            read: True pour une requête en lecture seule
+            cacheable: True si le résultat peut être réutilisé (SELECT déterministe)
+        """
+        self.key = key
+        self.tables = tables
+        self.read = read
+        self.cacheable = cacheable
+
+
+# Texte SQL reçu -> analyse
+_analyzed: Dict[str, SQLStatement] = {}
+
+# Borne du cache d'analyses
+MAX_ANALYZED = 256
+
+
+def _table_name(name: str) -> str:
+    # base.table -> table : deux bases peuvent partager un nom, ce qui invalide trop, jamais pas assez
+    name = name.rsplit('.', 1)[-1].strip()
+    if name.startswith('`'):
+        name = name[1:-1].replace('``', '`')
+    return name.lower()
+
+
+def analyze_sql(sql: str) -> SQLStatement:
+    """
+    Normalise une requête et liste les tables qu'elle cite.
+
+    L'extraction des tables est volontairement large (une fonction
+    EXTRACT(... FROM col) ajoute "col") : une table en trop invalide trop
+    souvent, une table manquante laisserait un résultat périmé. Une écriture
+    sans table reconnue invalide tout le cache.
+
+    Args:
+        sql: Requête SQL
+
+    Returns:
+        SQLStatement: Clé normalisée, tables, lecture seule, cacheable
+    """
+    statement = _analyzed.get(sql)
+    if statement is not None:
+        return statement
+
+    key_parts = []
+    code_parts = []
+    last = 0
+    for match in _SQL_TOKENS.finditer(sql):
+        token = match.group(0)
+        if token in ('?', '%'):
+            continue
+        between = sql[last:match.start()]
+        key_parts.append(_SPACES.sub(' ', between))
+        key_parts.append(token)
+        # Code analysé : littéraux remplacés, commentaires retirés, identifiants gardés
+        code_parts.append(between)
+        code_parts.append(token if token[0] == '`' else " '' " if token[0] in '\'"' else ' ')
+        last = match.end()
+    key_parts.append(_SPACES.sub(' ', sql[last:]))
+    code_parts.append(sql[last:])
+    key = ''.join(key_parts).strip()
+    code = ''.join(code_parts)
+
+    tables = set()
+    for keyword in _TABLE_KEYWORD.finditer(code):
+        pos = keyword.end()
+        while True:
+            ref = _TABLE_REF.match(code, pos)
+            if ref is None:
+                break
+            tables.add(_table_name(ref.group(1)))
+            if not ref.group(2):
+                break
+            pos = ref.end()
+
+    words = code.split(None, 1)
+    read = bool(words) and words[0].upper() in READ_STATEMENTS
+    cacheable = read and words[0].upper() == 'SELECT' and _VOLATILE.search(code) is None
+    statement = SQLStatement(key, tuple(sorted(tables)), read, cacheable)
+    if len(_analyzed) < MAX_ANALYZED:
+        _analyzed[sql] = statement
+    return statement
+
+
+class QueryCache:
+    """
+    Cache des résultats de SELECT, invalidé par table.
+
+    Chaque table a une version, incrémentée à chaque écriture qui la cite ;
+    un résultat n'est valide que si les versions de ses tables n'ont pas
+    changé depuis le début de sa lecture. Une lecture en cours pendant une
+    écriture n'est donc jamais mise en cache.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        """
+        Args:
+            max_bytes: Budget mémoire total
+            max_entry_bytes: Taille max d'un résultat
+        """
+        self.entries = LRUCache(max_bytes=max_bytes, max_entry_bytes=max_entry_bytes)
+        # Table -> version
+        self.versions: Dict[str, int] = {}
+        # Incrémenté par une écriture sans table reconnue (invalide tout)
+        self.epoch = 0
+        # Lectures en cours : clé -> (tâche, versions au départ)
+        self.inflight: Dict[str, Tuple[asyncio.Future, Tuple]] = {}
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'stored': 0,
+            'expired': 0,
+            'stale': 0,             # Résultats écartés après une écriture
+            'invalidations': 0,     # Écritures ayant invalidé des tables
+            'uncacheable': 0,       # SELECT non déterministes (NOW(), RAND()...)
+        }
+
+    def _versions(self, tables: Tuple[str, ...]) -> Tuple:
+        return (self.epoch,) + tuple(self.versions.get(table, 0) for table in tables)
+
+    async def fetch(self, key: str, tables: Tuple[str, ...],
+                    load: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Retourne le résultat en cache, attend la lecture identique en cours,
+        ou exécute load().
+
+        La lecture tourne dans sa propre tâche : l'annulation d'un appelant
+        n'interrompt pas les autres.
+
+        Args:
+            key: Requête normalisée et paramètres
+            tables: Tables lues par la requête
+            load: Exécution de la requête
+
+        Returns:
+            Dict: Résultat (partagé entre les appelants : ne pas le modifier)
+        """
+        versions = self._versions(tables)
+        entry = self.entries.get(key)
+        if entry is not None:
+            result, entry_versions, expires = entry
+            if entry_versions != versions:
+                self.stats['stale'] += 1
+                self.entries.invalidate(key)
+            elif expires <= time.monotonic():
+                self.stats['expired'] += 1
+                self.entries.invalidate(key)
+            else:
+                self.stats['hits'] += 1
+                return result
+
+        pending = self.inflight.get(key)
+        if pending is not None and pending[1] == versions:
+            # Même requête déjà en cours, sans écriture depuis : attendre son résultat
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(pending[0])
+
+        self.stats['misses'] += 1
+        task = asyncio.ensure_future(load())
+        self.inflight[key] = (task, versions)
+        task.add_done_callback(lambda _: self._complete(key, tables, task, versions))
+        return await asyncio.shield(task)
+
+    def _complete(self, key: str, tables: Tuple[str, ...], task: asyncio.Future, versions: Tuple) -> None:
+        if self.inflight.get(key, (None,))[0] is task:
+            del self.inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        if versions != self._versions(tables):
+            # Écriture pendant la lecture : résultat peut-être déjà périmé
+            return
+        if self.entries.put(key, (task.result(), versions, time.monotonic() + QUERY_CACHE_CONFIG['ttl'])):
+            self.stats['stored'] += 1
+
+    def invalidate(self, tables: Tuple[str, ...]) -> None:
+        """
+        Invalide les résultats qui lisent ces tables.
+
+        Args:
+            tables: Tables modifiées (vide = tout invalider)
+        """
+        self.stats['invalidations'] += 1
+        if not tables:
+            self.epoch += 1
+            return
+        for table in tables:
+            self.versions[table] = self.versions.get(table, 0) + 1
+
+    def clear(self) -> None:
+        """Vide le cache."""
+        self.entries.clear()
+        self.epoch += 1
+
+    def get_stats(self) -> Dict:
+        """Retourne les statistiques du cache de résultats."""
+        cache_stats = self.entries.get_stats()
+        return {
+            **self.stats,
+            'enabled': QUERY_CACHE_CONFIG['enabled'],
+            'size': cache_stats['size'],
+            'bytes': cache_stats['bytes'],
+            'max_bytes': cache_stats['max_bytes'],
+        }
+
+
+# Instance globale (recréée par configure_query_cache)
+query_cache = QueryCache(QUERY_CACHE_CONFIG['max_size'] * 1024 * 1024,
+                         QUERY_CACHE_CONFIG['max_entry_size'] * 1024 * 1024)
+
+
+def configure_query_cache(**settings) -> QueryCache:
+    """
+    Applique la configuration et recrée le cache de résultats.
+
+    Args:
+        settings: Clés de QUERY_CACHE_CONFIG à surcharger
+
+    Returns:
+        QueryCache: Nouvelle instance globale
+    """
+    global query_cache
+    QUERY_CACHE_CONFIG.update(settings)
+    query_cache = QueryCache(int(QUERY_CACHE_CONFIG['max_size'] * 1024 * 1024),
+                             int(QUERY_CACHE_CONFIG['max_entry_size'] * 1024 * 1024))
+    return query_cache
+
+
+def invalidate_tables(statements: List[str]) -> None:
+    """
+    Invalide le cache de résultats après des écritures.
+
+    Args:
+        statements: Requêtes exécutées (les lectures sont ignorées)
+    """
+    if not QUERY_CACHE_CONFIG['enabled']:
+        return
+    tables = set()
+    for sql in statements:
+        statement = analyze_sql(sql)
+        if statement.read:
+            continue
+        if not statement.tables:
+            query_cache.invalidate(())
+            return
+        tables.update(statement.tables)
+    if tables:
+        query_cache.invalidate(tuple(sorted(tables)))
+
+
+def _column_names(cursor: "aiomysql.Cursor") -> List[str]:
+    """Noms des colonnes, comme DictCursor (table.colonne pour un nom en double)."""
+    names = []
+    for field in cursor._result.fields:
+        name = field.name
+        if name in names:
+            name = f"{field.table_name}.{name}"
+        names.append(name)
+    return names
+
+
+def rows_as_objects(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convertit un résultat colonnaire en lignes dictionnaires.
+
+    Args:
+        result: {'columns': [...], 'rows': [[...]], 'rowcount': n}
+
+    Returns:
+        Dict: {'rows': [{colonne: valeur}], 'rowcount': n} (résultats sans
+        colonnes retournés tels quels)
+    """
+    if 'columns' not in result:
+        return result
+    columns = result['columns']
+    return {
+        'rows': [dict(zip(columns, row)) for row in result['rows']],
+        'rowcount': result['rowcount']
+    }
+
+
+async def _execute(cursor: "aiomysql.Cursor", sql: str, params: tuple = None) -> Dict[str, Any]:
+    """Exécute une requête sur un curseur et retourne son résultat colonnaire (voir execute_query)."""
+    # Exécuter avec ou sans paramètres
+    if params:
+        await cursor.execute(translate_placeholders(sql), params)
+    else:
+        await cursor.execute(sql)
+
+    # Si c'est un SELECT, récupérer les résultats
+    if sql.strip().upper().startswith('SELECT'):
+        rows = await cursor.fetchall()
+        # Decimal, dates, TIME, BIT, binaires : convertis colonne par colonne pour JSON
+        return {
+            'columns': _column_names(cursor),
+            'rows': convert_rows(rows, column_converters(cursor.description, rows)),
+            'rowcount': len(rows)
+        }
+    else:
+        # INSERT, UPDATE, DELETE, ALTER, etc.
+        return {
+            'rows': [],
+            'rowcount': cursor.rowcount,
+            'lastrowid': cursor.lastrowid if cursor.lastrowid else None
+        }
+
+
+async def execute_query(sql: str, params: tuple = None, columnar: bool = False) -> Dict[str, Any]:
     """
     Exécute une requête SQL (SELECT, INSERT, UPDATE, DELETE, ALTER, etc.)
-    
+
     Args:
         sql: La requête SQL à exécuter
         params: Les paramètres (optionnel) pour requêtes préparées
-        
+        columnar: True pour un SELECT en colonnes ('columns' + 'rows' en
+            listes de valeurs) au lieu d'une liste de dictionnaires
+
     Returns:
-        Dict avec 'rows' (résultats SELECT) et 'rowcount' (lignes affectées)
-    """
-    # Convertir les ? en %s pour MySQL (aiomysql utilise le format Python)
-    sql = sql.replace('?', '%s')
-    
-    async with pool.acquire() as conn:
-        # Activer autocommit pour éviter les deadlocks
-        await conn.autocommit(True)
-        
-        async with conn.cursor(aiomysql.DictCursor) as cursor:
-            # Exécuter avec ou sans paramètres
-            if params:
-                await cursor.execute(sql, params)
-            else:
-                await cursor.execute(sql)
-            
-            # Si c'est un SELECT, récupérer les résultats
-            if sql.strip().upper().startswith('SELECT'):
-                rows = await cursor.fetchall()
-                # Convertir datetime en string pour JSON
-                for row in rows:
-                    for key, value in row.items():
-                        if hasattr(value, 'isoformat'):
-                            row[key] = str(value)
-                return {
-                    'rows': rows,
-                    'rowcount': len(rows)
-                }
-            else:
-                # INSERT, UPDATE, DELETE, ALTER, etc.
+        Dict avec 'rows' (résultats SELECT) et 'rowcount' (lignes affectées).
+        Un résultat colonnaire venant du cache est partagé : ne pas le modifier
+
+    Raises:
+        DatabaseUnavailableError: Base indisponible ou pool saturé
+    """
+    result = await _cached_query(sql, params)
+    return result if columnar else rows_as_objects(result)
+
+
+async def _cached_query(sql: str, params: tuple = None) -> Dict[str, Any]:
+    if not QUERY_CACHE_CONFIG['enabled']:
+        return await _query(sql, params)
+
+    statement = analyze_sql(sql)
+    if not statement.read:
+        try:
+            return await _query(sql, params)
+        finally:
+            # Même en cas d'erreur : une écriture partielle reste possible
+            invalidate_tables([sql])
+    if not statement.cacheable:
+        query_cache.stats['uncacheable'] += 1
+        return await _query(sql, params)
+    key = f"{statement.key}\0{tuple(params or ())!r}"
+    return await query_cache.fetch(key, statement.tables, lambda: _query(sql, params))
+
+
+async def _query(sql: str, params: tuple = None) -> Dict[str, Any]:
+    async with acquire() as conn:
+        async with conn.cursor() as cursor:
+            return await _execute(cursor, sql, params)
+
+
+@asynccontextmanager
+async def transaction() -> AsyncIterator["aiomysql.Connection"]:
+    """
+    Emprunte une connexion et y ouvre une transaction, validée en sortie.
+
+    Une erreur annule la transaction. Si l'annulation est impossible
+    (connexion perdue) ou si la tâche est annulée, la transaction reste
+    ouverte et le pool ferme la connexion au lieu de la réutiliser.
+
+    Yields:
+        aiomysql.Connection: Connexion dans une transaction
+
+    Raises:
+        DatabaseUnavailableError: Base indisponible ou pool saturé
+    """
+    async with acquire() as conn:
+        await conn.begin()
+        try:
+            yield conn
+        except Exception:
+            try:
+                await conn.rollback()
+            except Exception:
+                conn.close()
+            raise
+        await conn.commit()
+
+
+async def execute_many(sql: str, params_list: List[tuple]) -> Dict[str, Any]:
+    """
+    Exécute une requête pour chaque jeu de paramètres (executemany).
+
+    Les INSERT/REPLACE ... VALUES sont regroupés par aiomysql en INSERT
+    multi-lignes. L'ensemble est exécuté dans une transaction.
+
+    Args:
+        sql: La requête SQL à exécuter
+        params_list: Un tuple de paramètres par exécution
+
+    Returns:
+        Dict avec 'rowcount' (total des lignes affectées) et 'lastrowid'
+
+    Raises:
+        DatabaseUnavailableError: Base indisponible ou pool saturé
+    """
+    try:
+        async with transaction() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.executemany(translate_placeholders(sql), params_list)
                 return {
                     'rows': [],
                     'rowcount': cursor.rowcount,
                     'lastrowid': cursor.lastrowid if cursor.lastrowid else None
                 }
+    finally:
+        invalidate_tables([sql])
+
+
+async def execute_batch(statements: List[Tuple[str, tuple]], columnar: bool = False) -> List[Dict[str, Any]]:
+    """
+    Exécute plusieurs requêtes sur une même connexion, dans une transaction.
+
+    Args:
+        statements: Liste de (sql, params)
+        columnar: True pour les SELECT en colonnes (voir execute_query)
+
+    Returns:
+        List[Dict]: Résultat de chaque requête (voir execute_query)
+
+    Raises:
+        BatchStatementError: Une requête a échoué (rien n'est validé)
+        DatabaseUnavailableError: Base indisponible ou pool saturé
+    """
+    results = []
+    try:
+        async with transaction() as conn:
+            async with conn.cursor() as cursor:
+                for index, (sql, params) in enumerate(statements):
+                    try:
+                        results.append(await _execute(cursor, sql, params))
+                    except aiomysql.MySQLError as e:
+                        raise BatchStatementError(index, e) from e
+    finally:
+        invalidate_tables([sql for sql, _ in statements])
+    return results if columnar else [rows_as_objects(result) for result in results]
+
+class QueryStream:
+    """
+    Résultat d'un SELECT lu au fil de l'eau avec un curseur côté serveur.
+
+    La connexion reste empruntée au pool jusqu'à close() : les lignes
+    restent côté MySQL et ne sont transférées qu'à chaque fetchmany().
+    """
+
+    def __init__(self, ctx, conn: "aiomysql.Connection", cursor: "aiomysql.SSCursor"):
+        """
+        Args:
+            ctx: Context manager acquire() qui détient la connexion
+            conn: Connexion empruntée au pool
+            cursor: Curseur SSCursor sur lequel la requête a été exécutée
+        """
+        self._ctx = ctx
+        self._conn = conn
+        self._cursor = cursor
+        self._finished = False
+        self.columns: List[str] = _column_names(cursor) if cursor.description else []
+        # Sans colonnes (INSERT, UPDATE...) : lignes affectées, sinon lignes lues
+        self.rowcount = 0 if self.columns else cursor.rowcount
+        self.lastrowid = cursor.lastrowid or None
+
+    async def batches(self, size: Optional[int] = None) -> AsyncIterator[List[Sequence]]:
+        """
+        Lit les lignes par lots.
+
+        Args:
+            size: Lignes par lot (défaut : stream_batch_size)
+
+        Yields:
+            List[Sequence]: Lignes du lot, dans l'ordre de self.columns,
+            converties pour JSON
+        """
+        size = size or DB_CONFIG['stream_batch_size']
+        while True:
+            rows = await self._cursor.fetchmany(size)
+            if not rows:
+                break
+            self.rowcount += len(rows)
+            # Convertisseurs choisis par lot (une colonne binaire peut être NULL dans le premier)
+            yield convert_rows(rows, column_converters(self._cursor.description, rows))
+        self._finished = True
+
+    async def close(self) -> None:
+        """Rend la connexion au pool (peut être appelé plusieurs fois)."""
+        if self._ctx is None:
+            return
+        ctx, self._ctx = self._ctx, None
+        try:
+            if self._finished or not self.columns:
+                await self._cursor.close()
+            else:
+                # Lecture interrompue : fermer la connexion plutôt que lire
+                # (et jeter) toutes les lignes restantes ; le pool l'écartera
+                self._conn.close()
+        finally:
+            await ctx.__aexit__(None, None, None)
+
+
+async def open_query_stream(sql: str, params: tuple = None) -> QueryStream:
+    """
+    Exécute une requête avec un curseur côté serveur, sans lire ses lignes.
+
+    Les erreurs SQL sont levées ici, avant tout envoi au client. L'appelant
+    doit appeler close() sur le résultat.
+
+    Args:
+        sql: La requête SQL à exécuter
+        params: Les paramètres (optionnel) pour requêtes préparées
+
+    Returns:
+        QueryStream: Colonnes du résultat et lecture des lignes par lots
+
+    Raises:
+        DatabaseUnavailableError: Base indisponible ou pool saturé
+    """
+    if params:
+        sql = translate_placeholders(sql)
+
+    ctx = acquire()
+    conn = await ctx.__aenter__()
+    try:
+        cursor = await conn.cursor(aiomysql.SSCursor)
+        if params:
+            await cursor.execute(sql, params)
+        else:
+            await cursor.execute(sql)
+    except BaseException as e:
+        if not isinstance(e, aiomysql.MySQLError):
+            # Échange interrompu (annulation, socket) : connexion inutilisable
+            conn.close()
+        await ctx.__aexit__(None, None, None)
+        raise
+    finally:
+        invalidate_tables([sql])
+    return QueryStream(ctx, conn, cursor)
@@ -8,7 +8,8 @@ from urllib.parse import quote, unquote
 
 def generate_directory_listing(path: str, request_path: str, document_root: str) -> bytes:
     """
-    Génère une page HTML listant les fichiers et dossiers
+    Génère une page HTML listant les fichiers et dossiers.
+    Fait des accès disque bloquants : à appeler via le pool d'I/O (run_io).
     
     Args:
         path: Chemin absolu du répertoire
@@ -23,7 +24,9 @@ def generate_directory_listing(path: str, request_path: str, document_root: str)
         return build_error_page("Not a directory")
     
     try:
-        entries = sorted(os.listdir(path))
+        # scandir : type (et taille) de chaque entrée sans stat supplémentaire
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
     except PermissionError:
         return build_error_page("Permission denied")
     
@@ -82,9 +85,12 @@ def generate_directory_listing(path: str, request_path: str, document_root: str)
     files = []
     
     for entry in entries:
-        entry_path = os.path.join(path, entry)
-        if os.path.isdir(entry_path):
-            folders.append(entry)
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if is_dir:
+            folders.append(entry.name)
         else:
             files.append(entry)
     
@@ -103,15 +109,15 @@ def generate_directory_listing(path: str, request_path: str, document_root: str)
         )
     
     # Afficher les fichiers
-    for file in files:
-        file_path = os.path.join(path, file)
+    for entry in files:
+        file = entry.name
         file_url = os.path.join(request_path, file).replace('\\', '/')
         if not file_url.startswith('/'):
             file_url = '/' + file_url
         
         # Taille du fichier
         try:
-            size = os.path.getsize(file_path)
+            size = entry.stat().st_size
             size_str = format_size(size)
         except:
             size_str = "?"
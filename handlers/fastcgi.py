@@ -0,0 +1,573 @@
+"""
+Client FastCGI et pool de workers php-cgi persistants (php-cgi -b sur des
+sockets Unix, ou php-fpm existant).
+Évite le démarrage d'un interpréteur PHP à chaque requête.
+"""
+
+import asyncio
+import os
+import shutil
+import struct
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+from utils.request_body import RequestBody
+
+# Configuration (surchargée par la section "fastcgi" de config.json)
+FASTCGI_CONFIG = {
+    'enabled': True,
+    'workers': 4,                   # Processus php-cgi par processus serveur
+    'max_requests': 500,            # Recyclage d'un worker après N requêtes
+    'health_check_interval': 10,    # Secondes entre deux vérifications
+    'address': None,                # php-fpm existant ("/run/php/fpm.sock" ou "127.0.0.1:9000")
+    'connect_timeout': 3,
+}
+
+# Protocole FastCGI 1.0
+FCGI_VERSION = 1
+FCGI_BEGIN_REQUEST = 1
+FCGI_END_REQUEST = 3
+FCGI_PARAMS = 4
+FCGI_STDIN = 5
+FCGI_STDOUT = 6
+FCGI_STDERR = 7
+FCGI_GET_VALUES = 9
+FCGI_GET_VALUES_RESULT = 10
+
+FCGI_RESPONDER = 1
+FCGI_KEEP_CONN = 1
+FCGI_REQUEST_COMPLETE = 0
+
+RECORD_HEADER = struct.Struct('!BBHHBx')
+MAX_RECORD_CONTENT = 65535
+
+# Une seule requête à la fois par connexion (pas de multiplexage)
+REQUEST_ID = 1
+
+
+class FastCGIError(Exception):
+    """Erreur de communication avec un worker FastCGI."""
+
+
+class FastCGIUnavailableError(FastCGIError):
+    """Aucun worker libéré à temps (tous occupés, ou en échec de redémarrage)."""
+
+
+def encode_record(record_type: int, request_id: int, content: bytes = b'') -> bytes:
+    """
+    Encode un record FastCGI (contenu aligné sur 8 octets).
+
+    Args:
+        record_type: Type du record (FCGI_*)
+        request_id: Identifiant de requête (0 pour les records de gestion)
+        content: Contenu (65535 octets max)
+
+    Returns:
+        bytes: Record prêt à envoyer
+    """
+    padding = -len(content) % 8
+    return (RECORD_HEADER.pack(FCGI_VERSION, record_type, request_id, len(content), padding)
+            + content + b'\0' * padding)
+
+
+def encode_records(record_type: int, request_id: int, data: bytes) -> bytes:
+    """Découpe des données en records d'un flux (sans le record de fin)."""
+    return b''.join(encode_record(record_type, request_id, data[i:i + MAX_RECORD_CONTENT])
+                    for i in range(0, len(data), MAX_RECORD_CONTENT))
+
+
+def encode_stream(record_type: int, request_id: int, data: bytes) -> bytes:
+    """Encode un flux (PARAMS, STDIN) en records suivis du record vide de fin."""
+    return encode_records(record_type, request_id, data) + encode_record(record_type, request_id)
+
+
+def encode_length(length: int) -> bytes:
+    """Longueur d'un nom/valeur : 1 octet si < 128, sinon 4 octets (bit de poids fort à 1)."""
+    if length < 128:
+        return bytes([length])
+    return struct.pack('!I', length | 0x80000000)
+
+
+def encode_params(params: Dict[str, str]) -> bytes:
+    """
+    Encode des paires nom-valeur FastCGI.
+
+    Args:
+        params: Variables CGI
+
+    Returns:
+        bytes: Contenu des records PARAMS
+    """
+    parts = []
+    for name, value in params.items():
+        name_bytes = name.encode('latin-1')
+        value_bytes = str(value).encode('utf-8', errors='surrogateescape')
+        parts.append(encode_length(len(name_bytes)) + encode_length(len(value_bytes))
+                     + name_bytes + value_bytes)
+    return b''.join(parts)
+
+
+async def read_record(reader: asyncio.StreamReader) -> Tuple[int, int, bytes]:
+    """
+    Lit un record FastCGI.
+
+    Returns:
+        Tuple: (type, request_id, contenu)
+
+    Raises:
+        FastCGIError: Si la connexion est fermée ou le record invalide
+    """
+    try:
+        header = await reader.readexactly(RECORD_HEADER.size)
+        version, record_type, request_id, length, padding = RECORD_HEADER.unpack(header)
+        if version != FCGI_VERSION:
+            raise FastCGIError(f"Version FastCGI inattendue: {version}")
+        data = await reader.readexactly(length + padding)
+    except (asyncio.IncompleteReadError, ConnectionError) as e:
+        raise FastCGIError(f"Connexion FastCGI interrompue: {e}") from e
+    return record_type, request_id, data[:length]
+
+
+async def send_request(writer: asyncio.StreamWriter, params: Dict[str, str],
+                       stdin: Union[bytes, RequestBody] = b'', request_id: int = REQUEST_ID) -> None:
+    """
+    Envoie une requête FastCGI (rôle Responder) sur une connexion ouverte.
+
+    La connexion reste ouverte après la réponse (FCGI_KEEP_CONN).
+
+    Args:
+        writer: Connexion vers le worker
+        params: Variables CGI
+        stdin: Corps de la requête ; un RequestBody est transmis au fil de sa lecture
+        request_id: Identifiant de requête
+    """
+    writer.write(encode_record(FCGI_BEGIN_REQUEST, request_id,
+                               struct.pack('!HB5x', FCGI_RESPONDER, FCGI_KEEP_CONN)))
+    writer.write(encode_stream(FCGI_PARAMS, request_id, encode_params(params)))
+    try:
+        if isinstance(stdin, RequestBody):
+            async for data in stdin.chunks():
+                writer.write(encode_records(FCGI_STDIN, request_id, data))
+                await writer.drain()
+            writer.write(encode_record(FCGI_STDIN, request_id))
+        else:
+            writer.write(encode_stream(FCGI_STDIN, request_id, stdin))
+        await writer.drain()
+    except ConnectionError as e:
+        raise FastCGIError(f"Envoi FastCGI impossible: {e}") from e
+
+
+class FastCGIStream:
+    """
+    Réponse d'un worker lue au fil de l'eau (records STDOUT).
+    Le worker est rendu au pool par close().
+    """
+
+    def __init__(self, pool: 'FastCGIPool', worker: 'FastCGIWorker'):
+        self.pool = pool
+        self.worker = worker
+        self.stderr_parts: List[bytes] = []
+        self.app_status: Optional[int] = None   # None tant que END_REQUEST n'est pas reçu
+        self.failed = False
+        self.killed = False
+        self.closed = False
+
+    @property
+    def stderr(self) -> bytes:
+        return b''.join(self.stderr_parts)
+
+    async def read(self) -> bytes:
+        """
+        Lit le prochain morceau de la sortie du script.
+
+        Returns:
+            bytes: Données de STDOUT, b'' à la fin de la réponse
+
+        Raises:
+            FastCGIError: Si le worker meurt en cours de réponse
+        """
+        if self.app_status is not None:
+            return b''
+        try:
+            while True:
+                record_type, request_id, content = await read_record(self.worker.reader)
+                if request_id != REQUEST_ID:
+                    continue
+                if record_type == FCGI_STDOUT and content:
+                    return content
+                if record_type == FCGI_STDERR:
+                    self.stderr_parts.append(content)
+                elif record_type == FCGI_END_REQUEST:
+                    app_status, protocol_status = struct.unpack('!IB3x', content)
+                    if protocol_status != FCGI_REQUEST_COMPLETE:
+                        raise FastCGIError(f"Requête refusée par le worker (statut {protocol_status})")
+                    self.app_status = app_status
+                    return b''
+        except FastCGIError:
+            self.failed = True
+            raise
+
+    async def kill(self) -> None:
+        """Abandonne un script trop long : le worker sera redémarré par close()."""
+        self.killed = True
+
+    async def close(self) -> None:
+        """Rend le worker au pool (connexion fermée si la réponse n'a pas été lue jusqu'au bout)."""
+        if not self.closed:
+            self.closed = True
+            self.pool.release(self.worker, complete=self.app_status is not None,
+                              failed=self.failed or self.killed,
+                              reason='killed' if self.killed else 'crashes')
+
+
+def parse_address(address: str):
+    """
+    Interprète une adresse FastCGI.
+
+    Returns:
+        Tuple: ('unix', chemin) ou ('tcp', (hôte, port))
+    """
+    if not address.startswith('/') and ':' in address:
+        host, _, port = address.rpartition(':')
+        return 'tcp', (host, int(port))
+    return 'unix', address
+
+
+class FastCGIWorker:
+    """
+    Un worker FastCGI : un processus php-cgi -b (géré par le pool) ou un slot
+    de connexion vers un php-fpm externe, avec sa connexion persistante.
+    """
+
+    def __init__(self, address: str, php_cgi_path: Optional[str] = None):
+        """
+        Args:
+            address: Socket Unix ou host:port du worker
+            php_cgi_path: Binaire à lancer (None = serveur externe, ex: php-fpm)
+        """
+        self.address = address
+        self.php_cgi_path = php_cgi_path
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.requests = 0
+        self.restarts = 0
+        self.started_at = 0.0
+
+    async def spawn(self) -> None:
+        """
+        Lance php-cgi en mode FastCGI et attend que la socket soit prête.
+
+        Raises:
+            FastCGIError: Si le processus ne démarre pas
+        """
+        self.requests = 0
+        self.started_at = time.time()
+        if not self.php_cgi_path:
+            return
+
+        if os.path.exists(self.address):
+            os.remove(self.address)
+        env = {
+            'PATH': os.environ.get('PATH', ''),
+            'PHP_FCGI_CHILDREN': '0',       # Un seul processus, pas de fork interne
+            'PHP_FCGI_MAX_REQUESTS': '0',   # Le recyclage est géré par le pool
+        }
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                self.php_cgi_path, '-b', self.address,
+                env=env,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+        except OSError as e:
+            raise FastCGIError(f"Lancement de {self.php_cgi_path} impossible: {e}") from e
+
+        deadline = time.monotonic() + FASTCGI_CONFIG['connect_timeout']
+        while not os.path.exists(self.address):
+            if self.process.returncode is not None or time.monotonic() > deadline:
+                await self.stop()
+                raise FastCGIError(f"php-cgi n'a pas ouvert {self.address}")
+            await asyncio.sleep(0.02)
+
+    def is_alive(self) -> bool:
+        """True si le processus php-cgi tourne (toujours True pour un serveur externe)."""
+        return self.process is None or self.process.returncode is None
+
+    async def connect(self) -> None:
+        """Ouvre la connexion persistante vers le worker."""
+        kind, target = parse_address(self.address)
+        try:
+            if kind == 'unix':
+                connection = asyncio.open_unix_connection(target)
+            else:
+                connection = asyncio.open_connection(*target)
+            self.reader, self.writer = await asyncio.wait_for(
+                connection, FASTCGI_CONFIG['connect_timeout'])
+        except (OSError, asyncio.TimeoutError) as e:
+            raise FastCGIError(f"Connexion à {self.address} impossible: {e}") from e
+
+    def close_connection(self) -> None:
+        """Ferme la connexion persistante."""
+        if self.writer:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def probe(self) -> bool:
+        """
+        Vérifie que le worker répond (FCGI_GET_VALUES sur une nouvelle connexion).
+
+        php-cgi ne sert qu'une connexion à la fois : la connexion persistante
+        est fermée avant la sonde et rouverte à la requête suivante.
+        """
+        if not self.is_alive():
+            return False
+        self.close_connection()
+        try:
+            await self.connect()
+            self.writer.write(encode_record(FCGI_GET_VALUES, 0, encode_params({'FCGI_MPXS_CONNS': ''})))
+            await self.writer.drain()
+            record_type, _, _ = await asyncio.wait_for(
+                read_record(self.reader), FASTCGI_CONFIG['connect_timeout'])
+            return record_type == FCGI_GET_VALUES_RESULT
+        except (FastCGIError, OSError, asyncio.TimeoutError):
+            return False
+        finally:
+            # php-cgi ferme la connexion après un record de gestion
+            self.close_connection()
+
+    async def stop(self) -> None:
+        """Arrête le processus php-cgi et ferme la connexion."""
+        self.close_connection()
+        if self.process and self.process.returncode is None:
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), 2)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        self.process = None
+
+    async def restart(self) -> None:
+        """Remplace le processus php-cgi (crash, sonde échouée ou recyclage)."""
+        await self.stop()
+        self.restarts += 1
+        await self.spawn()
+
+
+class FastCGIPool:
+    """Pool de workers FastCGI avec recyclage et vérifications périodiques."""
+
+    def __init__(self, php_cgi_path: str, size: int = 4, max_requests: int = 500,
+                 health_check_interval: float = 10, address: Optional[str] = None,
+                 acquire_timeout: Optional[float] = None):
+        """
+        Args:
+            php_cgi_path: Binaire php-cgi à lancer
+            size: Nombre de workers
+            max_requests: Requêtes avant recyclage d'un worker (0 = jamais)
+            health_check_interval: Secondes entre deux vérifications (0 = aucune)
+            address: Serveur FastCGI externe (php-fpm) ; None = lancer php-cgi -b
+            acquire_timeout: Attente maximale d'un worker libre en secondes (None = illimitée)
+        """
+        self.php_cgi_path = php_cgi_path
+        self.size = size
+        self.max_requests = max_requests
+        self.health_check_interval = health_check_interval
+        self.address = address
+        self.acquire_timeout = acquire_timeout or None
+        self.socket_dir: Optional[str] = None
+        self.workers: List[FastCGIWorker] = []
+        self.idle: asyncio.Queue = asyncio.Queue()
+        self.broken = set()
+        self.health_task: Optional[asyncio.Task] = None
+        self.stats = {'requests': 0, 'errors': 0, 'recycled': 0, 'crashes': 0, 'killed': 0,
+                      'acquire_timeouts': 0}
+
+    async def start(self) -> None:
+        """
+        Lance les workers.
+
+        Raises:
+            FastCGIError: Si aucun worker n'a pu démarrer
+        """
+        if self.address is None:
+            self.socket_dir = tempfile.mkdtemp(prefix='progsys-php-')
+
+        for index in range(self.size):
+            if self.address is None:
+                worker = FastCGIWorker(os.path.join(self.socket_dir, f'php-{index}.sock'),
+                                       self.php_cgi_path)
+            else:
+                worker = FastCGIWorker(self.address)
+            try:
+                await worker.spawn()
+            except FastCGIError as e:
+                print(f"FastCGI: {e}")
+                continue
+            self.workers.append(worker)
+            self.idle.put_nowait(worker)
+
+        if not self.workers:
+            self._remove_socket_dir()
+            raise FastCGIError("aucun worker PHP disponible")
+
+        if self.health_check_interval:
+            self.health_task = asyncio.create_task(self._health_loop())
+
+    async def open_stream(self, params: Dict[str, str],
+                          stdin: Union[bytes, RequestBody] = b'') -> FastCGIStream:
+        """
+        Envoie une requête au premier worker libre.
+
+        Returns:
+            FastCGIStream: Réponse à lire avec read(), puis close()
+
+        Raises:
+            FastCGIUnavailableError: Si aucun worker ne se libère en acquire_timeout
+                                     secondes (ex: tous en échec de redémarrage)
+            FastCGIError: Si le worker est injoignable (il est alors redémarré)
+        """
+        try:
+            worker = await asyncio.wait_for(self.idle.get(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.stats['acquire_timeouts'] += 1
+            raise FastCGIUnavailableError(
+                f"aucun worker libre en {self.acquire_timeout}s ({len(self.broken)} en échec)"
+            ) from None
+        self.stats['requests'] += 1
+        try:
+            if worker.writer is None or worker.writer.is_closing():
+                await worker.connect()
+            await send_request(worker.writer, params, stdin)
+        except FastCGIError:
+            self.release(worker, complete=False, failed=True)
+            raise
+        except BaseException:
+            # Requête annulée : l'état de la connexion est inconnu
+            self.release(worker, complete=False)
+            raise
+        return FastCGIStream(self, worker)
+
+    def release(self, worker: FastCGIWorker, complete: bool, failed: bool = False,
+                reason: str = 'crashes') -> None:
+        """
+        Remet un worker dans le pool après une requête.
+
+        Args:
+            worker: Worker utilisé
+            complete: True si la réponse a été lue jusqu'à END_REQUEST
+            failed: True si le worker doit être redémarré (plus de réponse, ou script tué)
+            reason: Compteur incrémenté au redémarrage ('crashes' ou 'killed')
+        """
+        if failed:
+            if reason == 'crashes':
+                self.stats['errors'] += 1
+            worker.close_connection()
+            asyncio.create_task(self._restart(worker, reason))
+            return
+        if not complete:
+            # Réponse abandonnée (client parti) : records restants non lus
+            worker.close_connection()
+        worker.requests += 1
+        if self.max_requests and worker.requests >= self.max_requests and worker.process:
+            asyncio.create_task(self._restart(worker, 'recycled'))
+        else:
+            self.idle.put_nowait(worker)
+
+    async def _restart(self, worker: FastCGIWorker, reason: str) -> None:
+        """Redémarre un worker hors du chemin de la requête puis le remet dans le pool."""
+        self.stats[reason] += 1
+        try:
+            await worker.restart()
+        except FastCGIError as e:
+            # Retenté à la prochaine vérification
+            print(f"FastCGI: redémarrage échoué ({e})")
+            self.broken.add(worker)
+            return
+        self.broken.discard(worker)
+        self.idle.put_nowait(worker)
+
+    async def _health_loop(self) -> None:
+        """Vérifie périodiquement les workers libres et relance ceux qui ne répondent plus."""
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+
+            for worker in list(self.broken):
+                await self._restart(worker, 'crashes')
+
+            for _ in range(self.idle.qsize()):
+                worker = self.idle.get_nowait()
+                if await worker.probe():
+                    self.idle.put_nowait(worker)
+                else:
+                    await self._restart(worker, 'crashes')
+
+    def get_stats(self) -> Dict:
+        """Retourne les statistiques du pool."""
+        return {
+            **self.stats,
+            'workers': len(self.workers),
+            'idle': self.idle.qsize(),
+            'broken': len(self.broken),
+            'alive': sum(1 for w in self.workers if w.is_alive()),
+        }
+
+    def _remove_socket_dir(self) -> None:
+        if self.socket_dir:
+            shutil.rmtree(self.socket_dir, ignore_errors=True)
+            self.socket_dir = None
+
+    async def stop(self) -> None:
+        """Arrête tous les workers."""
+        if self.health_task:
+            self.health_task.cancel()
+        for worker in self.workers:
+            await worker.stop()
+        self.workers = []
+        self._remove_socket_dir()
+
+
+# Pool du processus courant (None = exécution CGI classique)
+pool: Optional[FastCGIPool] = None
+
+
+async def start_pool(php_cgi_path: str, acquire_timeout: Optional[float] = None) -> Optional[FastCGIPool]:
+    """
+    Démarre le pool selon FASTCGI_CONFIG (à appeler dans la boucle asyncio).
+
+    Args:
+        php_cgi_path: Binaire php-cgi
+        acquire_timeout: Attente maximale d'un worker libre (queue_timeout du limiteur PHP)
+
+    Returns:
+        FastCGIPool démarré, ou None (repli sur le CGI classique)
+    """
+    global pool
+    if not FASTCGI_CONFIG['enabled']:
+        return None
+    candidate = FastCGIPool(
+        php_cgi_path,
+        size=FASTCGI_CONFIG['workers'],
+        max_requests=FASTCGI_CONFIG['max_requests'],
+        health_check_interval=FASTCGI_CONFIG['health_check_interval'],
+        address=FASTCGI_CONFIG['address'],
+        acquire_timeout=acquire_timeout,
+    )
+    try:
+        await candidate.start()
+    except FastCGIError as e:
+        print(f"FastCGI indisponible ({e}), repli sur CGI")
+        return None
+    pool = candidate
+    return pool
+
+
+async def stop_pool() -> None:
+    """Arrête le pool du processus courant."""
+    global pool
+    if pool:
+        await pool.stop()
+        pool = None
@@ -0,0 +1,379 @@
+"""
+Surveillance du document_root (inotify, ou polling en repli) et cache des
+appels stat() : les hits du cache statique n'ont plus besoin de syscalls.
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import os
+import stat as stat_module
+import struct
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.io_pool import run_io
+
+# Masque des événements inotify utiles
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+EVENT_HEADER = struct.Struct('iIII')
+
+# Callback appelé avec le chemin modifié, ou None si tout doit être invalidé
+ChangeCallback = Callable[[Optional[str]], None]
+
+# Callback appelé si une surveillance ne peut pas être posée (repli sur le polling)
+ErrorCallback = Callable[[OSError], None]
+
+
+class StatCache:
+    """
+    Cache des résultats de os.stat().
+
+    - Avec un watcher actif : les entrées restent valides jusqu'à un
+      événement de modification (ttl=None).
+    - Sans watcher : les entrées expirent après ttl secondes.
+    - ttl=0 : pas de cache (un stat par appel).
+    """
+
+    def __init__(self, ttl: Optional[float] = 0, max_entries: int = 10000):
+        """
+        Args:
+            ttl: Durée de validité en secondes (None = jusqu'à invalidation)
+            max_entries: Nombre max de chemins mémorisés (vidé au-delà)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: Dict[str, Tuple[Optional[os.stat_result], float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def stat(self, path: str) -> Optional[os.stat_result]:
+        """
+        Retourne le stat du chemin (None s'il n'existe pas).
+
+        Args:
+            path: Chemin à tester
+
+        Returns:
+            os.stat_result ou None
+        """
+        if self.ttl != 0:
+            entry = self.entries.get(path)
+            if entry is not None and (self.ttl is None or time.monotonic() - entry[1] < self.ttl):
+                self.hits += 1
+                return entry[0]
+
+        self.misses += 1
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+
+        if self.ttl != 0:
+            if len(self.entries) >= self.max_entries:
+                self.entries.clear()
+            self.entries[path] = (st, time.monotonic())
+        return st
+
+    def is_fresh(self, path: str) -> bool:
+        """True si stat(path) sera servi depuis le cache (sans appel système)."""
+        if self.ttl == 0:
+            return False
+        entry = self.entries.get(path)
+        return entry is not None and (self.ttl is None or time.monotonic() - entry[1] < self.ttl)
+
+    def exists(self, path: str) -> bool:
+        """Équivalent de os.path.exists."""
+        return self.stat(path) is not None
+
+    def isfile(self, path: str) -> bool:
+        """Équivalent de os.path.isfile."""
+        st = self.stat(path)
+        return st is not None and stat_module.S_ISREG(st.st_mode)
+
+    def isdir(self, path: str) -> bool:
+        """Équivalent de os.path.isdir."""
+        st = self.stat(path)
+        return st is not None and stat_module.S_ISDIR(st.st_mode)
+
+    def invalidate(self, path: str) -> None:
+        """Oublie le stat d'un chemin."""
+        self.entries.pop(path, None)
+
+    def clear(self) -> None:
+        """Oublie tous les stats."""
+        self.entries.clear()
+
+    def get_stats(self) -> Dict:
+        """Retourne les statistiques du cache de stat."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.entries),
+            'ttl': self.ttl,
+        }
+
+
+class InotifyWatcher:
+    """Surveillance récursive d'un répertoire via inotify (Linux)."""
+
+    def __init__(self, root: str, on_change: ChangeCallback,
+                 on_error: Optional[ErrorCallback] = None):
+        """
+        Args:
+            root: Répertoire à surveiller
+            on_change: Appelé pour chaque chemin modifié
+            on_error: Appelé si un nouveau répertoire ne peut pas être surveillé
+                      (ex: limite max_user_watches atteinte)
+
+        Raises:
+            OSError: Si inotify n'est pas disponible
+        """
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify n'est disponible que sous Linux")
+
+        self.root = root
+        self.on_change = on_change
+        self.on_error = on_error
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 a échoué")
+        self.watches: Dict[int, str] = {}
+
+    def _add_tree(self, directory: str) -> List[str]:
+        """
+        Ajoute une surveillance sur un répertoire et ses sous-répertoires.
+
+        Returns:
+            List: Chemins présents dans l'arborescence (répertoires et fichiers)
+
+        Raises:
+            OSError: Si un répertoire ne peut pas être surveillé
+        """
+        paths = []
+        for dirpath, dirnames, filenames in os.walk(directory):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(dirpath), WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error in (errno.ENOENT, errno.ENOTDIR):
+                    # Supprimé entre le parcours et la surveillance
+                    continue
+                raise OSError(error, f"inotify_add_watch a échoué sur {dirpath}: {os.strerror(error)}")
+            self.watches[wd] = dirpath
+            paths.extend(os.path.join(dirpath, name) for name in dirnames + filenames)
+        return paths
+
+    def start(self) -> None:
+        """
+        Démarre la surveillance dans la boucle asyncio courante.
+
+        Raises:
+            OSError: Si l'arborescence ne peut pas être surveillée en entier
+        """
+        try:
+            self._add_tree(self.root)
+        except OSError:
+            os.close(self.fd)
+            raise
+        asyncio.get_running_loop().add_reader(self.fd, self._read_events)
+
+    def stop(self) -> None:
+        """Arrête la surveillance."""
+        try:
+            asyncio.get_running_loop().remove_reader(self.fd)
+        except RuntimeError:
+            pass
+        os.close(self.fd)
+
+    def _read_events(self) -> None:
+        """Lit et traite les événements disponibles sur le descripteur inotify."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b'\0')
+            offset += name_len
+
+            if mask & IN_Q_OVERFLOW:
+                # Événements perdus : tout invalider
+                self.on_change(None)
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, os.fsdecode(name)) if name else directory
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        created = self._add_tree(path)
+                    except OSError as e:
+                        # Sous-arborescence non surveillée : watcher plus fiable
+                        if self.on_error:
+                            self.on_error(e)
+                        else:
+                            print(f"Watcher inotify: {e}")
+                            self.on_change(None)
+                        return
+                    # Fichiers écrits avant la pose de la surveillance : aucun
+                    # événement ne les signalera (stats négatifs en cache)
+                    for child in created:
+                        self.on_change(child)
+                if mask & (IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF):
+                    # Arborescence déplacée/supprimée : chemins inconnus
+                    self.on_change(None)
+                    continue
+            self.on_change(path)
+
+
+class PollingWatcher:
+    """Surveillance par parcours périodique (repli portable)."""
+
+    def __init__(self, root: str, on_change: ChangeCallback, interval: float = 2.0):
+        """
+        Args:
+            root: Répertoire à surveiller
+            on_change: Appelé pour chaque chemin modifié
+            interval: Secondes entre deux parcours
+        """
+        self.root = root
+        self.on_change = on_change
+        self.interval = interval
+        self.snapshot: Dict[str, Tuple[int, int]] = {}
+        self.task: Optional[asyncio.Task] = None
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """Relève (mtime, taille) de chaque entrée (bloquant, exécuté dans le pool d'I/O)."""
+        snapshot = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            for name in dirnames + filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    async def _run(self) -> None:
+        """Boucle de polling."""
+        self.snapshot = await run_io(self._scan)
+        while True:
+            await asyncio.sleep(self.interval)
+            snapshot = await run_io(self._scan)
+            for path in self.snapshot.keys() | snapshot.keys():
+                if self.snapshot.get(path) != snapshot.get(path):
+                    self.on_change(path)
+            self.snapshot = snapshot
+
+    def start(self) -> None:
+        """Démarre la surveillance dans la boucle asyncio courante."""
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        """Arrête la surveillance."""
+        if self.task:
+            self.task.cancel()
+
+
+# Cache des stat() partagé par server.py et les handlers
+stat_cache = StatCache()
+
+# Watcher actif (None si désactivé)
+watcher = None
+
+
+def watcher_active() -> bool:
+    """True si un watcher invalide les caches sur modification."""
+    return watcher is not None
+
+
+def start_watcher(root: str, on_change: ChangeCallback, mode: str = 'auto',
+                  poll_interval: float = 2.0, stat_ttl: float = 1.0) -> Optional[str]:
+    """
+    Démarre la surveillance du document_root (à appeler dans la boucle asyncio).
+
+    Args:
+        root: Répertoire à surveiller
+        on_change: Appelé avec chaque chemin modifié (None = tout invalider)
+        mode: 'auto' (inotify sinon polling), 'inotify', 'polling' ou 'off'
+        poll_interval: Intervalle du polling en secondes
+        stat_ttl: Validité des stats en cache quand aucun watcher ne tourne
+
+    Returns:
+        str: Mode effectivement utilisé ('inotify', 'polling' ou None)
+    """
+    global watcher
+
+    def handle_change(path: Optional[str]) -> None:
+        if path is None:
+            stat_cache.clear()
+        else:
+            stat_cache.invalidate(path)
+        on_change(path)
+
+    def fall_back(error: OSError) -> None:
+        global watcher
+        print(f"{error}, repli sur le polling")
+        watcher.stop()
+        watcher = PollingWatcher(root, handle_change, poll_interval)
+        watcher.start()
+        # Modifications peut-être manquées jusqu'ici
+        handle_change(None)
+
+    watcher = None
+    if mode in ('auto', 'inotify'):
+        try:
+            watcher = InotifyWatcher(root, handle_change, fall_back)
+            watcher.start()
+            mode = 'inotify'
+        except (OSError, AttributeError) as e:
+            watcher = None
+            if mode == 'inotify':
+                print(f"inotify indisponible ({e}), repli sur le polling")
+            mode = 'polling'
+    if mode == 'polling':
+        watcher = PollingWatcher(root, handle_change, poll_interval)
+        watcher.start()
+
+    # Avec un watcher, les stats restent valides jusqu'à invalidation
+    stat_cache.ttl = None if watcher else stat_ttl
+    stat_cache.clear()
+    return mode if watcher else None
+
+
+def stop_watcher() -> None:
+    """Arrête la surveillance (les stats en cache ne sont plus fiables)."""
+    global watcher
+    if watcher:
+        watcher.stop()
+        watcher = None
+    stat_cache.ttl = 0
+    stat_cache.clear()
@@ -2,12 +2,20 @@
 Module de monitoring des performances du serveur
 """
 
+import asyncio
+import json
+import os
 import time
 import threading
 from collections import deque
 from typing import Dict, List, Optional
 from datetime import datetime
 
+from handlers.directory_listing import format_size
+
+# Retard de boucle (secondes) au-delà duquel un échantillon compte comme un blocage
+LOOP_STALL_THRESHOLD = 0.1
+
 class PerformanceMonitor:
     """Moniteur de performance du serveur HTTP"""
     
@@ -38,6 +46,96 @@ class PerformanceMonitor:
             'capacity': 0
         }
         
+        # Exécution PHP : file d'admission et scripts tués
+        self.php_stats = {
+            'limit': 0,             # Exécutions simultanées autorisées
+            'active': 0,
+            'queued': 0,
+            'max_queued': 0,
+            'executions': 0,
+            'rejected': 0,          # File pleine
+            'queue_timeouts': 0,    # Attente trop longue (503)
+            'killed': 0,            # Scripts dépassant le timeout
+            'wait_total': 0.0,
+            'wait_max': 0.0,
+        }
+
+        # Micro-cache PHP (mis à jour depuis l'extérieur)
+        self.php_cache_stats = {
+            'enabled': False,
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'stored': 0,
+            'size': 0,
+            'bytes': 0,
+        }
+
+        # Boucle asyncio : retard mesuré par measure_loop_lag()
+        self.loop_stats = {
+            'lag_last': 0.0,
+            'lag_max': 0.0,
+            'lag_total': 0.0,
+            'samples': 0,
+            'stalls': 0,            # Échantillons au-delà de LOOP_STALL_THRESHOLD
+        }
+
+        # Pool d'I/O disque (mis à jour depuis l'extérieur)
+        self.io_stats = {
+            'threads': 0,
+            'tasks': 0,
+            'active': 0,
+            'queued': 0,
+            'max_queued': 0,
+        }
+
+        # Pool FastCGI (mis à jour depuis l'extérieur, vide en mode CGI)
+        self.fastcgi_stats = {
+            'workers': 0,
+            'alive': 0,
+            'idle': 0,
+            'broken': 0,
+            'requests': 0,
+            'errors': 0,
+            'crashes': 0,
+            'recycled': 0,
+            'killed': 0,
+            'acquire_timeouts': 0,
+        }
+
+        # Pool MySQL (mis à jour depuis l'extérieur)
+        self.db_stats = {
+            'connected': False,
+            'in_use': 0,
+            'idle': 0,
+            'size': 0,
+            'maxsize': 0,
+            'waiting': 0,
+            'max_waiting': 0,
+            'acquired': 0,
+            'timeouts': 0,
+            'pings': 0,
+            'ping_failures': 0,
+            'acquire_total': 0.0,
+            'acquire_max': 0.0,
+            'acquire_histogram': {},
+        }
+
+        # Cache des résultats SQL (mis à jour depuis l'extérieur)
+        self.query_cache_stats = {
+            'enabled': False,
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'stored': 0,
+            'expired': 0,
+            'stale': 0,
+            'invalidations': 0,
+            'uncacheable': 0,
+            'size': 0,
+            'bytes': 0,
+        }
+
         # Compteur de requêtes par seconde
         self.requests_per_second = deque(maxlen=60)  # 60 dernières secondes
         self.current_second_requests = 0
@@ -102,6 +200,66 @@ class PerformanceMonitor:
         with self.lock:
             self.cache_stats = cache_stats
     
+    def update_io_stats(self, io_stats: Dict):
+        """Met à jour les stats du pool d'I/O"""
+        with self.lock:
+            self.io_stats = io_stats
+
+    def update_fastcgi_stats(self, fastcgi_stats: Dict):
+        """Met à jour les stats du pool FastCGI"""
+        with self.lock:
+            self.fastcgi_stats = fastcgi_stats
+
+    def update_db_stats(self, db_stats: Dict):
+        """Met à jour les stats du pool MySQL"""
+        with self.lock:
+            self.db_stats = db_stats
+
+    def record_loop_lag(self, lag: float):
+        """Enregistre un échantillon de retard de la boucle asyncio (secondes)"""
+        with self.lock:
+            self.loop_stats['lag_last'] = lag
+            self.loop_stats['lag_max'] = max(self.loop_stats['lag_max'], lag)
+            self.loop_stats['lag_total'] += lag
+            self.loop_stats['samples'] += 1
+            if lag > LOOP_STALL_THRESHOLD:
+                self.loop_stats['stalls'] += 1
+
+    def update_php_cache_stats(self, php_cache_stats: Dict):
+        """Met à jour les stats du micro-cache PHP"""
+        with self.lock:
+            self.php_cache_stats = php_cache_stats
+
+    def update_query_cache_stats(self, query_cache_stats: Dict):
+        """Met à jour les stats du cache de résultats SQL"""
+        with self.lock:
+            self.query_cache_stats = query_cache_stats
+
+    def update_php_queue(self, limit: int, active: int, queued: int):
+        """Met à jour l'occupation du limiteur PHP"""
+        with self.lock:
+            self.php_stats['limit'] = limit
+            self.php_stats['active'] = active
+            self.php_stats['queued'] = queued
+            self.php_stats['max_queued'] = max(self.php_stats['max_queued'], queued)
+
+    def record_php_admission(self, wait: float):
+        """Enregistre le démarrage d'un script PHP après wait secondes d'attente"""
+        with self.lock:
+            self.php_stats['executions'] += 1
+            self.php_stats['wait_total'] += wait
+            self.php_stats['wait_max'] = max(self.php_stats['wait_max'], wait)
+
+    def record_php_rejection(self, reason: str):
+        """Enregistre un refus du limiteur PHP ('rejected' ou 'queue_timeouts')"""
+        with self.lock:
+            self.php_stats[reason] += 1
+
+    def record_php_kill(self):
+        """Enregistre un script PHP tué pour dépassement du timeout"""
+        with self.lock:
+            self.php_stats['killed'] += 1
+
     def get_stats(self) -> Dict:
         """Retourne toutes les statistiques"""
         with self.lock:
@@ -139,15 +297,180 @@ class PerformanceMonitor:
                     'misses': self.cache_stats.get('misses', 0),
                     'hit_rate': self._calculate_hit_rate(),
                     'size': self.cache_stats.get('size', 0),
-                    'capacity': self.cache_stats.get('capacity', 0)
+                    'capacity': self.cache_stats.get('capacity', 0),
+                    'bytes': self.cache_stats.get('bytes', 0),
+                    'max_bytes': self.cache_stats.get('max_bytes', 0),
+                    'evictions': self.cache_stats.get('evictions', 0),
+                    'bytes_evicted': self.cache_stats.get('bytes_evicted', 0),
+                    'rejected_too_large': self.cache_stats.get('rejected_too_large', 0),
+                    'admission_rejections': self.cache_stats.get('admission_rejections', 0),
+                    'loads': self.cache_stats.get('loads', 0),
+                    'coalesced_loads': self.cache_stats.get('coalesced_loads', 0),
+                    'policy': self.cache_stats.get('policy', 'lru')
+                },
+                'php': {
+                    **self.php_stats,
+                    'wait_avg_ms': round(self.php_stats['wait_total'] / self.php_stats['executions'] * 1000, 2)
+                                   if self.php_stats['executions'] else 0,
+                    'wait_max_ms': round(self.php_stats['wait_max'] * 1000, 2),
+                },
+                'loop': {
+                    'lag_ms': round(self.loop_stats['lag_last'] * 1000, 2),
+                    'lag_avg_ms': round(self.loop_stats['lag_total'] / self.loop_stats['samples'] * 1000, 2)
+                                  if self.loop_stats['samples'] else 0,
+                    'lag_max_ms': round(self.loop_stats['lag_max'] * 1000, 2),
+                    'stalls': self.loop_stats['stalls'],
+                },
+                'io': dict(self.io_stats),
+                'fastcgi': dict(self.fastcgi_stats),
+                'database': {
+                    **self.db_stats,
+                    'acquire_avg_ms': round(self.db_stats['acquire_total'] / self.db_stats['acquired'] * 1000, 2)
+                                      if self.db_stats['acquired'] else 0,
+                    'acquire_max_ms': round(self.db_stats['acquire_max'] * 1000, 2),
+                },
+                'query_cache': {
+                    **self.query_cache_stats,
+                    'hit_rate': self._calculate_hit_rate(self.query_cache_stats),
+                },
+                'php_cache': {
+                    **self.php_cache_stats,
+                    'hit_rate': self._calculate_hit_rate(self.php_cache_stats),
                 },
                 'recent_requests': list(self.requests_history)[-20:]
             }
     
-    def _calculate_hit_rate(self) -> str:
-        """Calcule le taux de cache hits"""
-        hits = self.cache_stats.get('hits', 0)
-        misses = self.cache_stats.get('misses', 0)
+    def export_state(self) -> Dict:
+        """
+        Exporte les compteurs bruts (sérialisables en JSON) pour
+        l'agrégation entre workers.
+        """
+        with self.lock:
+            return {
+                'pid': os.getpid(),
+                'start_time': self.start_time,
+                'total_requests': self.total_requests,
+                'requests_by_method': dict(self.requests_by_method),
+                'requests_by_status': {str(k): v for k, v in self.requests_by_status.items()},
+                'requests_by_path': dict(self.requests_by_path),
+                'request_times': list(self.request_times),
+                'min_latency': self.min_latency if self.min_latency != float('inf') else None,
+                'max_latency': self.max_latency,
+                'total_latency': self.total_latency,
+                'requests_history': list(self.requests_history),
+                'requests_per_second': list(self.requests_per_second),
+                'cache_stats': dict(self.cache_stats),
+                'php_stats': dict(self.php_stats),
+                'php_cache_stats': dict(self.php_cache_stats),
+                'query_cache_stats': dict(self.query_cache_stats),
+                'loop_stats': dict(self.loop_stats),
+                'io_stats': dict(self.io_stats),
+                'fastcgi_stats': dict(self.fastcgi_stats),
+                'db_stats': dict(self.db_stats),
+            }
+
+    def merge_state(self, state: Dict):
+        """
+        Ajoute les compteurs exportés par un autre worker à ce moniteur.
+
+        Args:
+            state: Compteurs issus de export_state()
+        """
+        with self.lock:
+            self.start_time = min(self.start_time, state['start_time'])
+            self.total_requests += state['total_requests']
+            _sum_into(self.requests_by_method, state['requests_by_method'])
+            _sum_into(self.requests_by_status,
+                      {int(k): v for k, v in state['requests_by_status'].items()})
+            _sum_into(self.requests_by_path, state['requests_by_path'])
+
+            self.request_times.extend(state['request_times'])
+            if state['min_latency'] is not None:
+                self.min_latency = min(self.min_latency, state['min_latency'])
+            self.max_latency = max(self.max_latency, state['max_latency'])
+            self.total_latency += state['total_latency']
+
+            history = list(self.requests_history) + state['requests_history']
+            history.sort(key=lambda r: r['timestamp'])
+            self.requests_history = deque(history, maxlen=self.max_requests_history)
+
+            # Additionner seconde par seconde, alignées sur la plus récente
+            ours = list(self.requests_per_second)
+            theirs = state['requests_per_second']
+            length = max(len(ours), len(theirs))
+            ours = [0] * (length - len(ours)) + ours
+            theirs = [0] * (length - len(theirs)) + theirs
+            self.requests_per_second = deque(
+                (a + b for a, b in zip(ours, theirs)), maxlen=60
+            )
+
+            merged_cache = dict(self.cache_stats)
+            _sum_into(merged_cache, state['cache_stats'])
+            self.cache_stats = merged_cache
+
+            theirs_php = state.get('php_stats', {})
+            merged_php = dict(self.php_stats)
+            _sum_into(merged_php, theirs_php)
+            for key in ('max_queued', 'wait_max'):
+                merged_php[key] = max(self.php_stats[key], theirs_php.get(key, 0))
+            self.php_stats = merged_php
+
+            merged_php_cache = dict(self.php_cache_stats)
+            _sum_into(merged_php_cache, state.get('php_cache_stats', {}))
+            self.php_cache_stats = merged_php_cache
+
+            theirs_query_cache = state.get('query_cache_stats', {})
+            merged_query_cache = dict(self.query_cache_stats)
+            _sum_into(merged_query_cache, theirs_query_cache)
+            merged_query_cache['enabled'] = (self.query_cache_stats['enabled']
+                                             or theirs_query_cache.get('enabled', False))
+            self.query_cache_stats = merged_query_cache
+
+            theirs_loop = state.get('loop_stats', {})
+            merged_loop = dict(self.loop_stats)
+            _sum_into(merged_loop, theirs_loop)
+            for key in ('lag_last', 'lag_max'):
+                merged_loop[key] = max(self.loop_stats[key], theirs_loop.get(key, 0))
+            self.loop_stats = merged_loop
+
+            theirs_io = state.get('io_stats', {})
+            merged_io = dict(self.io_stats)
+            _sum_into(merged_io, theirs_io)
+            merged_io['max_queued'] = max(self.io_stats.get('max_queued', 0), theirs_io.get('max_queued', 0))
+            self.io_stats = merged_io
+
+            merged_fastcgi = dict(self.fastcgi_stats)
+            _sum_into(merged_fastcgi, state.get('fastcgi_stats', {}))
+            self.fastcgi_stats = merged_fastcgi
+
+            theirs_db = state.get('db_stats', {})
+            merged_db = dict(self.db_stats, acquire_histogram=dict(self.db_stats['acquire_histogram']))
+            _sum_into(merged_db, theirs_db)
+            for key in ('max_waiting', 'acquire_max'):
+                merged_db[key] = max(self.db_stats[key], theirs_db.get(key, 0))
+            merged_db['connected'] = self.db_stats['connected'] or theirs_db.get('connected', False)
+            self.db_stats = merged_db
+
+    def write_state_file(self, stats_dir: str):
+        """
+        Écrit les compteurs de ce processus dans stats_dir/<pid>.json.
+        L'écriture est atomique (fichier temporaire + rename).
+
+        Args:
+            stats_dir: Répertoire partagé entre les workers
+        """
+        state = self.export_state()
+        final_path = os.path.join(stats_dir, f"{state['pid']}.json")
+        tmp_path = final_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, final_path)
+
+    def _calculate_hit_rate(self, cache_stats: Optional[Dict] = None) -> str:
+        """Calcule le taux de cache hits (cache statique par défaut)"""
+        cache_stats = self.cache_stats if cache_stats is None else cache_stats
+        hits = cache_stats.get('hits', 0)
+        misses = cache_stats.get('misses', 0)
         total = hits + misses
         if total == 0:
             return "0%"
@@ -191,6 +514,62 @@ class PerformanceMonitor:
 monitor = PerformanceMonitor()
 
 
+async def measure_loop_lag(interval: float = 0.5):
+    """
+    Mesure en continu le retard de la boucle asyncio : un sleep(interval)
+    qui se réveille en retard révèle un appel bloquant.
+
+    Args:
+        interval: Secondes entre deux échantillons
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        monitor.record_loop_lag(max(0.0, loop.time() - start - interval))
+
+
+def _sum_into(target: Dict, source: Dict):
+    """Additionne récursivement les valeurs numériques de source dans target."""
+    for key, value in source.items():
+        if isinstance(value, dict):
+            _sum_into(target.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            current = target.get(key, 0)
+            target[key] = (current if isinstance(current, (int, float)) else 0) + value
+        else:
+            target.setdefault(key, value)
+
+
+def aggregate_worker_stats(stats_dir: str) -> Dict:
+    """
+    Agrège les statistiques de tous les workers (mode multi-processus).
+
+    Args:
+        stats_dir: Répertoire contenant un fichier <pid>.json par worker
+
+    Returns:
+        Dict: Statistiques globales, même format que PerformanceMonitor.get_stats()
+    """
+    merged = PerformanceMonitor(monitor.max_requests_history)
+    workers = 0
+    for name in os.listdir(stats_dir):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(stats_dir, name)) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            # Fichier en cours d'écriture ou worker disparu
+            continue
+        merged.merge_state(state)
+        workers += 1
+
+    stats = merged.get_stats()
+    stats['workers'] = workers
+    return stats
+
+
 def generate_monitoring_dashboard(stats: Dict) -> bytes:
     """Génère le HTML du dashboard de monitoring"""
     
@@ -341,6 +720,10 @@ def generate_monitoring_dashboard(stats: Dict) -> bytes:
                     <span class="metric-label">Req/sec (moyen)</span>
                     <span class="metric-value">{stats['requests_per_second']['average']}</span>
                 </div>
+                <div class="metric">
+                    <span class="metric-label">Workers</span>
+                    <span class="metric-value">{stats.get('workers', 1)}</span>
+                </div>
             </div>
             
             <!-- Latence -->
@@ -382,8 +765,153 @@ def generate_monitoring_dashboard(stats: Dict) -> bytes:
                     <span class="metric-value status-error">{stats['cache']['misses']}</span>
                 </div>
                 <div class="metric">
-                    <span class="metric-label">Taille cache</span>
-                    <span class="metric-value">{stats['cache']['size']} / {stats['cache']['capacity']}</span>
+                    <span class="metric-label">Entrées</span>
+                    <span class="metric-value">{stats['cache']['size']}</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Mémoire</span>
+                    <span class="metric-value">{format_size(stats['cache']['bytes'])} / {format_size(stats['cache']['max_bytes'])}</span>
+                </div>
+                <div class="progress-bar">
+                    <div class="progress-fill" style="width: {(stats['cache']['bytes'] / stats['cache']['max_bytes'] * 100) if stats['cache']['max_bytes'] else 0:.1f}%;"></div>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Évictions</span>
+                    <span class="metric-value">{stats['cache']['evictions']} ({format_size(stats['cache']['bytes_evicted'])})</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Refusés (trop gros)</span>
+                    <span class="metric-value">{stats['cache']['rejected_too_large']}</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Politique</span>
+                    <span class="metric-value">{stats['cache']['policy']} ({stats['cache']['admission_rejections']} non admis)</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Lectures disque (évitées)</span>
+                    <span class="metric-value">{stats['cache']['loads']} ({stats['cache']['coalesced_loads']})</span>
+                </div>
+            </div>
+            
+            <!-- PHP -->
+            <div class="card">
+                <h2>🐘 PHP</h2>
+                <div class="metric">
+                    <span class="metric-label">En cours</span>
+                    <span class="metric-value">{stats['php']['active']} / {stats['php']['limit']}</span>
+                </div>
+                <div class="progress-bar">
+                    <div class="progress-fill" style="width: {(stats['php']['active'] / stats['php']['limit'] * 100) if stats['php']['limit'] else 0:.1f}%;"></div>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">En file (max)</span>
+                    <span class="metric-value">{stats['php']['queued']} ({stats['php']['max_queued']})</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Exécutions</span>
+                    <span class="metric-value status-ok">{stats['php']['executions']}</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Attente moy. / max</span>
+                    <span class="metric-value">{stats['php']['wait_avg_ms']} ms / {stats['php']['wait_max_ms']} ms</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Refusés (503)</span>
+                    <span class="metric-value status-error">{stats['php']['rejected'] + stats['php']['queue_timeouts']}</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Tués (timeout)</span>
+                    <span class="metric-value status-error">{stats['php']['killed']}</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Workers FastCGI (vivants / en échec)</span>
+                    <span class="metric-value">{f"{stats['fastcgi']['alive']} / {stats['fastcgi']['workers']} ({stats['fastcgi']['broken']})" if stats['fastcgi']['workers'] else 'CGI'}</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Redémarrages (crashs / recyclés / tués)</span>
+                    <span class="metric-value">{stats['fastcgi']['crashes']} / {stats['fastcgi']['recycled']} / {stats['fastcgi']['killed']}</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Micro-cache (hit rate)</span>
+                    <span class="metric-value">{stats['php_cache']['hit_rate'] if stats['php_cache']['enabled'] else 'désactivé'}</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Hits / misses / coalescés</span>
+                    <span class="metric-value">{stats['php_cache']['hits']} / {stats['php_cache']['misses']} / {stats['php_cache']['coalesced']}</span>
+                </div>
+            </div>
+            
+            <!-- Boucle asyncio -->
+            <div class="card">
+                <h2>⏱️ Boucle asyncio</h2>
+                <div class="metric">
+                    <span class="metric-label">Retard actuel</span>
+                    <span class="metric-value">{stats['loop']['lag_ms']} ms</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Retard moy. / max</span>
+                    <span class="metric-value">{stats['loop']['lag_avg_ms']} ms / {stats['loop']['lag_max_ms']} ms</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Blocages (&gt; {LOOP_STALL_THRESHOLD * 1000:.0f} ms)</span>
+                    <span class="metric-value status-error">{stats['loop']['stalls']}</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Pool d'I/O (actifs / threads)</span>
+                    <span class="metric-value">{stats['io']['active']} / {stats['io']['threads']}</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Opérations (file max)</span>
+                    <span class="metric-value">{stats['io']['tasks']} ({stats['io']['max_queued']})</span>
+                </div>
+            </div>
+            
+            <!-- MySQL -->
+            <div class="card">
+                <h2>🗄️ MySQL</h2>
+                <div class="metric">
+                    <span class="metric-label">Connexions (utilisées / ouvertes / max)</span>
+                    <span class="metric-value">{stats['database']['in_use']} / {stats['database']['size']} / {stats['database']['maxsize'] if stats['database']['connected'] else 'non connecté'}</span>
+                </div>
+                <div class="progress-bar">
+                    <div class="progress-fill" style="width: {(stats['database']['in_use'] / stats['database']['maxsize'] * 100) if stats['database']['maxsize'] else 0:.1f}%;"></div>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Inactives</span>
+                    <span class="metric-value">{stats['database']['idle']}</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">En attente (max)</span>
+                    <span class="metric-value">{stats['database']['waiting']} ({stats['database']['max_waiting']})</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Attente moy. / max</span>
+                    <span class="metric-value">{stats['database']['acquire_avg_ms']} ms / {stats['database']['acquire_max_ms']} ms</span>
+                </div>
+                {''.join(f'<div class="metric"><span class="metric-label">Attente {bucket}</span><span class="metric-value">{count}</span></div>' for bucket, count in stats['database']['acquire_histogram'].items())}
+                <div class="metric">
+                    <span class="metric-label">Pool saturé (503)</span>
+                    <span class="metric-value status-error">{stats['database']['timeouts']}</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Pings (échecs)</span>
+                    <span class="metric-value">{stats['database']['pings']} ({stats['database']['ping_failures']})</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Cache requêtes (hit rate)</span>
+                    <span class="metric-value">{stats['query_cache']['hit_rate'] if stats['query_cache']['enabled'] else 'désactivé'}</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Hits / misses / coalescés</span>
+                    <span class="metric-value">{stats['query_cache']['hits']} / {stats['query_cache']['misses']} / {stats['query_cache']['coalesced']}</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Invalidations (résultats écartés)</span>
+                    <span class="metric-value">{stats['query_cache']['invalidations']} ({stats['query_cache']['stale']})</span>
+                </div>
+                <div class="metric">
+                    <span class="metric-label">Résultats en cache</span>
+                    <span class="metric-value">{stats['query_cache']['size']} ({stats['query_cache']['bytes'] / 1024:.0f} Ko)</span>
                 </div>
             </div>
             
@@ -396,7 +924,7 @@ def generate_monitoring_dashboard(stats: Dict) -> bytes:
             <!-- Codes de statut -->
             <div class="card">
                 <h2>📊 Codes de statut</h2>
-                {''.join(f'<div class="metric"><span class="metric-label {self._get_status_class(code)}">{code}</span><span class="metric-value">{count}</span></div>' for code, count in sorted(stats['status_codes'].items()))}
+                {''.join(f'<div class="metric"><span class="metric-label {_get_status_class(code)}">{code}</span><span class="metric-value">{count}</span></div>' for code, count in sorted(stats['status_codes'].items()))}
             </div>
             
             <!-- Top paths -->
@@ -431,7 +959,7 @@ def generate_monitoring_dashboard(stats: Dict) -> bytes:
                     </tr>
                 </thead>
                 <tbody>
-                    {''.join(f'<tr><td>{req["timestamp"]}</td><td><strong>{req["method"]}</strong></td><td style="font-family: monospace; font-size: 0.85em;">{req["path"][:40]}</td><td class="{self._get_status_class(req["status"])}">{req["status"]}</td><td>{req["latency"]}</td><td style="font-family: monospace; font-size: 0.85em;">{req["ip"]}</td></tr>' for req in reversed(stats['recent_requests']))}
+                    {''.join(f'<tr><td>{req["timestamp"]}</td><td><strong>{req["method"]}</strong></td><td style="font-family: monospace; font-size: 0.85em;">{req["path"][:40]}</td><td class="{_get_status_class(req["status"])}">{req["status"]}</td><td>{req["latency"]}</td><td style="font-family: monospace; font-size: 0.85em;">{req["ip"]}</td></tr>' for req in reversed(stats['recent_requests']))}
                 </tbody>
             </table>
         </div>
@@ -0,0 +1,249 @@
+"""
+Micro-cache des réponses PHP (opt-in) : une page identique pendant quelques
+secondes n'est exécutée qu'une fois, et N requêtes simultanées sur la même
+page manquante ne déclenchent qu'une seule exécution (coalescing).
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+from handlers.cache import LRUCache
+
+# Configuration (surchargée par la section "php_cache" de config.json)
+PHP_CACHE_CONFIG = {
+    'enabled': False,
+    'default_ttl': 0,       # Secondes si PHP n'envoie pas de max-age (0 = pas de cache)
+    'max_size': 16,         # Mo
+    'max_entry_size': 1,    # Mo
+}
+
+# Méthodes dont la réponse peut être réutilisée
+CACHEABLE_METHODS = ('GET', 'HEAD')
+
+
+class PHPCacheEntry:
+    """Réponse PHP mise en cache."""
+
+    __slots__ = ('key', 'headers', 'body', 'expires', 'variants')
+
+    def __init__(self, key: Tuple, headers: Dict[str, str], body: bytes, expires: float):
+        self.key = key
+        self.headers = headers
+        self.body = body
+        self.expires = expires
+        # Variantes compressées, ajoutées à la demande (encodage -> bytes)
+        self.variants: Dict[str, bytes] = {}
+
+
+def parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    """
+    Parse un header Cache-Control.
+
+    Args:
+        value: Valeur du header (ex: 'public, max-age=10')
+
+    Returns:
+        Dict: directive (minuscules) -> valeur ou None
+    """
+    directives = {}
+    for item in value.split(','):
+        name, _, arg = item.strip().partition('=')
+        if name:
+            directives[name.lower()] = arg.strip().strip('"') or None
+    return directives
+
+
+def response_ttl(headers: Optional[Dict[str, str]], body: bytes) -> int:
+    """
+    Durée de mise en cache d'une réponse PHP (0 = non cacheable).
+
+    Une réponse avec Set-Cookie, Location, Vary: *, un statut autre que 200
+    ou Cache-Control no-store/no-cache/private n'est jamais mise en cache.
+
+    Args:
+        headers: Headers CGI de la réponse (minuscules)
+        body: Corps de la réponse
+
+    Returns:
+        int: TTL en secondes
+    """
+    headers = headers or {}
+    if 'set-cookie' in headers or 'location' in headers:
+        return 0
+    if headers.get('vary', '').strip() == '*':
+        return 0
+    if not headers.get('status', '200').startswith('200'):
+        return 0
+    if len(body) > PHP_CACHE_CONFIG['max_entry_size'] * 1024 * 1024:
+        return 0
+
+    directives = parse_cache_control(headers.get('cache-control', ''))
+    if {'no-store', 'no-cache', 'private'} & directives.keys():
+        return 0
+    for name in ('s-maxage', 'max-age'):
+        if name in directives:
+            try:
+                return max(0, int(directives[name]))
+            except (TypeError, ValueError):
+                return 0
+    return PHP_CACHE_CONFIG['default_ttl']
+
+
+class PHPResponseCache:
+    """Cache des réponses PHP avec expiration, Vary et coalescing des misses."""
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        """
+        Args:
+            max_bytes: Budget mémoire total
+            max_entry_bytes: Taille max d'une réponse
+        """
+        self.entries = LRUCache(max_bytes=max_bytes, max_entry_bytes=max_entry_bytes)
+        # Headers Vary connus par page (script + query)
+        self.vary: Dict[Tuple, Tuple[str, ...]] = {}
+        # Exécutions en cours : clé -> Future résolue avec l'entrée (ou None)
+        self.inflight: Dict[Tuple, asyncio.Future] = {}
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'stored': 0,
+            'uncacheable': 0,
+            'expired': 0,
+        }
+
+    def _key(self, method: str, script: str, query: str, headers: Dict[str, str]) -> Tuple:
+        base = (method, script, query)
+        vary = self.vary.get(base, ())
+        return base + tuple(headers.get(name, '') for name in vary)
+
+    async def lookup(self, method: str, script: str, query: str,
+                     headers: Dict[str, str]) -> Tuple[Optional[PHPCacheEntry], Optional[Tuple]]:
+        """
+        Cherche une réponse en cache, ou attend l'exécution en cours de la même page.
+
+        Args:
+            method: Méthode HTTP
+            script: Chemin du script PHP
+            query: Query string
+            headers: Headers de la requête (minuscules)
+
+        Returns:
+            Tuple: (entrée, None) si la réponse est disponible ;
+                   (None, clé) si l'appelant doit exécuter le script puis appeler complete(clé, ...) ;
+                   (None, None) si l'appelant doit exécuter le script sans mise en cache
+        """
+        if method not in CACHEABLE_METHODS or 'authorization' in headers:
+            return None, None
+
+        key = self._key(method, script, query, headers)
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry.expires > time.monotonic():
+                self.stats['hits'] += 1
+                return entry, None
+            self.entries.invalidate(key)
+            self.stats['expired'] += 1
+
+        pending = self.inflight.get(key)
+        if pending is not None:
+            # Une exécution est en cours : attendre son résultat
+            self.stats['coalesced'] += 1
+            entry = await asyncio.shield(pending)
+            return entry, None
+
+        self.stats['misses'] += 1
+        self.inflight[key] = asyncio.get_running_loop().create_future()
+        return None, key
+
+    def complete(self, key: Tuple, headers: Optional[Dict[str, str]], body: Optional[bytes]) -> None:
+        """
+        Termine une exécution lancée après lookup() : met la réponse en cache si
+        elle le permet et réveille les requêtes en attente.
+
+        Args:
+            key: Clé retournée par lookup()
+            headers: Headers CGI de la réponse (None si échec)
+            body: Corps final (widget compris), None si échec ou réponse streamée
+        """
+        entry = None
+        if body is not None:
+            ttl = response_ttl(headers, body)
+            if ttl > 0:
+                entry = self._store(key, headers or {}, body, ttl)
+            else:
+                self.stats['uncacheable'] += 1
+
+        pending = self.inflight.pop(key, None)
+        if pending is not None and not pending.done():
+            # Les requêtes en attente exécutent elles-mêmes le script si rien n'est en cache
+            pending.set_result(entry)
+
+    def _store(self, key: Tuple, headers: Dict[str, str], body: bytes, ttl: int) -> Optional[PHPCacheEntry]:
+        base = key[:3]
+        vary = tuple(sorted(
+            name.strip().lower() for name in headers.get('vary', '').split(',') if name.strip()
+        ))
+        if vary != self.vary.get(base, ()):
+            # Clé calculée avec d'anciens headers Vary : les attentes ne sont pas équivalentes
+            self.vary[base] = vary
+            return None
+
+        entry = PHPCacheEntry(key, dict(headers), body, time.monotonic() + ttl)
+        if not self.entries.put(key, entry, size=len(body)):
+            return None
+        self.stats['stored'] += 1
+        return entry
+
+    def add_variant(self, entry: PHPCacheEntry, encoding: str, data: bytes) -> None:
+        """
+        Ajoute une variante compressée à une entrée et recalcule sa taille.
+
+        Args:
+            entry: Entrée retournée par lookup()
+            encoding: Encodage de la variante
+            data: Corps compressé
+        """
+        entry.variants[encoding] = data
+        if entry.key in self.entries:
+            size = len(entry.body) + sum(len(v) for v in entry.variants.values())
+            self.entries.put(entry.key, entry, size=size)
+
+    def clear(self) -> None:
+        """Vide le cache."""
+        self.entries.clear()
+        self.vary.clear()
+
+    def get_stats(self) -> Dict:
+        """Retourne les statistiques du micro-cache."""
+        cache_stats = self.entries.get_stats()
+        return {
+            **self.stats,
+            'enabled': PHP_CACHE_CONFIG['enabled'],
+            'size': cache_stats['size'],
+            'bytes': cache_stats['bytes'],
+            'max_bytes': cache_stats['max_bytes'],
+        }
+
+
+# Instance globale (recréée par configure_php_cache)
+php_cache = PHPResponseCache(PHP_CACHE_CONFIG['max_size'] * 1024 * 1024,
+                             PHP_CACHE_CONFIG['max_entry_size'] * 1024 * 1024)
+
+
+def configure_php_cache(**settings) -> PHPResponseCache:
+    """
+    Applique la configuration et recrée le cache.
+
+    Args:
+        settings: Clés de PHP_CACHE_CONFIG à surcharger
+
+    Returns:
+        PHPResponseCache: Nouvelle instance globale
+    """
+    global php_cache
+    PHP_CACHE_CONFIG.update(settings)
+    php_cache = PHPResponseCache(int(PHP_CACHE_CONFIG['max_size'] * 1024 * 1024),
+                                 int(PHP_CACHE_CONFIG['max_entry_size'] * 1024 * 1024))
+    return php_cache
@@ -1,38 +1,298 @@
 """
-Exécution de scripts PHP via CGI
+Exécution de scripts PHP via FastCGI (pool de workers persistants)
+ou via CGI (un processus php-cgi par requête, en repli)
 """
 
 import asyncio
 import os
-import shlex
-from typing import Dict, Optional, Tuple
-from urllib.parse import urlparse, parse_qs
+import time
+from typing import Dict, Optional, Tuple, Union
 
-async def execute_php_cgi(script_path: str, method: str, query_string: str,
-                         headers: Dict[str, str], body: bytes,
-                         php_cgi_path: str = "/usr/bin/php-cgi") -> Tuple[bytes, Optional[Dict[str, str]]]:
+from handlers import fastcgi
+from handlers.fastcgi import FastCGIError, FastCGIUnavailableError
+from handlers.monitoring import monitor
+from utils.request_body import RequestBody
+
+# Limites d'exécution (surchargées par la section "php_limits" de config.json)
+PHP_LIMITS = {
+    'max_concurrent': 8,    # Scripts simultanés (plafonné à la taille du pool FastCGI)
+    'max_queue': 32,        # Requêtes en attente au-delà : 503 immédiat
+    'queue_timeout': 5,     # Secondes d'attente max dans la file : 503
+    'script_timeout': 30,   # Secondes d'exécution max : script tué (0 = illimité)
+    'retry_after': 5,       # Valeur du header Retry-After des 503
+}
+
+# Taille des lectures sur la sortie de php-cgi
+READ_SIZE = 64 * 1024
+
+# Au-delà, la sortie n'est pas une réponse CGI (pas de fin de headers)
+MAX_CGI_HEADER_SIZE = 64 * 1024
+
+class CGIStream:
+    """
+    Sortie d'un processus php-cgi lue au fil de l'eau
+    (même interface que fastcgi.FastCGIStream : read(), close()).
     """
-    Exécute un script PHP via CGI.
+
+    def __init__(self, process: asyncio.subprocess.Process,
+                 input_data: Union[bytes, RequestBody, None]):
+        self.process = process
+        self.app_status: Optional[int] = None   # Code de sortie, None tant que stdout est ouvert
+        # stdin et stderr servis en parallèle pour ne jamais bloquer sur un pipe plein
+        self.stdin_task = asyncio.create_task(self._write_stdin(input_data)) if input_data else None
+        self.stderr_task = asyncio.create_task(process.stderr.read())
+
+    async def _write_stdin(self, data: Union[bytes, RequestBody]) -> None:
+        try:
+            if isinstance(data, RequestBody):
+                # Upload transmis au fil de sa réception
+                async for chunk in data.chunks():
+                    self.process.stdin.write(chunk)
+                    await self.process.stdin.drain()
+            else:
+                self.process.stdin.write(data)
+                await self.process.stdin.drain()
+            self.process.stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            # Le script n'a pas lu tout le corps
+            pass
+        except asyncio.IncompleteReadError:
+            # Client déconnecté pendant l'upload : le script reçoit un corps tronqué
+            self.process.stdin.close()
+
+    @property
+    def stderr(self) -> bytes:
+        if self.stderr_task.done() and not self.stderr_task.cancelled():
+            return self.stderr_task.result()
+        return b''
+
+    async def read(self) -> bytes:
+        """
+        Lit le prochain morceau de stdout.
+
+        Returns:
+            bytes: Données lues, b'' quand le script a terminé
+        """
+        if self.app_status is not None:
+            return b''
+        chunk = await self.process.stdout.read(READ_SIZE)
+        if not chunk:
+            await self.stderr_task
+            self.app_status = await self.process.wait()
+        return chunk
+
+    async def close(self) -> None:
+        """Libère le processus (tué s'il n'a pas terminé, ex: client déconnecté)."""
+        if self.process.returncode is None:
+            self.process.kill()
+            await self.process.wait()
+        tasks = [task for task in (self.stdin_task, self.stderr_task) if task and not task.done()]
+        for task in tasks:
+            task.cancel()
+        # Attendre l'arrêt effectif : stdin_task peut encore itérer le body,
+        # que l'appelant va ensuite vider (discard)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def kill(self) -> None:
+        """Tue le processus (script trop long)."""
+        if self.process.returncode is None:
+            self.process.kill()
+
+class PHPOverloadedError(Exception):
+    """Plus de place pour exécuter un script PHP (réponse 503)."""
+
+class PHPTimeoutError(Exception):
+    """Script PHP tué après script_timeout secondes."""
+
+class PHPLimiter:
+    """
+    Plafonne le nombre de scripts PHP simultanés, avec une file d'attente
+    bornée en taille et en durée.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        """
+        Args:
+            max_concurrent: Scripts exécutés en parallèle
+            max_queue: Requêtes autorisées à attendre une place
+            queue_timeout: Attente maximale en secondes
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.queued = 0
+
+    def _publish(self) -> None:
+        monitor.update_php_queue(self.max_concurrent, self.active, self.queued)
+
+    async def acquire(self) -> None:
+        """
+        Attend une place d'exécution.
+
+        Raises:
+            PHPOverloadedError: File pleine ou attente trop longue
+        """
+        start = time.monotonic()
+        if self.semaphore.locked():
+            if self.queued >= self.max_queue:
+                monitor.record_php_rejection('rejected')
+                raise PHPOverloadedError("file d'attente PHP pleine")
+            self.queued += 1
+            self._publish()
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                monitor.record_php_rejection('queue_timeouts')
+                raise PHPOverloadedError(f"aucune place PHP libérée en {self.queue_timeout}s")
+            finally:
+                self.queued -= 1
+                self._publish()
+        else:
+            await self.semaphore.acquire()
+
+        self.active += 1
+        self._publish()
+        monitor.record_php_admission(time.monotonic() - start)
+
+    def release(self) -> None:
+        """Libère une place d'exécution."""
+        self.active -= 1
+        self.semaphore.release()
+        self._publish()
+
+class LimitedStream:
+    """
+    Flux PHP admis par le limiteur : le script est tué s'il dépasse
+    script_timeout, la place est libérée par close().
+    """
+
+    def __init__(self, stream, limiter: PHPLimiter, script_path: str, timeout: float):
+        self.stream = stream
+        self.limiter = limiter
+        self.script_path = script_path
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.released = False
+
+    @property
+    def app_status(self) -> Optional[int]:
+        return self.stream.app_status
+
+    @property
+    def stderr(self) -> bytes:
+        return self.stream.stderr
+
+    async def read(self) -> bytes:
+        """
+        Lit le prochain morceau de la sortie du script.
+
+        Raises:
+            PHPTimeoutError: Si le script dépasse son temps d'exécution
+        """
+        if self.deadline is None:
+            return await self.stream.read()
+        try:
+            return await asyncio.wait_for(self.stream.read(), self.deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            print(f"PHP {self.script_path}: timeout, script tué")
+            monitor.record_php_kill()
+            await self.stream.kill()
+            raise PHPTimeoutError(f"{self.script_path} a dépassé {PHP_LIMITS['script_timeout']}s")
+
+    async def close(self) -> None:
+        """Ferme le flux et libère la place d'exécution."""
+        try:
+            await self.stream.close()
+        finally:
+            if not self.released:
+                self.released = True
+                self.limiter.release()
+
+# Limiteur du processus courant (créé au démarrage par configure_limiter)
+limiter: Optional[PHPLimiter] = None
+
+def configure_limiter(pool_size: Optional[int] = None) -> PHPLimiter:
+    """
+    Crée le limiteur selon PHP_LIMITS (à appeler dans la boucle asyncio).
+
+    Args:
+        pool_size: Nombre de workers FastCGI (None en mode CGI)
+
+    Returns:
+        PHPLimiter créé
+    """
+    global limiter
+    max_concurrent = PHP_LIMITS['max_concurrent']
+    if pool_size:
+        # Au-delà, les requêtes attendraient un worker hors de la file bornée
+        max_concurrent = min(max_concurrent, pool_size)
+    limiter = PHPLimiter(max_concurrent, PHP_LIMITS['max_queue'], PHP_LIMITS['queue_timeout'])
+    limiter._publish()
+    return limiter
+
+async def open_php_stream(script_path: str, method: str, query_string: str,
+                          headers: Dict[str, str], body: Union[bytes, RequestBody],
+                          php_cgi_path: str = "/usr/bin/php-cgi"):
+    """
+    Lance un script PHP sur le pool FastCGI s'il est démarré, sinon via CGI.
 
     Args:
         script_path: Chemin absolu du script PHP
         method: Méthode HTTP (GET, POST, etc.)
         query_string: Query string (?param=value)
         headers: Headers HTTP
-        body: Corps de la requête (bytes)
-        php_cgi_path: Chemin vers php-cgi
+        body: Corps de la requête (bytes, ou RequestBody de taille connue,
+              transmis au script au fil de sa lecture)
+        php_cgi_path: Chemin vers php-cgi (mode CGI)
 
     Returns:
-        Tuple: (contenu_php, headers_extra) ou (b'', None) en cas d'erreur
+        Flux à lire avec read() puis fermer avec close(), None en cas d'erreur
+
+    Raises:
+        PHPOverloadedError: Si aucune place d'exécution ne se libère (503)
     """
+    if limiter is None:
+        return await spawn_php_stream(script_path, method, query_string, headers, body, php_cgi_path)
+
+    await limiter.acquire()
     try:
-        # Construire les variables d'environnement CGI
-        env = build_cgi_env(script_path, method, query_string, headers, body)
+        stream = await spawn_php_stream(script_path, method, query_string, headers, body, php_cgi_path)
+    except BaseException:
+        limiter.release()
+        raise
+    if stream is None:
+        limiter.release()
+        return None
+    return LimitedStream(stream, limiter, script_path, PHP_LIMITS['script_timeout'])
+
+async def spawn_php_stream(script_path: str, method: str, query_string: str,
+                           headers: Dict[str, str], body: Union[bytes, RequestBody],
+                           php_cgi_path: str):
+    """
+    Démarre le script sur le pool FastCGI ou dans un processus php-cgi (sans limiteur).
+
+    Returns:
+        FastCGIStream ou CGIStream, None en cas d'erreur
+
+    Raises:
+        PHPOverloadedError: Si aucun worker FastCGI ne se libère à temps (503)
+    """
+    env = build_cgi_env(script_path, method, query_string, headers, body)
 
-        # Préparer les données POST (body est déjà en bytes)
-        input_data = body if method == 'POST' and body else None
+    if fastcgi.pool is not None:
+        try:
+            return await fastcgi.pool.open_stream(env, body or b'')
+        except FastCGIUnavailableError as e:
+            monitor.record_php_rejection('queue_timeouts')
+            raise PHPOverloadedError(str(e)) from None
+        except FastCGIError as e:
+            # Pas de repli CGI ici : le script a peut-être déjà été exécuté (POST)
+            print(f"Erreur FastCGI {script_path}: {e}")
+            return None
 
-        # Lancer php-cgi
+    input_data = body if method == 'POST' and body else None
+    try:
         process = await asyncio.create_subprocess_exec(
             php_cgi_path,
             env=env,
@@ -41,26 +301,53 @@ async def execute_php_cgi(script_path: str, method: str, query_string: str,
             stderr=asyncio.subprocess.PIPE,
             cwd=os.path.dirname(script_path)  # Répertoire du script
         )
+    except OSError as e:
+        print(f"Erreur exécution PHP {script_path}: {e}")
+        return None
+    return CGIStream(process, input_data)
+
+async def read_php_headers(stream) -> Tuple[Optional[Dict[str, str]], bytes]:
+    """
+    Lit la sortie du script jusqu'à la fin des headers CGI.
 
-        # Envoyer les données POST et récupérer la sortie
-        stdout, stderr = await process.communicate(input=input_data)
+    Args:
+        stream: Flux retourné par open_php_stream
 
-        # Vérifier le code de retour
-        if process.returncode != 0:
-            print(f"Erreur PHP (code {process.returncode}): {stderr.decode()}")
-            return b'', None
+    Returns:
+        Tuple: (headers, début du body) ; headers None si la sortie n'en contient pas
 
-        # Parser la sortie CGI (headers + body)
-        content, extra_headers = parse_cgi_output(stdout)
+    Raises:
+        FastCGIError: Si le worker FastCGI meurt avant la fin des headers
+        PHPTimeoutError: Si le script dépasse son temps d'exécution
+    """
+    data = b''
+    while True:
+        parsed = split_cgi_headers(data)
+        if parsed is not None:
+            return parsed
+        chunk = await stream.read()
+        if not chunk or len(data) > MAX_CGI_HEADER_SIZE:
+            # Pas de headers : tout est body
+            return None, data + chunk
+        data += chunk
 
-        return content, extra_headers
+def report_php_errors(stream, script_path: str) -> bool:
+    """
+    Affiche stderr et le code de sortie d'un script terminé.
 
-    except Exception as e:
-        print(f"Erreur exécution PHP {script_path}: {e}")
-        return b'', None
+    Returns:
+        bool: True si le script s'est terminé sans erreur
+    """
+    stderr = stream.stderr
+    if stream.app_status != 0:
+        print(f"Erreur PHP {script_path} (code {stream.app_status}): {stderr.decode(errors='replace')}")
+        return False
+    if stderr:
+        print(f"PHP stderr ({script_path}): {stderr.decode(errors='replace')}")
+    return True
 
 def build_cgi_env(script_path: str, method: str, query_string: str,
-                 headers: Dict[str, str], body: bytes) -> Dict[str, str]:
+                 headers: Dict[str, str], body: Union[bytes, RequestBody]) -> Dict[str, str]:
     """
     Construit l'environnement CGI pour PHP.
 
@@ -69,7 +356,7 @@ def build_cgi_env(script_path: str, method: str, query_string: str,
         method: Méthode HTTP
         query_string: Query string
         headers: Headers HTTP
-        body: Corps de la requête (bytes)
+        body: Corps de la requête (seule sa taille est utilisée)
 
     Returns:
         Dict: Variables d'environnement
@@ -107,33 +394,45 @@ def build_cgi_env(script_path: str, method: str, query_string: str,
 
     return env
 
+def split_cgi_headers(data: bytes) -> Optional[Tuple[Dict[str, str], bytes]]:
+    """
+    Sépare les headers CGI du body, sans décoder le body.
+
+    Args:
+        data: Début de la sortie de php-cgi
+
+    Returns:
+        Tuple: (headers en minuscules, body), None si la fin des headers
+        (ligne vide, CRLF ou LF) n'est pas encore reçue
+    """
+    crlf = data.find(b'\r\n\r\n')
+    lf = data.find(b'\n\n')
+    if crlf < 0 and lf < 0:
+        return None
+    if crlf >= 0 and (lf < 0 or crlf < lf):
+        header_part, body = data[:crlf], data[crlf + 4:]
+    else:
+        header_part, body = data[:lf], data[lf + 2:]
+
+    headers = {}
+    for line in header_part.split(b'\n'):
+        key, sep, value = line.partition(b':')
+        if sep:
+            headers[key.strip().decode('latin-1').lower()] = value.strip().decode('latin-1')
+    return headers, body
+
 def parse_cgi_output(output: bytes) -> Tuple[bytes, Optional[Dict[str, str]]]:
     """
-    Parse la sortie CGI (headers + body).
+    Parse la sortie CGI complète (headers + body).
 
     Args:
         output: Sortie brute de php-cgi
 
     Returns:
-        Tuple: (body, headers_dict)
+        Tuple: (body, headers_dict), headers None si la sortie n'en contient pas
     """
-    try:
-        text = output.decode('utf-8', errors='ignore')
-
-        # Séparer headers et body
-        if '\r\n\r\n' in text:
-            header_part, body = text.split('\r\n\r\n', 1)
-        else:
-            return output, None  # Pas de headers, tout est body
-
-        headers = {}
-        for line in header_part.split('\r\n'):
-            if ': ' in line:
-                key, value = line.split(': ', 1)
-                headers[key.lower()] = value
-        
-        return body.encode('utf-8'), headers
-
-    except Exception as e:
-        print(f"Erreur parsing CGI output: {e}")
-        return output, None
+    parsed = split_cgi_headers(output)
+    if parsed is None:
+        return output, None  # Pas de headers, tout est body
+    headers, body = parsed
+    return body, headers
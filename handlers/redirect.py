@@ -21,7 +21,9 @@ def handle_redirect(path, static_cache):
         return 200, {}, b"Cache cleared"
     
     return None
-from typing import Optional, Tuple, Dict
+from typing import Optional, Tuple, Dict, List
+
+from utils.response import build_response
 
 def get_redirect_location(path: str, redirects_config: Dict[str, str]) -> Optional[Tuple[str, bool]]:
     """
@@ -45,25 +47,18 @@ def get_redirect_location(path: str, redirects_config: Dict[str, str]) -> Option
 
     return None
 
-def build_redirect_response(location: str, permanent: bool = False) -> bytes:
+def build_redirect_response(location: str, permanent: bool = False,
+                            keep_alive: bool = False) -> List[bytes]:
     """
     Construit une réponse de redirection.
 
     Args:
         location: URL de destination
         permanent: True pour 301, False pour 302
+        keep_alive: True pour garder la connexion ouverte après la réponse
 
     Returns:
-        bytes: Réponse HTTP
+        List[bytes]: Buffers de la réponse (voir utils/response.py)
     """
-    code = 301 if permanent else 302
-    status = "Moved Permanently" if permanent else "Found"
-
-    response = (
-        f"HTTP/1.1 {code} {status}\r\n"
-        f"Location: {location}\r\n"
-        f"Content-Length: 0\r\n"
-        f"Connection: close\r\n"
-        f"\r\n"
-    )
-    return response.encode('utf-8')
+    return build_response(301 if permanent else 302, headers={'Location': location},
+                          keep_alive=keep_alive)
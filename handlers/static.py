@@ -107,78 +107,606 @@ def _prepare_response(content, mime_type, request_headers):
     return 200, headers, content
 import asyncio
 import os
-from typing import Optional, Tuple
+import re
+import secrets
+import stat
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 from utils.mime_types import get_mime_type
-from handlers.cache import cache, generate_etag, should_use_cache
+from handlers import cache as cache_module
+from handlers.cache import SingleFlight, check_cache_valid, compute_etag, stat_etag
+from utils.io_pool import run_io
+from handlers.file_watcher import watcher_active
+from handlers.compression import (
+    COMPRESSION_CONFIG, available_encodings, compress_async, negotiate_encoding, should_compress
+)
 
-async def handle_static_file(file_path: str, if_none_match: Optional[str] = None) -> Tuple[bytes, Optional[dict]]:
+# Chargements disque en cours (misses concurrents sur un même fichier regroupés)
+file_loads = SingleFlight()
+
+# Générations des fichiers invalidés par le watcher : un chargement commencé
+# avant une invalidation n'est pas mis en cache (contenu peut-être périmé)
+file_generations: Dict[str, int] = {}
+generation_epoch = 0
+MAX_FILE_GENERATIONS = 10000
+
+# Au-delà de cette taille, le fichier n'est pas mis en cache mais envoyé
+# directement depuis le disque (sendfile)
+DEFAULT_STREAM_THRESHOLD = 1024 * 1024
+
+# Taille des blocs pour l'envoi sans sendfile
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Nombre max de plages dans un header Range (au-delà, le header est ignoré)
+MAX_RANGES = 16
+
+# Séparateur des réponses multipart/byteranges
+MULTIPART_BOUNDARY = secrets.token_hex(16)
+
+CACHE_CONTROL = 'public, max-age=3600'
+
+# Fichiers précompressés servis à la place de l'original (ex: app.js.br)
+SIDECAR_EXTENSIONS = {
+    'br': '.br',
+    'zstd': '.zst',
+    'gzip': '.gz',
+}
+
+
+class FileResponse:
+    """Corps de réponse lu directement depuis le disque (gros fichiers)."""
+
+    def __init__(self, path: str, size: int, parts: Optional[List[Union[bytes, Tuple[int, int]]]] = None):
+        """
+        Args:
+            path: Chemin absolu du fichier
+            size: Taille totale du fichier
+            parts: Morceaux du corps : bytes envoyés tels quels ou (offset, count)
+                   lus depuis le fichier (None = fichier complet)
+        """
+        self.path = path
+        self.size = size
+        self.parts = parts if parts is not None else [(0, size)]
+
+    def __len__(self) -> int:
+        return sum(len(part) if isinstance(part, bytes) else part[1] for part in self.parts)
+
+
+def find_sidecars(file_path: str, mtime: float) -> Dict[str, Tuple[str, os.stat_result]]:
     """
-    Sert un fichier statique avec gestion du cache.
+    Cherche les fichiers précompressés (.br, .zst, .gz) à jour à côté d'un fichier.
+
+    Args:
+        file_path: Chemin du fichier original
+        mtime: Date de modification de l'original
+
+    Returns:
+        Dict: encodage -> (chemin du sidecar, stat), sidecars plus anciens ignorés
+    """
+    sidecars = {}
+    for encoding, ext in SIDECAR_EXTENSIONS.items():
+        sidecar_path = file_path + ext
+        try:
+            st = os.stat(sidecar_path)
+        except OSError:
+            continue
+        if st.st_mtime >= mtime:
+            sidecars[encoding] = (sidecar_path, st)
+    return sidecars
+
+
+def invalidate_cached_file(path: Optional[str]) -> None:
+    """
+    Invalide l'entrée du cache d'un fichier modifié sur le disque
+    (appelé par le watcher du document_root).
+
+    Args:
+        path: Chemin modifié, None pour vider tout le cache
+    """
+    if path is None:
+        bump_generation(None)
+        cache_module.cache.clear()
+        return
+    bump_generation(path)
+    cache_module.cache.invalidate(path)
+    # Un sidecar modifié change les variantes du fichier original
+    for ext in SIDECAR_EXTENSIONS.values():
+        if path.endswith(ext):
+            bump_generation(path[:-len(ext)])
+            cache_module.cache.invalidate(path[:-len(ext)])
+
+
+def file_generation(path: str) -> Tuple[int, int]:
+    """Génération courante d'un fichier (change à chaque invalidation)."""
+    return generation_epoch, file_generations.get(path, 0)
+
+
+def bump_generation(path: Optional[str]) -> None:
+    """
+    Change la génération d'un fichier invalidé.
+
+    Args:
+        path: Chemin invalidé, None pour tous les fichiers
+    """
+    global generation_epoch
+    if path is None or len(file_generations) >= MAX_FILE_GENERATIONS:
+        # Toutes les générations changent (et la table reste bornée)
+        file_generations.clear()
+        generation_epoch += 1
+    if path is not None:
+        file_generations[path] = file_generations.get(path, 0) + 1
+
+
+def read_sidecars(file_path: str, mtime: float) -> Dict[str, Optional[bytes]]:
+    """
+    Lit les sidecars à jour, pour les stocker comme variantes dans le cache.
+
+    Returns:
+        Dict: encodage -> contenu compressé
+    """
+    variants = {}
+    for encoding, (sidecar_path, _) in find_sidecars(file_path, mtime).items():
+        try:
+            with open(sidecar_path, 'rb') as f:
+                variants[encoding] = f.read()
+        except OSError:
+            continue
+    return variants
+
+
+def format_http_date(timestamp: float) -> str:
+    """Formate un timestamp en date HTTP (RFC 7231), ex: 'Sun, 06 Nov 1994 08:49:37 GMT'."""
+    return formatdate(timestamp, usegmt=True)
+
+
+def parse_http_date(value: str) -> Optional[float]:
+    """
+    Parse une date HTTP.
+
+    Returns:
+        float: Timestamp, ou None si la date est invalide
+    """
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def etag_matches(header_value: str, etag: str, weak: bool = True) -> bool:
+    """
+    Vérifie si un header If-None-Match / If-Match contient l'ETag.
+
+    Args:
+        header_value: Valeur du header ('*' ou liste d'ETags séparés par des virgules)
+        etag: ETag courant
+        weak: Comparaison faible (If-None-Match : le préfixe W/ est ignoré) ;
+              en comparaison forte, un ETag faible ne correspond jamais
+
+    Returns:
+        bool: True si l'ETag correspond
+    """
+    if header_value.strip() == '*':
+        return True
+    if not weak:
+        return not etag.startswith('W/') and any(
+            candidate.strip() == etag for candidate in header_value.split(',')
+        )
+    opaque = _opaque_tag(etag)
+    return any(_opaque_tag(candidate.strip()) == opaque for candidate in header_value.split(','))
+
+
+def _opaque_tag(etag: str) -> str:
+    """ETag sans son préfixe W/ (comparaison faible)."""
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def is_not_modified(request_headers: Dict[str, str], etag: Optional[str], mtime: float) -> bool:
+    """
+    Évalue les requêtes conditionnelles (If-None-Match prioritaire sur
+    If-Modified-Since, RFC 7232).
+
+    Args:
+        request_headers: Headers de la requête (clés en minuscules)
+        etag: ETag courant (None si pas encore calculé)
+        mtime: Date de modification du fichier
+
+    Returns:
+        bool: True si une réponse 304 suffit
+    """
+    if_none_match = request_headers.get('if-none-match')
+    if if_none_match is not None:
+        return etag is not None and etag_matches(if_none_match, etag)
+
+    if_modified_since = request_headers.get('if-modified-since')
+    if if_modified_since:
+        since = parse_http_date(if_modified_since)
+        # Les dates HTTP ont une précision à la seconde
+        return since is not None and int(mtime) <= since
+    return False
+
+
+# Borne d'une plage : chiffres ASCII (int() accepterait '+5', ' 5' ou '٥')
+_RANGE_BOUND = re.compile(r'[0-9]*')
+
+
+def parse_range_header(value: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parse un header Range en plages d'octets.
+
+    Args:
+        value: Valeur du header (ex: 'bytes=0-499,-500')
+        size: Taille du fichier
+
+    Returns:
+        Liste de (début, fin) inclusifs, [] si aucune plage n'est satisfaisable
+        (416), ou None si le header est invalide et doit être ignoré
+    """
+    unit, _, specs = value.partition('=')
+    if unit.strip().lower() != 'bytes' or not specs:
+        return None
+
+    specs = specs.split(',')
+    if len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for spec in specs:
+        start, sep, end = spec.strip().partition('-')
+        if not sep or not _RANGE_BOUND.fullmatch(start) or not _RANGE_BOUND.fullmatch(end):
+            return None
+        if not start:
+            # Suffixe : les N derniers octets (aucun dans un fichier vide)
+            if not end:
+                return None
+            length = int(end)
+            if length <= 0 or size == 0:
+                continue
+            ranges.append((max(size - length, 0), size - 1))
+            continue
+        first = int(start)
+        last = int(end) if end else None
+        if last is not None and first > last:
+            return None
+        if first >= size:
+            continue  # Plage non satisfaisable
+        ranges.append((first, size - 1 if last is None else min(last, size - 1)))
+
+    return ranges
+
+
+def _slice(content: Optional[bytes], file_path: str, size: int,
+           parts: List[Union[bytes, Tuple[int, int]]]) -> Union[bytes, FileResponse]:
+    """Construit le corps à partir de morceaux (bytes ou plages du contenu/fichier)."""
+    if content is None:
+        return FileResponse(file_path, size, parts)
+    return b''.join(
+        part if isinstance(part, bytes) else content[part[0]:part[0] + part[1]]
+        for part in parts
+    )
+
+
+def variant_etag(etag: str, encoding: str) -> str:
+    """ETag d'une variante compressée (ex: '"abc"' -> '"abc-gzip"')."""
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def build_static_response(file_path: str, content: Optional[bytes], size: int,
+                          mime_type: str, etag: str, mtime: float,
+                          request_headers: Dict[str, str],
+                          encoding: Optional[str] = None, vary: bool = False
+                          ) -> Tuple[int, Union[bytes, FileResponse], Dict[str, str]]:
+    """
+    Construit la réponse d'un fichier statique : 304, 200, 206 ou 416.
+
+    Args:
+        file_path: Chemin absolu du fichier
+        content: Contenu en mémoire, ou None pour un envoi depuis le disque
+        size: Taille du fichier
+        mime_type: Type MIME
+        etag: ETag du fichier
+        mtime: Date de modification
+        request_headers: Headers de la requête (clés en minuscules)
+        encoding: Content-Encoding du contenu (None = non compressé)
+        vary: Ajouter Vary: Accept-Encoding (type compressible)
+
+    Returns:
+        Tuple: (status_code, corps, headers)
+    """
+    validators = {
+        'ETag': etag,
+        'Last-Modified': format_http_date(mtime),
+        'Cache-Control': CACHE_CONTROL,
+    }
+    if vary:
+        validators['Vary'] = 'Accept-Encoding'
+
+    if is_not_modified(request_headers, etag, mtime):
+        return 304, b'', validators
+
+    headers = {'Content-Type': mime_type, 'Accept-Ranges': 'bytes', **validators}
+    if encoding:
+        headers['Content-Encoding'] = encoding
+
+    range_header = request_headers.get('range')
+    if_range = request_headers.get('if-range')
+    # If-Range : comparaison forte, un ETag faible ne valide jamais une plage
+    if range_header and (not if_range or if_range.strip() == validators['Last-Modified']
+                         or (if_range.strip() != '*' and etag_matches(if_range, etag, weak=False))):
+        ranges = parse_range_header(range_header, size)
+        if ranges == []:
+            return 416, b'', {'Content-Range': f'bytes */{size}', **validators}
+
+        if ranges and len(ranges) == 1:
+            first, last = ranges[0]
+            headers['Content-Range'] = f'bytes {first}-{last}/{size}'
+            return 206, _slice(content, file_path, size, [(first, last - first + 1)]), headers
+
+        if ranges:
+            # Plusieurs plages : multipart/byteranges
+            parts = []
+            for first, last in ranges:
+                parts.append((
+                    f'--{MULTIPART_BOUNDARY}\r\n'
+                    f'Content-Type: {mime_type}\r\n'
+                    f'Content-Range: bytes {first}-{last}/{size}\r\n\r\n'
+                ).encode())
+                parts.append((first, last - first + 1))
+                parts.append(b'\r\n')
+            parts.append(f'--{MULTIPART_BOUNDARY}--\r\n'.encode())
+            headers['Content-Type'] = f'multipart/byteranges; boundary={MULTIPART_BOUNDARY}'
+            return 206, _slice(content, file_path, size, parts), headers
+
+    body = content if content is not None else FileResponse(file_path, size)
+    return 200, body, headers
+
+
+async def respond_from_memory(file_path: str, content: bytes, mime_type: str, etag: str,
+                              mtime: float, variants: Dict[str, Optional[bytes]],
+                              request_headers: Dict[str, str]
+                              ) -> Tuple[int, Union[bytes, FileResponse], Dict[str, str]]:
+    """
+    Répond avec un fichier en cache, compressé si le client l'accepte.
+
+    Les variantes compressées sont conservées dans l'entrée du cache
+    (variants) : chaque fichier n'est compressé qu'une fois par version.
+    Les sidecars précompressés y sont chargés dès la mise en cache.
+
+    Args:
+        file_path: Chemin absolu du fichier
+        content: Contenu brut
+        mime_type: Type MIME
+        etag: ETag du contenu brut
+        mtime: Date de modification
+        variants: encodage -> contenu compressé (None si la compression n'apporte rien)
+        request_headers: Headers de la requête (clés en minuscules)
+
+    Returns:
+        Tuple: (status_code, corps, headers)
+    """
+    compressible = should_compress(mime_type)
+    vary = compressible or bool(variants)
+
+    # Les plages portent sur le contenu brut : pas de compression avec Range
+    encoding = None
+    if 'range' not in request_headers:
+        # Variantes déjà prêtes (sidecars, compressions précédentes)...
+        candidates = [enc for enc, body in variants.items() if body is not None]
+        # ... ou compressibles à la volée
+        if (compressible and COMPRESSION_CONFIG['enabled']
+                and len(content) >= COMPRESSION_CONFIG['min_size']):
+            candidates += [enc for enc in available_encodings() if enc not in variants]
+        encoding = negotiate_encoding(request_headers.get('accept-encoding'), candidates)
+
+    if encoding:
+        if encoding not in variants:
+            compressed = await compress_async(content, encoding)
+            variants[encoding] = compressed if len(compressed) < len(content) else None
+            # Recalculer la taille de l'entrée avec sa nouvelle variante, sauf si
+            # elle a été remplacée pendant la compression (fichier rechargé)
+            entry = cache_module.cache.peek(file_path)
+            if entry is not None and entry[4] is variants:
+                cache_module.cache.put(file_path, entry)
+        body = variants[encoding]
+        if body is not None:
+            return build_static_response(file_path, body, len(body), mime_type,
+                                         variant_etag(etag, encoding), mtime, request_headers,
+                                         encoding=encoding, vary=True)
+
+    return build_static_response(file_path, content, len(content), mime_type,
+                                 etag, mtime, request_headers, vary=vary)
+
+
+async def send_file_body(writer: asyncio.StreamWriter, body: FileResponse) -> bool:
+    """
+    Envoie un fichier sur la connexion sans le charger en mémoire.
+    Utilise loop.sendfile (zero-copy) et se rabat sur une lecture par blocs
+    si le transport ne le supporte pas.
+
+    Si le fichier a raccourci depuis l'envoi des headers, moins d'octets que
+    le Content-Length annoncé sont disponibles : la connexion est fermée pour
+    que le client voie une réponse tronquée plutôt qu'une désynchronisation.
+
+    Args:
+        writer: StreamWriter de la connexion
+        body: Fichier (ou plages du fichier) à envoyer
+
+    Returns:
+        bool: True si tout a été envoyé, False si la connexion a été fermée
+    """
+    loop = asyncio.get_running_loop()
+    use_sendfile = True
+    f = await run_io(open, body.path, 'rb')
+    with f:
+        for part in body.parts:
+            if isinstance(part, bytes):
+                writer.write(part)
+                await writer.drain()
+                continue
+
+            offset, count = part
+            if use_sendfile:
+                try:
+                    sent = await loop.sendfile(writer.transport, f, offset, count, fallback=False)
+                    if sent < count:
+                        break
+                    continue
+                except (NotImplementedError, asyncio.SendfileNotAvailableError):
+                    use_sendfile = False
+
+            # Repli : lecture par blocs (dans le pool d'I/O) avec contrôle de flux
+            f.seek(offset)
+            remaining = count
+            while remaining > 0:
+                chunk = await run_io(f.read, min(STREAM_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+                remaining -= len(chunk)
+            if remaining:
+                break
+        else:
+            return True
+
+    print(f"Fichier raccourci pendant l'envoi: {body.path}")
+    writer.close()
+    return False
+
+
+def read_file_entry(file_path: str, mime_type: str, st: os.stat_result,
+                    html_filter: Optional[Callable[[bytes], bytes]]) -> tuple:
+    """
+    Lit un fichier et prépare son entrée de cache (bloquant, exécuté dans un thread).
+
+    Returns:
+        Tuple: (contenu, mime_type, etag, mtime, variantes)
+    """
+    with open(file_path, 'rb') as f:
+        content = f.read()
+
+    filtered = bool(html_filter) and mime_type == 'text/html'
+    if filtered:
+        # Contenu transformé : les sidecars ne lui correspondent plus
+        content = html_filter(content)
+        variants = {}
+    else:
+        variants = read_sidecars(file_path, st.st_mtime)
+
+    etag = compute_etag(file_path, st, content, persist=not filtered)
+    return content, mime_type, etag, st.st_mtime, variants
+
+
+async def load_file(file_path: str, mime_type: str, st: os.stat_result,
+                    html_filter: Optional[Callable[[bytes], bytes]],
+                    generation: Tuple[int, int]) -> tuple:
+    """
+    Charge un fichier dans le pool d'I/O et le met en cache
+    (les autres variantes compressées sont ajoutées à la demande).
+
+    Args:
+        generation: file_generation() relevée avant le stat : si le fichier a été
+                    invalidé depuis, l'entrée est retournée sans être mise en cache
+
+    Returns:
+        Tuple: Entrée de cache (voir read_file_entry)
+    """
+    item = await run_io(read_file_entry, file_path, mime_type, st, html_filter)
+    if file_generation(file_path) == generation:
+        cache_module.cache.put(file_path, item)
+    return item
+
+
+async def handle_static_file(file_path: str, request_headers: Optional[Dict[str, str]] = None,
+                             stream_threshold: int = DEFAULT_STREAM_THRESHOLD,
+                             html_filter: Optional[Callable[[bytes], bytes]] = None
+                             ) -> Tuple[int, Union[bytes, FileResponse, None], Optional[dict]]:
+    """
+    Sert un fichier statique avec gestion du cache, des requêtes
+    conditionnelles (ETag, Last-Modified), des plages (Range) et de la
+    compression négociée (Accept-Encoding).
+
+    Les fichiers plus gros que stream_threshold ne passent pas par le cache :
+    un FileResponse est retourné et le contenu est envoyé par send_file_body.
 
     Args:
         file_path: Chemin absolu du fichier
-        if_none_match: Header If-None-Match du client
+        request_headers: Headers de la requête (clés en minuscules)
+        stream_threshold: Taille (octets) à partir de laquelle le fichier est streamé
+        html_filter: Transformation appliquée aux fichiers HTML avant mise en cache
+                     (ex: injection du widget de monitoring)
 
     Returns:
-        Tuple: (contenu, headers_extra) ou (b'', headers_304) pour 304
+        Tuple: (status_code, contenu, headers_extra), (404, None, None) si absent
     """
-    if not os.path.exists(file_path) or not os.path.isfile(file_path):
-        return b'', None  # 404
+    if request_headers is None:
+        request_headers = {}
 
     # Vérifier le cache
     cache_key = file_path
-    cached_item = cache.get(cache_key)
+    # Instance lue à chaque appel : la politique est choisie au démarrage (config)
+    cached_item = cache_module.cache.get(cache_key)
 
     if cached_item:
-        content, mime_type, etag, mtime = cached_item
-
-        # Vérifier si le fichier a changé
-        if should_use_cache(file_path, mtime):
-            # Vérifier ETag
-            if if_none_match == etag:
-                # 304 Not Modified
-                headers_304 = {
-                    'ETag': etag,
-                    'Cache-Control': 'public, max-age=3600'
-                }
-                return b'', headers_304
-
-            # Retourner depuis le cache
-            headers = {
-                'Content-Type': mime_type,
-                'ETag': etag,
-                'Cache-Control': 'public, max-age=3600'
-            }
-            return content, headers
+        content, mime_type, etag, mtime, variants = cached_item
+
+        # Avec un watcher, toute modification a déjà invalidé l'entrée : pas de stat
+        if watcher_active() or await check_cache_valid(file_path, mtime):
+            return await respond_from_memory(file_path, content, mime_type, etag, mtime,
+                                             variants, request_headers)
         else:
             # Fichier modifié, invalider le cache
-            cache.invalidate(cache_key)
+            cache_module.cache.invalidate(cache_key)
+
+    # Miss : stat frais (le disque va être lu de toute façon)
+    generation = file_generation(file_path)
+    try:
+        st = await run_io(os.stat, file_path)
+    except OSError:
+        return 404, None, None
+    if not stat.S_ISREG(st.st_mode):
+        return 404, None, None
 
     # Lire le fichier
     try:
-        with open(file_path, 'rb') as f:
-            content = f.read()
 
         # Détecter le type MIME
         mime_type = get_mime_type(file_path)
 
-        # Générer ETag
-        etag = generate_etag(content)
+        if st.st_size > stream_threshold:
+            # Gros fichier : ni lecture complète, ni cache. ETag faible dérivé du
+            # stat quelle que soit etag_strategy (hasher le fichier bloquerait l'envoi)
+            sidecars = await run_io(find_sidecars, file_path, st.st_mtime)
+            encoding = None
+            if 'range' not in request_headers:
+                encoding = negotiate_encoding(request_headers.get('accept-encoding'), list(sidecars))
+            if encoding:
+                # Sidecar précompressé envoyé depuis le disque
+                sidecar_path, sidecar_st = sidecars[encoding]
+                return build_static_response(sidecar_path, None, sidecar_st.st_size, mime_type,
+                                             variant_etag(stat_etag(st), encoding),
+                                             st.st_mtime, request_headers,
+                                             encoding=encoding, vary=True)
+            return build_static_response(file_path, None, st.st_size, mime_type,
+                                         stat_etag(st), st.st_mtime, request_headers,
+                                         vary=bool(sidecars))
 
-        # Mettre en cache
-        mtime = os.path.getmtime(file_path)
-        cache.put(cache_key, (content, mime_type, etag, mtime))
+        # If-Modified-Since seul : répondre 304 sans lire ni hasher le fichier
+        if 'if-none-match' not in request_headers and is_not_modified(request_headers, None, st.st_mtime):
+            return 304, b'', {
+                'Last-Modified': format_http_date(st.st_mtime),
+                'Cache-Control': CACHE_CONTROL,
+            }
 
-        # Headers
-        headers = {
-            'Content-Type': mime_type,
-            'ETag': etag,
-            'Cache-Control': 'public, max-age=3600'
-        }
+        # Un seul chargement par fichier, même si N clients le demandent en même temps
+        content, mime_type, etag, mtime, variants = await file_loads.do(
+            cache_key, lambda: load_file(file_path, mime_type, st, html_filter, generation)
+        )
 
-        return content, headers
+        return await respond_from_memory(file_path, content, mime_type, etag, mtime,
+                                         variants, request_headers)
 
     except (OSError, IOError) as e:
         print(f"Erreur lecture fichier {file_path}: {e}")
-        return b'', None
+        return 404, None, None
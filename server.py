@@ -147,23 +147,48 @@ if __name__ == "__main__":
 import json
 import logging
 import os
+import shutil
+import signal
 import sys
+import tempfile
 import time
-from typing import Tuple, Dict, Optional
-from urllib.parse import urlparse
+from typing import Callable, Tuple, Dict, List, Optional
 
 
 # Importer les modules du projet
-from utils.http_parser import parse_http_request, build_http_response
-from handlers.static import handle_static_file
-from handlers.php_cgi import execute_php_cgi
+from utils.http_parser import parse_http_request
+from utils.response import build_response, error_response, response_head, write_response
+from handlers.static import (
+    handle_static_file, FileResponse, send_file_body, invalidate_cached_file, file_loads
+)
+from handlers import file_watcher
+from handlers.file_watcher import stat_cache
+from handlers import compression
+from handlers.compression import compress_response
+from handlers import php_cgi
+from handlers.php_cgi import (
+    open_php_stream, read_php_headers, report_php_errors, PHPOverloadedError, PHPTimeoutError
+)
+from handlers.fastcgi import FastCGIError
+from handlers import php_cache as php_cache_module
+from handlers import fastcgi
+from handlers import database
 from handlers.redirect import get_redirect_location, build_redirect_response
-from handlers.monitoring import monitor, generate_monitoring_dashboard
-from handlers.monitoring_widget import inject_monitoring_widget
+from handlers.monitoring import (
+    monitor, generate_monitoring_dashboard, aggregate_worker_stats, measure_loop_lag
+)
+from handlers.monitoring_widget import inject_monitoring_widget, get_monitoring_widget
+from utils import io_pool
+from utils.io_pool import run_io
+from utils.request_body import RequestBody, RequestBodyError, RequestBodyTooLarge
+from utils.prefork import PreforkMaster, create_listen_socket, reuse_port_supported
 
 # Configuration globale
 CONFIG = {}
 
+# Répertoire partagé des stats en mode multi-processus (None si un seul processus)
+STATS_DIR: Optional[str] = None
+
 def load_config(config_path: str = "config.json") -> Dict:
     """
     Charge la configuration depuis le fichier JSON.
@@ -192,6 +217,25 @@ def load_config(config_path: str = "config.json") -> Dict:
         print(f"Erreur chargement config: {e}")
         sys.exit(1)
 
+def apply_handler_config() -> None:
+    """Transmet les sections de CONFIG aux modules handlers concernés."""
+    compression.COMPRESSION_CONFIG.update(CONFIG.get('compression', {}))
+    fastcgi.FASTCGI_CONFIG.update(CONFIG.get('fastcgi', {}))
+    php_cgi.PHP_LIMITS.update(CONFIG.get('php_limits', {}))
+    php_cache_module.configure_php_cache(**CONFIG.get('php_cache', {}))
+    database.DB_CONFIG.update(CONFIG.get('database', {}))
+    database.configure_query_cache(**CONFIG.get('query_cache', {}))
+    io_pool.configure_io_pool(CONFIG.get('io_threads', io_pool.IO_CONFIG['threads']))
+
+    # Politique et tailles du cache statique (tailles en Mo)
+    from handlers.cache import configure_cache, configure_etags
+    configure_etags(CONFIG.get('etag_strategy', 'md5'), CONFIG.get('etag_manifest'))
+    configure_cache(
+        CONFIG.get('cache_policy', 'lru'),
+        max_bytes=int(CONFIG.get('cache_max_size', 64) * 1024 * 1024),
+        max_entry_bytes=int(CONFIG.get('cache_max_entry_size', 2) * 1024 * 1024)
+    )
+
 def resolve_path(path: str, document_root: str) -> str:
     # Éviter les chemins avec .. ou absolus (sauf racine)
     if '..' in path:
@@ -212,7 +256,11 @@ def resolve_path(path: str, document_root: str) -> str:
 
 async def handle_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
     """
-    Gère une requête HTTP entrante.
+    Gère une connexion HTTP entrante.
+
+    Plusieurs requêtes peuvent être servies sur la même connexion
+    (keep-alive HTTP/1.1, y compris les requêtes pipelinées déjà présentes
+    dans le buffer de lecture).
 
     Args:
         reader: StreamReader pour lire la requête
@@ -220,183 +268,546 @@ async def handle_request(reader: asyncio.StreamReader, writer: asyncio.StreamWri
     """
     addr = writer.get_extra_info('peername')
     client_ip = addr[0] if addr else 'unknown'
-    
+
+    keep_alive_timeout = CONFIG.get('keep_alive_timeout', 5)
+    max_requests = CONFIG.get('keep_alive_max_requests', 100)
+
+    requests_served = 0
+
+    try:
+        while True:
+            requests_served += 1
+            # Pas de timeout pour la première requête, timeout d'inactivité ensuite
+            idle_timeout = keep_alive_timeout if requests_served > 1 else None
+            keep_alive = await process_request(
+                reader, writer, client_ip,
+                allow_keep_alive=requests_served < max_requests,
+                idle_timeout=idle_timeout
+            )
+            if not keep_alive:
+                break
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+        # Client inactif, requête tronquée ou connexion coupée
+        pass
+    finally:
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except Exception:
+            pass
+
+def wants_keep_alive(version: str, headers: Dict[str, str]) -> bool:
+    """
+    Détermine si le client souhaite garder la connexion ouverte.
+
+    HTTP/1.1 garde la connexion par défaut, HTTP/1.0 seulement avec
+    "Connection: keep-alive".
+
+    Args:
+        version: Version HTTP de la requête
+        headers: Headers de la requête (clés en minuscules)
+
+    Returns:
+        bool: True si la connexion doit rester ouverte
+    """
+    connection = headers.get('connection', '').lower()
+    if version == 'HTTP/1.1':
+        return 'close' not in connection
+    return 'keep-alive' in connection
+
+# Headers CGI recalculés par le serveur (non recopiés dans la réponse)
+PHP_SKIPPED_HEADERS = ('content-type', 'content-length', 'connection', 'location', 'transfer-encoding')
+
+# Octets retenus en fin de sortie HTML streamée pour y trouver </body> (widget)
+WIDGET_LOOKBEHIND = 64
+
+def php_response_headers(response_headers: Dict[str, str]) -> Dict[str, str]:
+    """Headers émis par PHP, hors headers gérés par le serveur."""
+    return {key: value for key, value in response_headers.items()
+            if key.lower() not in PHP_SKIPPED_HEADERS}
+
+def insert_widget_html(tail: bytes) -> bytes:
+    """Insère le widget avant </body> dans la fin d'une page HTML streamée."""
+    widget = get_monitoring_widget().encode('utf-8')
+    index = tail.lower().rfind(b'</body>')
+    if index < 0:
+        return tail + widget
+    return tail[:index] + widget + b'\n' + tail[index:]
+
+def on_document_change(path: Optional[str]) -> None:
+    """Invalide les caches touchés par une modification du document_root."""
+    invalidate_cached_file(path)
+    if path is None or path.endswith('.php'):
+        # Un script peut en inclure d'autres : vider tout le micro-cache PHP
+        php_cache_module.php_cache.clear()
+
+async def respond_php(writer: asyncio.StreamWriter, file_path: str, method: str,
+                      query_string: str, version: str, headers: Dict[str, str], body: RequestBody,
+                      keep_alive: bool) -> Tuple[int, List[bytes], bool]:
+    """
+    Exécute un script PHP et répond au client.
+
+    Une sortie courte est bufferisée (Content-Length, widget, compression
+    complète). Au-delà de php_stream_threshold octets, les headers partent
+    tout de suite et le body est streamé en chunked pendant que PHP tourne.
+    Avec le micro-cache activé, les réponses GET/HEAD cacheables sont
+    resservies sans exécuter PHP.
+
+    Un body Content-Length est transmis au script au fil de sa réception
+    (php_request_body = "stream"). Un body chunked, ou tout body en mode
+    "spool", est d'abord mis de côté (mémoire, puis fichier temporaire)
+    car PHP a besoin de CONTENT_LENGTH.
+
+    Args:
+        writer: Flux d'écriture vers le client
+        file_path: Script PHP
+        method, query_string, version, headers, body: Requête
+        keep_alive: Connexion persistante demandée
+
+    Returns:
+        Tuple: (status_code, buffers de la réponse à envoyer ([] si déjà envoyée),
+                connexion réutilisable)
+    """
+    cache_key = None
+    if php_cache_module.PHP_CACHE_CONFIG['enabled']:
+        entry, cache_key = await php_cache_module.php_cache.lookup(method, file_path, query_string, headers)
+        if entry is not None:
+            response_headers = dict(entry.headers)
+            response_headers['X-Cache'] = 'HIT'
+            return 200, await build_php_response(
+                entry.body, entry.headers.get('content-type', 'text/html'), response_headers,
+                headers.get('accept-encoding'), keep_alive, entry
+            ), keep_alive
+
+    try:
+        if body.length is None or CONFIG.get('php_request_body', 'stream') == 'spool':
+            await body.spool()
+            headers = {name: value for name, value in headers.items() if name != 'transfer-encoding'}
+        return await execute_php_response(writer, file_path, method, query_string, version,
+                                          headers, body, keep_alive, cache_key)
+    finally:
+        if cache_key is not None:
+            # Échec, redirection ou sortie streamée : rien à mettre en cache,
+            # les requêtes en attente exécutent le script elles-mêmes
+            php_cache_module.php_cache.complete(cache_key, None, None)
+
+async def execute_php_response(writer: asyncio.StreamWriter, file_path: str, method: str,
+                               query_string: str, version: str, headers: Dict[str, str], body: RequestBody,
+                               keep_alive: bool, cache_key: Optional[tuple]) -> Tuple[int, List[bytes], bool]:
+    """
+    Exécute le script PHP (partie non cachée de respond_php).
+
+    Args:
+        cache_key: Clé du micro-cache à compléter avec la réponse bufferisée (None si pas de cache)
+
+    Returns:
+        Tuple: Comme respond_php
+    """
+    try:
+        stream = await open_php_stream(
+            file_path, method, query_string, headers, body,
+            CONFIG.get('php_cgi_path', '/usr/bin/php-cgi')
+        )
+    except PHPOverloadedError as e:
+        # Surcharge : le client peut réessayer plus tard
+        print(f"PHP surchargé: {e}")
+        retry_after = str(php_cgi.PHP_LIMITS['retry_after'])
+        return 503, error_response(503, keep_alive, {'Retry-After': retry_after}), keep_alive
+    if stream is None:
+        return 500, error_response(500, keep_alive), keep_alive
+
+    try:
+        try:
+            extra_headers, first = await read_php_headers(stream)
+
+            # Redirection : laisser le script finir avant de répondre
+            if extra_headers and 'location' in extra_headers:
+                while await stream.read():
+                    pass
+            else:
+                # Chunked impossible en HTTP/1.0 : tout bufferiser
+                threshold = CONFIG.get('php_stream_threshold', 32 * 1024)
+                if version != 'HTTP/1.1':
+                    threshold = float('inf')
+                parts = [first]
+                buffered = len(first)
+                while buffered <= threshold:
+                    chunk = await stream.read()
+                    if not chunk:
+                        break
+                    parts.append(chunk)
+                    buffered += len(chunk)
+        except FastCGIError as e:
+            print(f"Erreur FastCGI {file_path}: {e}")
+            return 500, error_response(500, keep_alive), keep_alive
+        except PHPTimeoutError as e:
+            print(f"Erreur PHP: {e}")
+            return 504, error_response(504, keep_alive), keep_alive
+
+        content_type = "text/html"
+        response_headers = {}
+        if extra_headers:
+            content_type = extra_headers.get('content-type', content_type)
+            response_headers.update(extra_headers)
+
+        if stream.app_status is None:
+            # Script encore en cours : streamer la suite
+            return 200, [], await stream_php_response(
+                writer, stream, file_path, b''.join(parts), content_type, response_headers,
+                headers.get('accept-encoding'), keep_alive, method == 'HEAD'
+            ) and keep_alive
+    finally:
+        await stream.close()
+
+    if not report_php_errors(stream, file_path):
+        return 500, error_response(500, keep_alive), keep_alive
+
+    if extra_headers and 'location' in extra_headers:
+        # PHP veut rediriger
+        location = extra_headers['location']
+
+        # Utiliser 303 See Other après POST, 302 Found sinon
+        status_code = 303 if method == "POST" else 302
+        print(f"← {status_code} → {location}")
+        return status_code, build_response(
+            status_code, headers={'Location': location, 'Pragma': 'no-cache', 'Expires': '0'},
+            keep_alive=keep_alive, cache_control='no-cache, no-store, must-revalidate'
+        ), keep_alive
+
+    content = b''.join(parts)
+    if not content and method != 'HEAD':
+        return 500, error_response(500, keep_alive), keep_alive
+
+    # Injecter le widget si HTML
+    if 'text/html' in content_type:
+        content = inject_monitoring_widget(content)
+
+    if cache_key is not None:
+        php_cache_module.php_cache.complete(cache_key, extra_headers, content)
+        response_headers['X-Cache'] = 'MISS'
+
+    return 200, await build_php_response(
+        content, content_type, response_headers, headers.get('accept-encoding'), keep_alive
+    ), keep_alive
+
+async def build_php_response(content: bytes, content_type: str, response_headers: Dict[str, str],
+                             accept_encoding: Optional[str], keep_alive: bool,
+                             entry: Optional[php_cache_module.PHPCacheEntry] = None) -> List[bytes]:
+    """
+    Construit une réponse PHP bufferisée (compression comprise).
+
+    Args:
+        content: Corps (widget déjà injecté)
+        content_type: Type MIME
+        response_headers: Headers à renvoyer (modifié en place)
+        accept_encoding: Header Accept-Encoding du client
+        keep_alive: Connexion persistante
+        entry: Entrée du micro-cache servie, dont les variantes compressées sont réutilisées
+
+    Returns:
+        List[bytes]: Buffers de la réponse (en-tête, corps)
+    """
+    # Compresser si le client l'accepte et si PHP ne l'a pas déjà fait
+    if 'content-encoding' not in response_headers:
+        if entry is None:
+            content, encoding = await compress_response(content, content_type, accept_encoding)
+        else:
+            encoding = None
+            if len(content) >= compression.COMPRESSION_CONFIG['min_size']:
+                encoding = compression.choose_encoding(accept_encoding, content_type)
+            if encoding and encoding not in entry.variants:
+                # Première demande de cet encodage : compresser une fois pour toutes
+                compressed = await compression.compress_async(content, encoding)
+                php_cache_module.php_cache.add_variant(
+                    entry, encoding, compressed if len(compressed) < len(content) else None
+                )
+            if encoding and entry.variants[encoding] is not None:
+                content = entry.variants[encoding]
+            else:
+                encoding = None
+        if encoding:
+            response_headers['Content-Encoding'] = encoding
+        if compression.should_compress(content_type):
+            response_headers['Vary'] = 'Accept-Encoding'
+
+    return build_response(200, content, content_type, php_response_headers(response_headers), keep_alive)
+
+async def stream_php_response(writer: asyncio.StreamWriter, stream, file_path: str,
+                              first: bytes, content_type: str, response_headers: Dict[str, str],
+                              accept_encoding: Optional[str], keep_alive: bool,
+                              head_only: bool = False) -> bool:
+    """
+    Envoie une sortie PHP en Transfer-Encoding: chunked au fil de sa production.
+
+    Mémoire bornée : chaque morceau lu est envoyé (drain) avant le suivant.
+    Pour une requête HEAD (head_only), seuls les headers sont envoyés et la
+    sortie du script est lue jusqu'au bout sans être transmise.
+
+    Returns:
+        bool: False si la réponse a été tronquée (la connexion doit être fermée)
+    """
+    compressor = None
+    if 'content-encoding' not in response_headers:
+        encoding = compression.choose_encoding(accept_encoding, content_type)
+        if encoding:
+            compressor = compression.StreamCompressor(encoding)
+            response_headers['Content-Encoding'] = encoding
+        if compression.should_compress(content_type):
+            response_headers['Vary'] = 'Accept-Encoding'
+
+    writer.write(response_head(
+        200, content_type, {**php_response_headers(response_headers), 'Transfer-Encoding': 'chunked'},
+        keep_alive=keep_alive
+    ))
+
+    if head_only:
+        await writer.drain()
+        try:
+            while await stream.read():
+                pass
+        except (FastCGIError, PHPTimeoutError) as e:
+            print(f"Erreur PHP {file_path}: {e}")
+        report_php_errors(stream, file_path)
+        return True
+
+    def write_chunk(data: bytes) -> None:
+        if compressor:
+            data = compressor.compress(data)
+        if data:
+            writer.write(b"%x\r\n" % len(data) + data + b"\r\n")
+
+    is_html = 'text/html' in content_type
+    held = b''
+    data = first
+    while data:
+        if is_html:
+            # Garder la fin pour y insérer le widget
+            data = held + data
+            held = data[-WIDGET_LOOKBEHIND:]
+            data = data[:-WIDGET_LOOKBEHIND]
+        write_chunk(data)
+        await writer.drain()
+        try:
+            data = await stream.read()
+        except (FastCGIError, PHPTimeoutError) as e:
+            # Headers déjà envoyés : réponse tronquée
+            print(f"Erreur PHP {file_path}: {e}")
+            return False
+
+    if is_html:
+        write_chunk(insert_widget_html(held))
+    if compressor:
+        tail = compressor.finish()
+        if tail:
+            writer.write(b"%x\r\n" % len(tail) + tail + b"\r\n")
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+    report_php_errors(stream, file_path)
+    return True
+
+async def stat_check(check: Callable[[str], bool], path: str) -> bool:
+    """
+    Test stat_cache (isdir, isfile, exists) sans bloquer la boucle : le stat
+    n'est délégué au pool d'I/O que s'il n'est pas déjà dans le cache.
+
+    Args:
+        check: Méthode de stat_cache à appeler
+        path: Chemin à tester
+
+    Returns:
+        bool: Résultat du test
+    """
+    if stat_cache.is_fresh(path):
+        return check(path)
+    return await run_io(check, path)
+
+async def process_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                          client_ip: str,
+                          allow_keep_alive: bool = True,
+                          idle_timeout: Optional[float] = None) -> bool:
+    """
+    Lit et traite une requête HTTP sur une connexion.
+
+    Args:
+        reader: StreamReader pour lire la requête
+        writer: StreamWriter pour envoyer la réponse
+        client_ip: IP du client
+        allow_keep_alive: False si la connexion a atteint son quota de requêtes
+        idle_timeout: Délai max d'attente des données (None = pas de limite)
+
+    Returns:
+        bool: True si la connexion peut servir une autre requête
+    """
     # Timer pour mesurer la latence
     start_time = time.time()
     status_code = 200
     method = 'UNKNOWN'
     path = '/'
+    keep_alive = False
+    head_only = False     # HEAD : en-têtes seuls, sans corps
+    body = None
 
     try:
-        # Lire la requête complète jusqu'aux headers
-        data = b''
-        while not data.endswith(b'\r\n\r\n'):
-            chunk = await reader.read(1024)
-            if not chunk:
-                break
-            data += chunk
-            if len(data) > 8192:
-                response = build_http_response(400, "Bad Request")
-                writer.write(response)
-                await writer.drain()
-                status_code = 400
-                monitor.record_request(method, path, status_code, time.time() - start_time, client_ip)
-                return
-
-        if not data:
-            return
-
-        # Séparer headers et body (le body peut être déjà dans data après \r\n\r\n)
-        header_end = data.find(b'\r\n\r\n')
-        if header_end == -1:
-            # Pas de fin de headers trouvée
-            response = build_http_response(400, "Bad Request")
-            writer.write(response)
-            await writer.drain()
-            status_code = 400
-            monitor.record_request(method, path, status_code, time.time() - start_time, client_ip)
-            return
-            
-        headers_part = data[:header_end + 4]  # Inclut le \r\n\r\n pour le parser
-        body_already_read = data[header_end + 4:]  # Body déjà lu
-        
-        # Parser la requête (headers seulement)
+        # Lire la requête jusqu'à la fin des headers (les octets suivants,
+        # body ou requêtes pipelinées, restent dans le buffer du StreamReader)
+        max_header_size = CONFIG.get('max_header_size', 16 * 1024)
         try:
-            method, path, version, headers, _ = parse_http_request(headers_part)
-            print(f"→ {method} {path}")
-        except ValueError as e:
-            print(f"Erreur: Requête malformée - {e}")
-            response = build_http_response(400, "Bad Request")
-            writer.write(response)
-            await writer.drain()
+            headers_part = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), idle_timeout)
+        except asyncio.IncompleteReadError as e:
+            if not e.partial:
+                # Connexion fermée entre deux requêtes
+                return False
             status_code = 400
-            monitor.record_request(method, path, status_code, time.time() - start_time, client_ip)
-            return
-        
-        # Lire le body si Content-Length est présent (POST, PUT, etc.)
-        body = body_already_read
-        content_length = headers.get('content-length')
-        if content_length:
+        except asyncio.LimitOverrunError:
+            status_code = 431
+        else:
+            if len(headers_part) > max_header_size:
+                status_code = 431
+
+        if status_code == 200:
+            # Parser la requête (headers seulement)
             try:
-                content_length = int(content_length)
-                # Lire le reste du body si nécessaire
-                while len(body) < content_length:
-                    chunk = await reader.read(min(4096, content_length - len(body)))
-                    if not chunk:
-                        break
-                    body += chunk
-            except ValueError:
-                pass
+                request = parse_http_request(headers_part)
+                method, path, version, headers = request.method, request.path, request.version, request.headers
+                head_only = method == 'HEAD'
+                print(f"→ {method} {request.target}")
+            except ValueError as e:
+                print(f"Erreur: Requête malformée - {e}")
+                status_code = 400
+
+        max_body_size = CONFIG.get('max_body_size', 10 * 1024 * 1024)
+        chunked = False
+        if status_code == 200:
+            # Corps délimité par Content-Length ou Transfer-Encoding: chunked (POST, PUT, etc.)
+            content_length = headers.get('content-length', '0').strip() or '0'
+            transfer_encoding = headers.get('transfer-encoding', '').strip().lower()
+            if transfer_encoding:
+                chunked = True
+                if transfer_encoding != 'chunked':
+                    status_code = 501
+                elif 'content-length' in headers:
+                    # Les deux à la fois : délimitation ambiguë (request smuggling)
+                    status_code = 400
+            elif not (content_length.isascii() and content_length.isdigit()):
+                # Longueur invalide : impossible de délimiter la requête suivante
+                # (isdigit() seul accepte '²' ou '٣', que int() refuse)
+                status_code = 400
+            elif int(content_length) > max_body_size:
+                status_code = 413
+            content_length = int(content_length) if status_code == 200 and not chunked else 0
+
+        if status_code != 200:
+            # Requête illisible ou hors limites : répondre puis fermer la connexion
+            write_response(writer, error_response(status_code), head_only)
+            await writer.drain()
+            monitor.record_request(method, path, status_code, time.time() - start_time, client_ip)
+            return False
+
+        # Body lu seulement par le handler qui en a besoin (streamé vers PHP, en mémoire pour l'API)
+        body = RequestBody(
+            reader, content_length, chunked=chunked, max_size=max_body_size,
+            spill_threshold=CONFIG.get('request_body_spill_threshold', 1024 * 1024),
+            writer=writer, expect_continue=headers.get('expect', '').lower() == '100-continue'
+        )
+
+        keep_alive = allow_keep_alive and wants_keep_alive(version, headers)
 
-        # Parser l'URL
-        parsed_url = urlparse(path)
-        path_only = parsed_url.path
-        query_string = parsed_url.query
+        # Path décodé et query string brute (séparés avant le décodage des %xx)
+        path_only = path
+        query_string = request.query_string
         
         # Endpoint spécial pour le monitoring
         if path_only == '/_monitor' or path_only == '/_monitoring':
-            # Mettre à jour les stats du cache
-            from handlers.cache import cache
-            monitor.update_cache_stats(cache.get_stats())
-            
             # Générer le dashboard
-            stats = monitor.get_stats()
+            stats = collect_monitor_stats()
             html_content = generate_monitoring_dashboard(stats)
             
-            status_line = "HTTP/1.1 200 OK\r\n"
-            headers_str = "Content-Type: text/html; charset=utf-8\r\n"
-            headers_str += f"Content-Length: {len(html_content)}\r\n"
-            headers_str += "Connection: close\r\n\r\n"
-            response = (status_line + headers_str).encode() + html_content
-            
-            writer.write(response)
+            write_response(writer, build_response(
+                200, html_content, 'text/html; charset=utf-8', keep_alive=keep_alive
+            ), head_only)
             await writer.drain()
             status_code = 200
             monitor.record_request(method, path_only, status_code, time.time() - start_time, client_ip)
-            return
+            return keep_alive
         
         # API JSON pour le widget
         if path_only == '/_monitor/api':
-            from handlers.cache import cache
-            monitor.update_cache_stats(cache.get_stats())
-            
-            stats = monitor.get_stats()
+            stats = collect_monitor_stats()
             json_content = json.dumps(stats).encode('utf-8')
             
-            status_line = "HTTP/1.1 200 OK\r\n"
-            headers_str = "Content-Type: application/json\r\n"
-            headers_str += f"Content-Length: {len(json_content)}\r\n"
-            headers_str += "Connection: close\r\n\r\n"
-            response = (status_line + headers_str).encode() + json_content
-            
-            writer.write(response)
+            write_response(writer, build_response(
+                200, json_content, 'application/json', keep_alive=keep_alive
+            ), head_only)
             await writer.drain()
             status_code = 200
             monitor.record_request(method, path_only, status_code, time.time() - start_time, client_ip)
-            return
+            return keep_alive
         
         # API SQL - Exécuter des requêtes SQL
         if path_only == '/api/sql':
-            from handlers.api_sql import handle_api_sql
+            from handlers.api_sql import handle_api_sql, SQLStreamResponse, send_sql_stream
             try:
-                status_code, response_body, content_type = await handle_api_sql(method, path_only, body, query_string)
-                
-                status_line = f"HTTP/1.1 {status_code} OK\r\n"
-                headers_str = f"Content-Type: {content_type}\r\n"
-                headers_str += f"Content-Length: {len(response_body)}\r\n"
-                headers_str += "Connection: close\r\n\r\n"
-                response = (status_line + headers_str).encode() + response_body
-                
-                writer.write(response)
+                status_code, response_body, content_type = await handle_api_sql(
+                    method, path_only, await body.read(), query_string
+                )
+
+                if isinstance(response_body, SQLStreamResponse):
+                    # Résultat lu au fil de l'eau : chunked en HTTP/1.1, fermeture en HTTP/1.0
+                    chunked = version == 'HTTP/1.1'
+                    keep_alive = await send_sql_stream(
+                        writer, response_body, keep_alive and chunked, chunked, head_only
+                    ) and keep_alive and chunked
+                    monitor.record_request(method, path_only, status_code, time.time() - start_time, client_ip)
+                    return keep_alive
+
+                write_response(writer, build_response(
+                    status_code, response_body, content_type, keep_alive=keep_alive
+                ), head_only)
                 await writer.drain()
                 monitor.record_request(method, path_only, status_code, time.time() - start_time, client_ip)
-                return
+                return keep_alive
             except Exception as e:
                 print(f"Erreur API SQL: {e}")
-                response = build_http_response(500, f"Erreur: {e}")
-                writer.write(response)
+                write_response(writer, error_response(500, keep_alive, message=f"Erreur: {e}"), head_only)
                 await writer.drain()
                 monitor.record_request(method, path_only, 500, time.time() - start_time, client_ip)
-                return
+                return keep_alive
             except Exception as e:
                 print(f"Erreur API SQL: {e}")
-                response = build_http_response(500, f"Erreur: {e}")
-                writer.write(response)
+                write_response(writer, error_response(500, keep_alive, message=f"Erreur: {e}"), head_only)
                 await writer.drain()
                 monitor.record_request(method, path_only, 500, time.time() - start_time, client_ip)
-                return
+                return keep_alive
 
         # Vérifier les redirections
         redirect_info = get_redirect_location(path_only, CONFIG.get('redirects', {}))
         if redirect_info:
             location, permanent = redirect_info
-            response = build_redirect_response(location, permanent)
             status_code = 301 if permanent else 302
-            writer.write(response)
+            write_response(writer, build_redirect_response(location, permanent, keep_alive=keep_alive), head_only)
             await writer.drain()
             monitor.record_request(method, path_only, status_code, time.time() - start_time, client_ip)
-            return
+            return keep_alive
 
         # Résoudre le chemin du fichier
         file_path = resolve_path(path_only, CONFIG['document_root'])
 
         if not file_path:
             # Chemin invalide
-            response = build_http_response(400, "Bad Request")
-            writer.write(response)
+            write_response(writer, error_response(400, keep_alive), head_only)
             await writer.drain()
             status_code = 400
             monitor.record_request(method, path_only, status_code, time.time() - start_time, client_ip)
-            return
+            return keep_alive
 
         # Vérifier si c'est un répertoire
-        if os.path.isdir(file_path):
+        if await stat_check(stat_cache.isdir, file_path):
             # Chercher index files (redirige direct ao @index.html sinon)
             index_files = CONFIG.get('index_files', ['index.html'])
             found_index = None
             for index_file in index_files:
                 index_path = os.path.join(file_path, index_file)
-                if os.path.isfile(index_path):
+                if await stat_check(stat_cache.isfile, index_path):
                     found_index = index_path
                     break
 
@@ -405,179 +816,322 @@ async def handle_request(reader: asyncio.StreamReader, writer: asyncio.StreamWri
             else:
                 # Générer listing répertoire (joli)
                 from handlers.directory_listing import generate_directory_listing
-                html_content = generate_directory_listing(file_path, path_only, CONFIG['document_root'])
+                html_content = await run_io(
+                    generate_directory_listing, file_path, path_only, CONFIG['document_root']
+                )
                 
                 # Injecter le widget
                 html_content = inject_monitoring_widget(html_content)
+
+                # Compresser si le client l'accepte (dans un thread)
+                html_content, encoding = await compress_response(
+                    html_content, 'text/html', headers.get('accept-encoding')
+                )
                 
-                status_line = "HTTP/1.1 200 OK\r\n"
-                headers_str = "Content-Type: text/html; charset=utf-8\r\n"
-                headers_str += f"Content-Length: {len(html_content)}\r\n"
-                headers_str += "Connection: close\r\n\r\n"
-                response = (status_line + headers_str).encode() + html_content
-                
-                writer.write(response)
+                listing_headers = {'Vary': 'Accept-Encoding'}
+                if encoding:
+                    listing_headers['Content-Encoding'] = encoding
+                write_response(writer, build_response(
+                    200, html_content, 'text/html; charset=utf-8', listing_headers, keep_alive
+                ), head_only)
                 await writer.drain()
                 status_code = 200
                 monitor.record_request(method, path_only, status_code, time.time() - start_time, client_ip)
-                return
+                return keep_alive
 
         # Vérifier si le fichier existe
-        if not os.path.exists(file_path):
-            response = build_http_response(404, "Not Found")
-            writer.write(response)
+        if not await stat_check(stat_cache.exists, file_path):
+            write_response(writer, error_response(404, keep_alive), head_only)
             await writer.drain()
             status_code = 404
             monitor.record_request(method, path_only, status_code, time.time() - start_time, client_ip)
-            return
+            return keep_alive
+
+        # Corps envoyé depuis le disque après les headers (gros fichiers)
+        file_body = None
 
         # Traiter selon le type de fichier
         if file_path.endswith('.php') and CONFIG.get('enable_php', True):
-            # Exécuter PHP
-            content, extra_headers = await execute_php_cgi(
-                file_path, method, query_string, headers, body,
-                CONFIG.get('php_cgi_path', '/usr/bin/php-cgi')
+            # Exécuter PHP (réponse streamée si la sortie est longue)
+            status_code, response, keep_alive = await respond_php(
+                writer, file_path, method, query_string, version, headers, body,
+                keep_alive
             )
-            
-            # Vérifier si c'est une redirection (content peut être vide pour une redirection)
-            if extra_headers and 'location' in extra_headers:
-                # PHP veut rediriger
-                location = extra_headers['location']
-                
-                # Utiliser 303 See Other après POST, 302 Found sinon
-                status_code = 303 if method == "POST" else 302
-                status_text = "See Other" if method == "POST" else "Found"
-                
-                status_line = f"HTTP/1.1 {status_code} {status_text}\r\n"
-                headers_str = f"Location: {location}\r\n"
-                headers_str += "Cache-Control: no-cache, no-store, must-revalidate\r\n"
-                headers_str += "Pragma: no-cache\r\n"
-                headers_str += "Expires: 0\r\n"
-                headers_str += "Connection: close\r\n"
-                headers_str += "Content-Length: 0\r\n\r\n"
-                response = (status_line + headers_str).encode()
-                print(f"← {status_code} {status_text} → {location}")
-            elif content:
-                # Réponse normale
-                content_type = "text/html"
-                response_headers = {}
-                if extra_headers:
-                    if 'content-type' in extra_headers:
-                        content_type = extra_headers['content-type']
-                    response_headers.update(extra_headers)
-                
-                # Injecter le widget si HTML
-                if 'text/html' in content_type:
-                    content = inject_monitoring_widget(content)
-
-                # PHP retourne des bytes
-                status_line = "HTTP/1.1 200 OK\r\n"
-                headers_str = f"Content-Type: {content_type}\r\n"
-                headers_str += f"Content-Length: {len(content)}\r\n"
-                headers_str += "Connection: close\r\n"
-                for key, value in response_headers.items():
-                    if key.lower() not in ['content-type', 'content-length', 'connection', 'location']:
-                        headers_str += f"{key}: {value}\r\n"
-                headers_str += "\r\n"
-                response = (status_line + headers_str).encode() + content
-            else:
-                response = build_http_response(500, "Internal Server Error")
-                status_code = 500
-
         else:
             # Fichier statique
-            content, extra_headers = await handle_static_file(
-                file_path, headers.get('if-none-match')
+            status_code, content, extra_headers = await handle_static_file(
+                file_path, headers,
+                CONFIG.get('static_stream_threshold', 1024 * 1024),
+                html_filter=inject_monitoring_widget
             )
 
             if content is None:
                 # 404
-                response = build_http_response(404, "Not Found")
-                status_code = 404
-            elif not content:
-                # 304 Not Modified
-                response = build_http_response(304, "", extra_headers=extra_headers)
-                status_code = 304
+                response = error_response(404, keep_alive)
+            elif status_code in (304, 416):
+                # 304 Not Modified / 416 Range Not Satisfiable
+                response = build_response(status_code, headers=extra_headers, keep_alive=keep_alive)
+            elif isinstance(content, FileResponse):
+                # Gros fichier : headers maintenant, contenu envoyé depuis le disque
+                file_body = content
+                response = build_response(status_code, headers=extra_headers, keep_alive=keep_alive,
+                                          content_length=len(content))
             else:
-                # Contenu avec headers de cache - gérer binaire vs texte
-                if isinstance(content, bytes):
-                    # Injecter le widget si c'est du HTML
-                    content_type = extra_headers.get('Content-Type', 'application/octet-stream')
-                    if 'text/html' in content_type:
-                        content = inject_monitoring_widget(content)
-                    
-                    # Fichier binaire - construire réponse manuellement
-                    status_line = "HTTP/1.1 200 OK\r\n"
-                    headers_str = f"Content-Type: {content_type}\r\n"
-                    headers_str += f"Content-Length: {len(content)}\r\n"
-                    if 'ETag' in extra_headers:
-                        headers_str += f"ETag: {extra_headers['ETag']}\r\n"
-                    if 'Cache-Control' in extra_headers:
-                        headers_str += f"Cache-Control: {extra_headers['Cache-Control']}\r\n"
-                    headers_str += "Connection: close\r\n\r\n"
-                    response = (status_line + headers_str).encode() + content
-                    status_code = 200
-                else:
-                    # Contenu texte
-                    response = build_http_response(200, content, extra_headers=extra_headers)
-                    status_code = 200
-
-        # Envoyer la réponse
-        writer.write(response)
+                # 200 ou 206 (Range)
+                response = build_response(status_code, content, headers=extra_headers, keep_alive=keep_alive)
+
+        # Envoyer la réponse (en-tête et corps sans concaténation)
+        write_response(writer, response, head_only)
         await writer.drain()
+        if file_body is not None and not head_only:
+            if not await send_file_body(writer, file_body):
+                keep_alive = False
         
         # Enregistrer la requête dans le monitoring
         latency = time.time() - start_time
         monitor.record_request(method, path_only, status_code, latency, client_ip)
+        return keep_alive
 
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+        # Client inactif, body tronqué ou connexion coupée : fermer sans répondre
+        raise
+    except (RequestBodyError, RequestBodyTooLarge) as e:
+        # Body chunked invalide ou trop gros, détecté en le lisant : répondre puis fermer
+        print(f"Erreur body: {e}")
+        status_code = 413 if isinstance(e, RequestBodyTooLarge) else 400
+        write_response(writer, error_response(status_code), head_only)
+        await writer.drain()
+        monitor.record_request(method, path, status_code, time.time() - start_time, client_ip)
+        return False
     except Exception as e:
         print(f"Erreur traitement requête: {e}")
         status_code = 500
         try:
-            response = build_http_response(500, "Internal Server Error")
-            writer.write(response)
+            write_response(writer, error_response(500), head_only)
             await writer.drain()
             monitor.record_request(method, path, status_code, time.time() - start_time, client_ip)
         except:
             pass
+        return False
     finally:
-        writer.close()
-        await writer.wait_closed()
+        if body is not None:
+            try:
+                # Body ignoré par le handler : le vider pour lire la requête suivante
+                # (UnreadBodyError s'il est trop gros ou mal formé : la connexion est fermée)
+                await body.discard()
+            finally:
+                body.close()
 
-async def main():
-    """Fonction principale du serveur."""
-    global CONFIG
-    CONFIG = load_config()
+def collect_monitor_stats() -> Dict:
+    """
+    Collecte les statistiques du serveur pour /_monitor.
+    En mode multi-processus, agrège les stats de tous les workers.
+
+    Returns:
+        Dict: Statistiques (format PerformanceMonitor.get_stats())
+    """
+    from handlers.cache import cache
+    monitor.update_cache_stats({**cache.get_stats(), **file_loads.get_stats()})
+    monitor.update_php_cache_stats(php_cache_module.php_cache.get_stats())
+    monitor.update_io_stats(io_pool.get_stats())
+    if fastcgi.pool is not None:
+        monitor.update_fastcgi_stats(fastcgi.pool.get_stats())
+    monitor.update_db_stats(database.get_pool_stats())
+    monitor.update_query_cache_stats(database.query_cache.get_stats())
+
+    if STATS_DIR:
+        # Publier nos compteurs à jour avant de lire ceux des autres workers
+        monitor.write_state_file(STATS_DIR)
+        return aggregate_worker_stats(STATS_DIR)
+    return monitor.get_stats()
+
+async def export_stats_periodically(interval: float = 1.0) -> None:
+    """Publie régulièrement les stats de ce worker dans STATS_DIR."""
+    from handlers.cache import cache
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            monitor.update_cache_stats({**cache.get_stats(), **file_loads.get_stats()})
+            monitor.update_php_cache_stats(php_cache_module.php_cache.get_stats())
+            monitor.update_io_stats(io_pool.get_stats())
+            if fastcgi.pool is not None:
+                monitor.update_fastcgi_stats(fastcgi.pool.get_stats())
+            monitor.update_db_stats(database.get_pool_stats())
+            monitor.update_query_cache_stats(database.query_cache.get_stats())
+            monitor.write_state_file(STATS_DIR)
+        except OSError as e:
+            print(f"Erreur export stats: {e}")
+
+async def save_etag_manifest_periodically(interval: float = 30.0) -> None:
+    """Persiste régulièrement les hash calculés (ETags forts sans rehash au redémarrage)."""
+    from handlers import cache as cache_module
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_io(cache_module.etag_manifest.save)
+        except OSError as e:
+            print(f"Erreur sauvegarde manifeste ETag: {e}")
 
+async def serve(sock=None) -> None:
+    """
+    Boucle asyncio d'un processus serveur (processus unique ou worker).
+
+    Args:
+        sock: Socket d'écoute héritée du maître (None = créer la socket ici)
+    """
     host = CONFIG['host']
     port = CONFIG['port']
 
-    print(f"Serveur HTTP démarré sur {host}:{port}")
-    print(f"Document root: {CONFIG['document_root']}")
-    print(f"PHP-CGI: {'activé' if CONFIG.get('enable_php', True) else 'désactivé'}")
-    
-    # Initialiser MySQL
+    # Initialiser MySQL (un pool par processus)
     try:
-        from handlers import database
         await database.init_db()
         print("MySQL: connecté")
     except Exception as e:
         print(f"MySQL: non disponible ({e})")
 
-    server = await asyncio.start_server(handle_request, host, port)
+    # Buffer de lecture par connexion : readuntil() lève LimitOverrunError
+    # (431) si la fin des headers n'arrive pas dans ces limites
+    reader_limit = max(CONFIG.get('max_header_size', 16 * 1024), 64 * 1024)
+
+    # Connexions acceptées seulement une fois le processus prêt (start_serving)
+    if sock is not None:
+        server = await asyncio.start_server(handle_request, sock=sock, limit=reader_limit, start_serving=False)
+    else:
+        server = await asyncio.start_server(handle_request, host, port, limit=reader_limit, start_serving=False)
+
+    # Workers PHP persistants (un pool par processus), sinon CGI classique
+    if CONFIG.get('enable_php', True):
+        php_pool = await fastcgi.start_pool(CONFIG.get('php_cgi_path', '/usr/bin/php-cgi'),
+                                            php_cgi.PHP_LIMITS['queue_timeout'])
+        if php_pool:
+            print(f"PHP: FastCGI ({len(php_pool.workers)} workers)")
+        else:
+            print("PHP: CGI (un processus par requête)")
+        php_limiter = php_cgi.configure_limiter(len(php_pool.workers) if php_pool else None)
+        print(f"PHP: {php_limiter.max_concurrent} scripts simultanés max, "
+              f"file de {php_limiter.max_queue}")
+
+    # Invalidation du cache sur modification du document_root (sinon stats à TTL court)
+    watch_mode = file_watcher.start_watcher(
+        CONFIG['document_root'], on_document_change,
+        mode=CONFIG.get('file_watcher', 'auto'),
+        poll_interval=CONFIG.get('file_watcher_poll_interval', 2),
+        stat_ttl=CONFIG.get('stat_cache_ttl', 1)
+    )
+    print(f"Surveillance du document_root: {watch_mode or 'désactivée'}")
+
+    # Arrêt propre sur SIGTERM (envoyé par le maître en mode multi-processus)
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, stop.set)
+    except (NotImplementedError, AttributeError):
+        pass
+
+    export_task = asyncio.create_task(export_stats_periodically()) if STATS_DIR else None
+    # Retard de la boucle : prouve qu'aucun appel bloquant ne la fige
+    lag_task = asyncio.create_task(measure_loop_lag(CONFIG.get('loop_lag_interval', 0.5)))
+    manifest_task = asyncio.create_task(save_etag_manifest_periodically()) if CONFIG.get('etag_manifest') else None
 
     async with server:
-        print("Serveur prêt. Ctrl+C pour arrêter.")
         try:
-            await server.serve_forever()
-        except KeyboardInterrupt:
-            print("Arrêt du serveur...")
+            await server.start_serving()
+            print("Serveur prêt. Ctrl+C pour arrêter.")
+            await stop.wait()
+        finally:
+            print(f"Arrêt du serveur (pid {os.getpid()})...")
+            if export_task:
+                export_task.cancel()
+            lag_task.cancel()
+            if manifest_task:
+                manifest_task.cancel()
+                from handlers import cache as cache_module
+                try:
+                    cache_module.etag_manifest.save()
+                except OSError as e:
+                    print(f"Erreur sauvegarde manifeste ETag: {e}")
+            file_watcher.stop_watcher()
+            await fastcgi.stop_pool()
+            io_pool.shutdown_io_pool()
             # Fermer la connexion DB proprement
             try:
-                from handlers import database
                 await database.close_db()
             except:
                 pass
 
+def run_workers(worker_count: int) -> None:
+    """
+    Lance le mode pre-fork : un maître et worker_count workers partageant le port.
+
+    Avec reuse_port (SO_REUSEPORT), chaque worker ouvre sa propre socket et le
+    noyau répartit les connexions ; sinon la socket du maître est héritée.
+
+    Args:
+        worker_count: Nombre de workers
+    """
+    global STATS_DIR, CONFIG
+    host = CONFIG['host']
+    port = CONFIG['port']
+    use_reuse_port = CONFIG.get('reuse_port', True) and reuse_port_supported()
+
+    STATS_DIR = tempfile.mkdtemp(prefix='progsys-stats-')
+    shared_sock = None if use_reuse_port else create_listen_socket(host, port)
+
+    def worker_main(index: int) -> None:
+        sock = shared_sock or create_listen_socket(host, port, reuse_port=True)
+        asyncio.run(serve(sock))
+
+    def on_reload() -> bool:
+        # Les nouveaux workers sont forkés avec la config rechargée
+        global CONFIG
+        previous = CONFIG
+        try:
+            CONFIG = load_config()
+            apply_handler_config()
+        except (SystemExit, Exception) as e:
+            # load_config sort du processus sur une config invalide (erreur
+            # déjà affichée) : le maître garde la config courante
+            if not isinstance(e, SystemExit):
+                print(f"Erreur application config: {e}")
+            CONFIG = previous
+            apply_handler_config()
+            return False
+        return True
+
+    def on_worker_exit(pid: int) -> None:
+        # Un worker disparu ne doit plus compter dans les stats courantes
+        try:
+            os.remove(os.path.join(STATS_DIR, f"{pid}.json"))
+        except OSError:
+            pass
+
+    print(f"Mode multi-processus: {worker_count} workers "
+          f"({'SO_REUSEPORT' if use_reuse_port else 'socket partagée'})")
+    master = PreforkMaster(worker_count, worker_main,
+                           on_reload=on_reload, on_worker_exit=on_worker_exit)
+    try:
+        master.run()
+    finally:
+        shutil.rmtree(STATS_DIR, ignore_errors=True)
+
+def main() -> None:
+    """Fonction principale du serveur."""
+    global CONFIG
+    CONFIG = load_config()
+    apply_handler_config()
+
+    print(f"Serveur HTTP démarré sur {CONFIG['host']}:{CONFIG['port']}")
+    print(f"Document root: {CONFIG['document_root']}")
+    print(f"PHP-CGI: {'activé' if CONFIG.get('enable_php', True) else 'désactivé'}")
+
+    worker_count = CONFIG.get('workers', 1)
+    if worker_count > 1 and hasattr(os, 'fork'):
+        run_workers(worker_count)
+    else:
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            print("Arrêt du serveur...")
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
@@ -1,252 +1,245 @@
 """
 Parser HTTP pour requêtes et réponses
+
+La tête de requête est décodée en une fois depuis le buffer reçu, sans
+perte d'octets ; les noms de headers courants et les méthodes sont résolus
+par des tables précalculées qui renvoient des str internées.
 """
 
+import re
+import sys
 import urllib.parse
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Union
 
+from utils.response import build_response
 
-class HTTPRequest:
-    """Représente une requête HTTP parsée"""
-    
-    def __init__(self):
-        self.method = ""
-        self.path = ""
-        self.query_string = ""
-        self.version = "HTTP/1.1"
-        self.headers = {}
-        self.body = b""
-        self.params = {}
-    
-    def get_path_info(self):
-        """Retourne le path sans query string"""
-        return self.path.split('?')[0] if '?' in self.path else self.path
+# Méthodes et versions connues -> str internée
+_METHODS = {m: sys.intern(m) for m in (
+    'GET', 'HEAD', 'POST', 'PUT', 'DELETE', 'OPTIONS', 'PATCH', 'TRACE', 'CONNECT',
+)}
 
+_VERSIONS = {v: sys.intern(v) for v in ('HTTP/1.1', 'HTTP/1.0')}
 
-def parse_request(raw_request: bytes) -> HTTPRequest:
-    """
-    Parse une requête HTTP complète
-    
-    Args:
-        raw_request: La requête HTTP brute en bytes
-        
-    Returns:
-        HTTPRequest: L'objet requête parsé
-    """
-    request = HTTPRequest()
-    
-    try:
-        # Convertir en string et séparer headers/body
-        request_text = raw_request.decode('utf-8', errors='ignore')
-        if '\r\n\r\n' in request_text:
-            headers_text, body_text = request_text.split('\r\n\r\n', 1)
-            request.body = body_text.encode('utf-8', errors='ignore')
-        else:
-            headers_text = request_text
-            request.body = b""
-        
-        # Parser la ligne de requête
-        lines = headers_text.split('\r\n')
-        if lines:
-            request_line = lines[0].strip()
-            parts = request_line.split(' ')
-            if len(parts) >= 3:
-                request.method = parts[0].upper()
-                full_path = parts[1]
-                request.version = parts[2]
-                
-                # Séparer path et query string
-                if '?' in full_path:
-                    request.path, request.query_string = full_path.split('?', 1)
-                    request.params = urllib.parse.parse_qs(request.query_string)
-                else:
-                    request.path = full_path
-                    request.query_string = ""
-                    request.params = {}
-        
-        # Parser les headers
-        for line in lines[1:]:
-            if ':' in line:
-                key, value = line.split(':', 1)
-                request.headers[key.strip().lower()] = value.strip()
-    
-    except Exception as e:
-        # En cas d'erreur, retourner une requête vide
-        pass
-    
-    return request
-
-
-def parse_headers(headers_text: str) -> Dict[str, str]:
-    """
-    Parse uniquement les headers HTTP
-    
-    Args:
-        headers_text: Texte des headers
-        
-    Returns:
-        Dict[str, str]: Dictionnaire des headers
-    """
-    headers = {}
-    for line in headers_text.split('\r\n'):
-        if ':' in line:
-            key, value = line.split(':', 1)
-            headers[key.strip().lower()] = value.strip()
-    return headers
+# Noms de headers courants, en minuscules
+COMMON_HEADERS = (
+    'host', 'user-agent', 'accept', 'accept-encoding', 'accept-language',
+    'accept-charset', 'connection', 'keep-alive', 'content-length', 'content-type',
+    'transfer-encoding', 'expect', 'cookie', 'authorization', 'cache-control',
+    'pragma', 'referer', 'origin', 'range', 'if-range', 'if-none-match',
+    'if-modified-since', 'if-match', 'if-unmodified-since', 'upgrade',
+    'upgrade-insecure-requests', 'dnt', 'te', 'via', 'forwarded',
+    'x-forwarded-for', 'x-forwarded-proto', 'x-forwarded-host', 'x-real-ip',
+    'x-requested-with', 'sec-fetch-site', 'sec-fetch-mode', 'sec-fetch-dest',
+    'sec-fetch-user', 'sec-ch-ua', 'sec-ch-ua-mobile', 'sec-ch-ua-platform',
+    'priority',
+)
 
 
-def extract_method_path_query(request_line: str) -> Tuple[str, str, str]:
-    """
-    Extrait méthode, path et query string de la ligne de requête
-    
-    Args:
-        request_line: Ligne de requête HTTP (ex: "GET /index.php?user=john HTTP/1.1")
-        
-    Returns:
-        Tuple[str, str, str]: (method, path, query_string)
-    """
-    parts = request_line.strip().split(' ')
-    if len(parts) < 2:
-        return "", "", ""
-    
-    method = parts[0].upper()
-    full_path = parts[1]
-    
-    if '?' in full_path:
-        path, query_string = full_path.split('?', 1)
-    else:
-        path = full_path
-        query_string = ""
-    
-    return method, path, query_string
-
-
-def get_post_body(request: HTTPRequest) -> Dict[str, str]:
+def _name_variants(name: str):
+    """Graphies usuelles d'un nom de header (host, Host, HOST, User-Agent...)."""
+    yield name
+    yield name.upper()
+    yield '-'.join(part.capitalize() for part in name.split('-'))
+    yield name.capitalize()
+
+
+# Nom tel que reçu -> nom en minuscules interné (pas de lower() par requête)
+_HEADER_NAMES: Dict[str, str] = {
+    variant: name
+    for name in map(sys.intern, COMMON_HEADERS)
+    for variant in _name_variants(name)
+}
+
+# Noms inconnus déjà rencontrés (borné : un client ne peut pas le faire grossir sans fin)
+_SEEN_NAMES: Dict[str, str] = {}
+_SEEN_NAMES_MAX = 512
+
+# Headers qui ne peuvent apparaître qu'une fois (délimitation de la requête)
+_SINGLE_HEADERS = frozenset(('host', 'content-length'))
+
+# Nom de header ou méthode valide (token, RFC 9110)
+_TOKEN = re.compile(r"[!#$%&'*+\-.^_`|~0-9A-Za-z]+")
+
+# Espaces optionnels autour d'une valeur (SP, HTAB)
+_OWS = ' \t'
+
+# Caractères de contrôle interdits dans le path décodé (%00 : NUL refusé par os.stat)
+_CONTROL = re.compile(r'[\x00-\x1f\x7f]')
+
+
+class Headers(dict):
     """
-    Extrait les données POST du body
-    
-    Args:
-        request: Objet HTTPRequest
-        
-    Returns:
-        Dict[str, str]: Données POST parsées
+    Headers d'une requête : dict nom (minuscules) -> valeur.
+
+    Un header répété est combiné en une seule valeur (séparée par ", ",
+    ou "; " pour Cookie) ; getlist() retourne les valeurs séparées.
     """
-    if request.method != 'POST' or not request.body:
-        return {}
-    
-    content_type = request.headers.get('content-type', '').lower()
-    
-    if content_type == 'application/x-www-form-urlencoded':
-        body_text = request.body.decode('utf-8', errors='ignore')
-        return urllib.parse.parse_qs(body_text)
-    
-    # Pour d'autres content-types, retourner le body brut
-    return {'raw_body': request.body.decode('utf-8', errors='ignore')}
-class HttpRequest:
-    def __init__(self, method, path, query, version, headers, body):
+
+    # Valeurs des headers répétés, créé seulement si besoin
+    _repeated: Optional[Dict[str, List[str]]] = None
+
+    def add(self, name: str, value: str) -> None:
+        """
+        Ajoute une valeur, en la combinant avec une valeur existante.
+
+        Args:
+            name: Nom en minuscules
+            value: Valeur
+        """
+        previous = self.get(name)
+        if previous is None:
+            self[name] = value
+            return
+        if self._repeated is None:
+            self._repeated = {}
+        self._repeated.setdefault(name, [previous]).append(value)
+        self[name] = f"{previous}{'; ' if name == 'cookie' else ', '}{value}"
+
+    def getlist(self, name: str) -> List[str]:
+        """
+        Retourne toutes les valeurs reçues pour un header.
+
+        Args:
+            name: Nom en minuscules
+
+        Returns:
+            List[str]: Valeurs dans l'ordre de réception (vide si absent)
+        """
+        if self._repeated is not None and name in self._repeated:
+            return list(self._repeated[name])
+        value = self.get(name)
+        return [] if value is None else [value]
+
+
+class HTTPRequest:
+    """Représente une requête HTTP parsée (ligne de requête et headers)"""
+
+    __slots__ = ('method', 'target', 'path', 'query_string', 'version', 'headers')
+
+    def __init__(self, method: str, target: str, path: str, query_string: str,
+                 version: str, headers: Headers):
         self.method = method
+        # Cible brute (ex: /index.php?user=john), pour les logs
+        self.target = target
+        # Path décodé, sans query string
         self.path = path
-        self.query = query
+        # Query string brute (non décodée, transmise telle quelle à PHP)
+        self.query_string = query_string
         self.version = version
         self.headers = headers
-        self.body = body
-from typing import Dict, Tuple, Optional
 
-def parse_http_request(data: bytes) -> Tuple[str, str, str, Dict[str, str], str]:
-    """
-    Parse une requête HTTP brute en bytes.
+    def get_path_info(self) -> str:
+        """Retourne le path sans query string"""
+        return self.path
 
-    Args:
-        data: Les données brutes de la requête HTTP
+    @property
+    def params(self) -> Dict[str, str]:
+        """Paramètres de la query string, décodés"""
+        return parse_query_string(self.query_string)
 
-    Returns:
-        Tuple: (method, path, version, headers, body)
 
-    Raises:
-        ValueError: Si la requête est malformée
+def _header_name(raw: str) -> str:
     """
-    try:
-        # Convertir en string
-        text = data.decode('utf-8', errors='ignore')
-
-        # Séparer headers et body
-        header_part, _, body = text.partition('\r\n\r\n')
-
-        # Parser la ligne de requête
-        lines = header_part.split('\r\n')
-        if not lines:
-            raise ValueError("Requête vide")
+    Retourne le nom d'un header absent de la table des noms courants, en minuscules.
 
-        request_line = lines[0]
-        parts = request_line.split()
-        if len(parts) != 3:
-            raise ValueError(f"Ligne de requête invalide: {request_line}")
+    Raises:
+        ValueError: Si le nom n'est pas un token valide
+    """
+    name = _SEEN_NAMES.get(raw)
+    if name is not None:
+        return name
+    if not _TOKEN.fullmatch(raw):
+        # Inclut l'espace avant ':' (interdit : risque de request smuggling)
+        raise ValueError(f"Nom de header invalide: {raw[:32]!r}")
+    name = sys.intern(raw.lower())
+    if len(_SEEN_NAMES) < _SEEN_NAMES_MAX:
+        _SEEN_NAMES[raw] = name
+    return name
+
+
+def parse_http_request(data: Union[bytes, bytearray, memoryview]) -> HTTPRequest:
+    """
+    Parse la tête d'une requête HTTP (ligne de requête et headers).
 
-        method, raw_path, version = parts
+    La tête est décodée en une fois depuis le buffer (un memoryview n'est
+    pas copié), en UTF-8 avec surrogateescape : aucun octet n'est perdu et
+    les valeurs sont retransmises telles quelles à PHP. Les noms de headers
+    courants et les méthodes sont résolus par des tables de str internées.
 
-        # Décoder l'URL (déchiffrer les URLs)
-        path = urllib.parse.unquote(raw_path)
+    Args:
+        data: Tête de la requête, jusqu'à la ligne vide incluse ou non
 
-        # Parser les headers
-        headers = {}
-        for line in lines[1:]:
-            if ': ' in line:
-                key, value = line.split(': ', 1)
-                headers[key.lower()] = value  # Normaliser en minuscules
+    Returns:
+        HTTPRequest: La requête parsée
 
-        return method, path, version, headers, body
+    Raises:
+        ValueError: Si la requête est malformée
+    """
+    lines = str(data, 'utf-8', 'surrogateescape').split('\r\n')
+
+    # Ligne de requête : méthode, cible, version
+    parts = lines[0].split()
+    if len(parts) != 3:
+        raise ValueError(f"Ligne de requête invalide: {lines[0][:64]!r}")
+    method, target, version = parts
+
+    method = _METHODS.get(method) or method
+    if method not in _METHODS and not _TOKEN.fullmatch(method):
+        raise ValueError(f"Méthode invalide: {method[:16]!r}")
+    version = _VERSIONS.get(version) or version
+    if version not in _VERSIONS and not version.startswith('HTTP/'):
+        raise ValueError(f"Version invalide: {version[:16]!r}")
+
+    if not target.isascii():
+        # Octets bruts non UTF-8 dans l'URL : remplacés (le path sert à ouvrir des fichiers)
+        target = target.encode('utf-8', 'surrogateescape').decode('utf-8', 'replace')
+    path, _, query_string = target.partition('?')
+    if '%' in path:
+        path = urllib.parse.unquote(path)
+    if not path.isprintable() and _CONTROL.search(path):
+        raise ValueError(f"Caractère de contrôle dans le path: {path[:64]!r}")
+
+    # Headers : une ligne "Nom: valeur" jusqu'à la ligne vide
+    headers = Headers()
+    names = _HEADER_NAMES
+    for index in range(1, len(lines)):
+        line = lines[index]
+        if not line:
+            break
+        raw_name, colon, value = line.partition(':')
+        if not colon:
+            # Ligne sans ':' ou continuation obsolète (obs-fold) : refusée
+            raise ValueError(f"Ligne de header invalide: {line[:32]!r}")
+        name = names.get(raw_name) or _header_name(raw_name)
+        value = value.strip(_OWS)
+        if name in headers:
+            # Header répété
+            if name in _SINGLE_HEADERS:
+                raise ValueError(f"Header {name} répété")
+            headers.add(name, value)
+        else:
+            headers[name] = value
 
-    except Exception as e:
-        raise ValueError(f"Erreur de parsing HTTP: {e}")
+    return HTTPRequest(method, target, path, query_string, version, headers)
 
 def build_http_response(status_code: int, body: str = "", content_type: str = "text/plain",
-                       extra_headers: Optional[Dict[str, str]] = None) -> bytes:
+                       extra_headers: Optional[Dict[str, str]] = None,
+                       keep_alive: bool = False) -> bytes:
     """
-    Construit une réponse HTTP.
+    Construit une réponse HTTP complète (voir utils/response.py pour les buffers séparés).
 
     Args:
         status_code: Code de statut HTTP
         body: Corps de la réponse
         content_type: Type de contenu
         extra_headers: Headers supplémentaires
+        keep_alive: True pour garder la connexion ouverte après la réponse
 
     Returns:
         bytes: Réponse HTTP encodée
     """
-    # Codes de statut
-    status_messages = {
-        200: "OK",
-        301: "Moved Permanently",
-        302: "Found",
-        304: "Not Modified",
-        400: "Bad Request",
-        404: "Not Found",
-        405: "Method Not Allowed",
-        500: "Internal Server Error",
-    }
-
-    reason = status_messages.get(status_code, "OK")
-
-    # Headers de base
-    headers = {
-        "Content-Type": content_type,
-        "Content-Length": str(len(body.encode('utf-8'))),
-        "Connection": "close",
-    }
-
-    # Ajouter headers supplémentaires
-    if extra_headers:
-        headers.update(extra_headers)
-
-    # Construire la réponse
-    response_lines = [f"HTTP/1.1 {status_code} {reason}"]
-    for key, value in headers.items():
-        response_lines.append(f"{key}: {value}")
-    response_lines.append("")  # Ligne vide
-    response_lines.append(body)
-
-    response = '\r\n'.join(response_lines)
-    return response.encode('utf-8')
+    return b''.join(build_response(status_code, body.encode('utf-8'), content_type,
+                                   extra_headers, keep_alive))
 
 def parse_query_string(query_string: str) -> Dict[str, str]:
     """
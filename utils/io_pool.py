@@ -0,0 +1,96 @@
+"""
+Pool de threads dédié aux accès disque (lecture, stat, listing) et au
+hashing : la boucle asyncio ne se bloque jamais sur un disque lent.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Configuration (surchargée par "io_threads" dans config.json)
+IO_CONFIG = {
+    'threads': 8,
+}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+_stats = {
+    'tasks': 0,         # Opérations soumises
+    'active': 0,        # En cours d'exécution dans un thread
+    'queued': 0,        # En attente d'un thread libre
+    'max_queued': 0,
+}
+
+
+def configure_io_pool(threads: int) -> None:
+    """
+    Fixe la taille du pool (recréé au prochain appel de run_io).
+
+    Args:
+        threads: Nombre de threads
+    """
+    shutdown_io_pool()
+    IO_CONFIG['threads'] = max(1, int(threads))
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Retourne le pool, créé à la première utilisation."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=IO_CONFIG['threads'], thread_name_prefix='io')
+    return _executor
+
+
+def shutdown_io_pool() -> None:
+    """Arrête le pool (les opérations en cours se terminent)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def _run_tracked(func: Callable, args: tuple) -> Any:
+    """Exécute func dans un thread du pool en tenant les compteurs à jour."""
+    with _lock:
+        _stats['queued'] -= 1
+        _stats['active'] += 1
+    try:
+        return func(*args)
+    finally:
+        with _lock:
+            _stats['active'] -= 1
+
+
+def _forget_cancelled(future: Future) -> None:
+    """Opération annulée avant d'avoir obtenu un thread (client déconnecté)."""
+    if future.cancelled():
+        with _lock:
+            _stats['queued'] -= 1
+
+
+async def run_io(func: Callable, *args) -> Any:
+    """
+    Exécute une fonction bloquante (accès disque, hash) dans le pool.
+
+    Args:
+        func: Fonction à exécuter
+        args: Ses arguments
+
+    Returns:
+        Le résultat de func (ses exceptions sont propagées)
+    """
+    with _lock:
+        _stats['tasks'] += 1
+        _stats['queued'] += 1
+        _stats['max_queued'] = max(_stats['max_queued'], _stats['queued'])
+    future = get_executor().submit(_run_tracked, func, args)
+    # Une opération annulée en file ne passe jamais par _run_tracked
+    future.add_done_callback(_forget_cancelled)
+    return await asyncio.wrap_future(future)
+
+
+def get_stats() -> Dict:
+    """Retourne les statistiques du pool."""
+    with _lock:
+        return {**_stats, 'threads': IO_CONFIG['threads']}
@@ -0,0 +1,175 @@
+"""
+Mode multi-processus (pre-fork) : un processus maître supervise N workers
+qui partagent le même port d'écoute.
+"""
+
+import os
+import signal
+import socket
+import time
+from typing import Callable, Dict, Optional
+
+# Délai minimal de vie d'un worker avant de le considérer en crash-loop
+MIN_WORKER_LIFETIME = 1.0
+
+
+def create_listen_socket(host: str, port: int, reuse_port: bool = False,
+                         backlog: int = 1024) -> socket.socket:
+    """
+    Crée une socket TCP en écoute.
+
+    Args:
+        host: Adresse d'écoute
+        port: Port d'écoute
+        reuse_port: Active SO_REUSEPORT (chaque worker a sa propre socket)
+        backlog: Taille de la file d'attente des connexions
+
+    Returns:
+        socket.socket: Socket en écoute, non bloquante
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.setblocking(False)
+    return sock
+
+
+def reuse_port_supported() -> bool:
+    """Indique si SO_REUSEPORT est disponible sur cette plateforme."""
+    return hasattr(socket, 'SO_REUSEPORT')
+
+
+class PreforkMaster:
+    """
+    Processus maître : lance les workers, les redémarre en cas de crash et
+    leur transmet SIGTERM (arrêt) et SIGHUP (redémarrage progressif).
+    """
+
+    def __init__(self, worker_count: int, worker_main: Callable[[int], None],
+                 on_reload: Optional[Callable[[], bool]] = None,
+                 on_worker_exit: Optional[Callable[[int], None]] = None):
+        """
+        Initialise le maître.
+
+        Args:
+            worker_count: Nombre de workers à maintenir
+            worker_main: Fonction exécutée dans chaque worker (reçoit l'index du worker)
+            on_reload: Appelée dans le maître à la réception de SIGHUP ; si elle
+                       retourne False, les workers ne sont pas redémarrés
+            on_worker_exit: Appelée dans le maître avec le pid d'un worker terminé
+        """
+        self.worker_count = worker_count
+        self.worker_main = worker_main
+        self.on_reload = on_reload
+        self.on_worker_exit = on_worker_exit
+
+        # pid -> (index du worker, timestamp de démarrage)
+        self.workers: Dict[int, tuple] = {}
+        self.running = True
+        self.reload_requested = False
+
+    def spawn_worker(self, index: int) -> int:
+        """
+        Fork un nouveau worker.
+
+        Args:
+            index: Index du worker (0..worker_count-1)
+
+        Returns:
+            int: PID du worker
+        """
+        pid = os.fork()
+        if pid == 0:
+            # Processus fils : signaux par défaut, puis boucle du worker
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGHUP, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            exit_code = 0
+            try:
+                self.worker_main(index)
+            except Exception as e:
+                print(f"Worker {os.getpid()} : erreur fatale {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+
+        self.workers[pid] = (index, time.time())
+        print(f"Worker {index} démarré (pid {pid})")
+        return pid
+
+    def _handle_term(self, signum, frame) -> None:
+        """Arrêt demandé (SIGTERM/SIGINT)."""
+        self.running = False
+
+    def _handle_hup(self, signum, frame) -> None:
+        """Redémarrage progressif demandé (SIGHUP)."""
+        self.reload_requested = True
+
+    def broadcast(self, signum: int) -> None:
+        """Envoie un signal à tous les workers vivants."""
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _reap(self) -> None:
+        """Récupère les workers terminés et les redémarre si nécessaire."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+            index, started = self.workers.pop(pid, (None, 0))
+            if index is None:
+                continue
+            if self.on_worker_exit:
+                self.on_worker_exit(pid)
+
+            if not self.running:
+                continue
+
+            code = os.waitstatus_to_exitcode(status)
+            if code != 0:
+                print(f"Worker {index} (pid {pid}) terminé avec le code {code}, redémarrage")
+            # Éviter de forker en boucle un worker qui crashe au démarrage
+            if time.time() - started < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            self.spawn_worker(index)
+
+    def run(self) -> None:
+        """Boucle de supervision du maître (bloquante)."""
+        signal.signal(signal.SIGTERM, self._handle_term)
+        signal.signal(signal.SIGINT, self._handle_term)
+        signal.signal(signal.SIGHUP, self._handle_hup)
+
+        for index in range(self.worker_count):
+            self.spawn_worker(index)
+
+        while self.running:
+            if self.reload_requested:
+                self.reload_requested = False
+                print("SIGHUP reçu : redémarrage des workers")
+                if self.on_reload and not self.on_reload():
+                    print("Rechargement annulé : configuration et workers actuels conservés")
+                else:
+                    # Les workers s'arrêtent proprement et sont reforkés par _reap
+                    self.broadcast(signal.SIGTERM)
+            self._reap()
+            time.sleep(0.2)
+
+        print("Arrêt des workers...")
+        self.broadcast(signal.SIGTERM)
+        deadline = time.time() + 10
+        while self.workers and time.time() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        # Workers bloqués : arrêt forcé
+        self.broadcast(signal.SIGKILL)
+        self._reap()
@@ -0,0 +1,259 @@
+"""
+Corps des requêtes HTTP, lu à la demande : Content-Length ou
+Transfer-Encoding: chunked, streamé tel quel (ex: vers le stdin de PHP) ou
+mis de côté en mémoire puis dans un fichier temporaire au-delà d'un seuil.
+"""
+
+import asyncio
+import tempfile
+from typing import AsyncIterator, Optional
+
+from utils.io_pool import run_io
+
+# Taille des lectures sur la connexion et dans le fichier temporaire
+BODY_READ_SIZE = 64 * 1024
+
+# Body non lu par le handler : au-delà, la connexion est fermée plutôt que vidée
+MAX_DISCARD = 64 * 1024
+
+HEX_DIGITS = b'0123456789abcdefABCDEF'
+
+# Taille maximale de la section trailers d'un body chunked (ignorée mais lue)
+MAX_TRAILER_SIZE = 16 * 1024
+
+
+class RequestBodyError(ValueError):
+    """Body chunked mal formé (réponse 400)."""
+
+
+class RequestBodyTooLarge(Exception):
+    """Body plus grand que max_body_size (réponse 413)."""
+
+
+class UnreadBodyError(ConnectionError):
+    """Body non consommé et trop gros pour être vidé : la connexion doit être fermée."""
+
+
+async def iter_chunked(reader: asyncio.StreamReader, max_size: int) -> AsyncIterator[bytes]:
+    """
+    Décode un body Transfer-Encoding: chunked au fil de l'eau.
+
+    Args:
+        reader: Connexion positionnée au début du body
+        max_size: Taille décodée maximale
+
+    Yields:
+        bytes: Morceaux de données décodées
+
+    Raises:
+        RequestBodyError: Taille de chunk, séparateur ou trailers invalides
+        RequestBodyTooLarge: Si max_size est dépassé
+        asyncio.IncompleteReadError: Si le client ferme la connexion
+    """
+    total = 0
+    while True:
+        try:
+            line = await reader.readuntil(b'\r\n')
+        except asyncio.LimitOverrunError:
+            raise RequestBodyError("ligne de taille de chunk trop longue")
+        # Les extensions (;nom=valeur) sont ignorées
+        size_field = line[:-2].split(b';', 1)[0].strip()
+        if not size_field or size_field.strip(HEX_DIGITS):
+            raise RequestBodyError(f"taille de chunk invalide: {size_field[:16]!r}")
+        size = int(size_field, 16)
+
+        if size == 0:
+            # Trailers ignorés jusqu'à la ligne vide finale
+            trailer_size = 0
+            while True:
+                try:
+                    line = await reader.readuntil(b'\r\n')
+                except asyncio.LimitOverrunError:
+                    raise RequestBodyError("ligne de trailer trop longue")
+                if line == b'\r\n':
+                    return
+                trailer_size += len(line)
+                if trailer_size > MAX_TRAILER_SIZE:
+                    raise RequestBodyError(f"trailers de plus de {MAX_TRAILER_SIZE} octets")
+
+        total += size
+        if total > max_size:
+            raise RequestBodyTooLarge(f"body chunked de plus de {max_size} octets")
+
+        remaining = size
+        while remaining:
+            data = await reader.read(min(remaining, BODY_READ_SIZE))
+            if not data:
+                raise asyncio.IncompleteReadError(b'', remaining)
+            remaining -= len(data)
+            yield data
+        if await reader.readexactly(2) != b'\r\n':
+            raise RequestBodyError("chunk non terminé par CRLF")
+
+
+class RequestBody:
+    """
+    Corps d'une requête, lu seulement quand un handler en a besoin :
+    - read() : tout en mémoire (API SQL, petits formulaires)
+    - spool() : mis de côté (mémoire puis fichier temporaire) pour connaître sa taille
+    - chunks() : parcouru par morceaux, directement depuis la connexion si
+      rien n'a été mis de côté (upload streamé vers PHP)
+    """
+
+    def __init__(self, reader: Optional[asyncio.StreamReader] = None, length: int = 0,
+                 chunked: bool = False, max_size: int = 10 * 1024 * 1024,
+                 spill_threshold: int = 1024 * 1024,
+                 writer: Optional[asyncio.StreamWriter] = None, expect_continue: bool = False):
+        """
+        Args:
+            reader: Connexion du client
+            length: Content-Length (ignoré si chunked)
+            chunked: Body en Transfer-Encoding: chunked
+            max_size: Taille maximale d'un body chunked
+            spill_threshold: Au-delà, spool() écrit dans un fichier temporaire
+            writer: Connexion en écriture (pour « 100 Continue »)
+            expect_continue: Le client attend « 100 Continue » avant d'envoyer le body
+        """
+        self.reader = reader
+        self.chunked = chunked
+        # Taille totale, inconnue (None) pour un body chunked pas encore mis de côté
+        self.length: Optional[int] = None if chunked else length
+        self.remaining = 0 if chunked else length
+        self.max_size = max_size
+        self.spill_threshold = spill_threshold
+        self.writer = writer
+        self.expect_continue = expect_continue
+        self.data: Optional[bytes] = None
+        self.file = None
+        # True quand tout le body a été lu sur la connexion
+        self.consumed = not chunked and length == 0
+        self.failed = False
+        self._source: Optional[AsyncIterator[bytes]] = None
+
+    def __len__(self) -> int:
+        """Taille du body (connue après spool() pour un body chunked)."""
+        return self.length or 0
+
+    async def _read_source(self) -> AsyncIterator[bytes]:
+        """Lit le body sur la connexion (une seule fois)."""
+        if self.expect_continue and self.writer is not None:
+            self.writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+            await self.writer.drain()
+        try:
+            if self.chunked:
+                async for data in iter_chunked(self.reader, self.max_size):
+                    yield data
+            else:
+                while self.remaining:
+                    data = await self.reader.read(min(self.remaining, BODY_READ_SIZE))
+                    if not data:
+                        raise asyncio.IncompleteReadError(b'', self.remaining)
+                    self.remaining -= len(data)
+                    yield data
+        except BaseException:
+            # Position dans le flux inconnue : la connexion n'est plus réutilisable
+            self.failed = True
+            raise
+        self.consumed = True
+
+    def _connection_chunks(self) -> AsyncIterator[bytes]:
+        if self._source is None:
+            self._source = self._read_source()
+        return self._source
+
+    async def spool(self) -> None:
+        """
+        Lit tout le body et le garde en mémoire, ou dans un fichier temporaire
+        au-delà de spill_threshold (la taille devient connue).
+
+        Raises:
+            RequestBodyError, RequestBodyTooLarge: Body chunked invalide ou trop gros
+        """
+        if self.consumed or self.data is not None or self.file is not None:
+            return
+        buffered = bytearray()
+        size = 0
+        async for data in self._connection_chunks():
+            size += len(data)
+            if self.file is not None:
+                await run_io(self.file.write, data)
+                continue
+            buffered += data
+            if len(buffered) > self.spill_threshold:
+                self.file = await run_io(tempfile.TemporaryFile)
+                await run_io(self.file.write, bytes(buffered))
+                buffered = bytearray()
+        if self.file is None:
+            self.data = bytes(buffered)
+        self.length = size
+
+    async def read(self) -> bytes:
+        """
+        Retourne tout le body en mémoire.
+
+        Returns:
+            bytes: Contenu du body
+        """
+        if self.data is None:
+            if self.file is None:
+                await self.spool()
+            if self.file is not None:
+                await run_io(self.file.seek, 0)
+                self.data = await run_io(self.file.read)
+            elif self.data is None:
+                self.data = b''
+        return self.data
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """
+        Parcourt le body par morceaux : depuis la mémoire, le fichier
+        temporaire, ou directement depuis la connexion s'il n'a pas été mis de côté.
+
+        Yields:
+            bytes: Morceaux du body
+        """
+        if self.data is not None:
+            if self.data:
+                yield self.data
+        elif self.file is not None:
+            await run_io(self.file.seek, 0)
+            while True:
+                data = await run_io(self.file.read, BODY_READ_SIZE)
+                if not data:
+                    break
+                yield data
+        elif not self.consumed:
+            async for data in self._connection_chunks():
+                yield data
+
+    async def discard(self) -> None:
+        """
+        Vide le reste du body non lu par le handler, pour que la requête
+        suivante puisse être lue sur la même connexion.
+
+        Raises:
+            UnreadBodyError: Body trop gros ou mal formé, ou flux dans un état inconnu
+        """
+        if self.consumed:
+            return
+        if self.failed or (not self.chunked and self.remaining > MAX_DISCARD):
+            raise UnreadBodyError("body non lu : fermeture de la connexion")
+        if self.expect_continue and self._source is None:
+            # Pas de « 100 Continue » envoyé : le client peut envoyer le body
+            # ou y renoncer, seule la fermeture lève l'ambiguïté
+            raise UnreadBodyError("body attendu (Expect: 100-continue) non lu : fermeture de la connexion")
+        discarded = 0
+        try:
+            async for data in self._connection_chunks():
+                discarded += len(data)
+                if discarded > MAX_DISCARD:
+                    raise UnreadBodyError("body non lu : fermeture de la connexion")
+        except (RequestBodyError, RequestBodyTooLarge) as e:
+            # Réponse déjà envoyée : seule la fermeture reste possible
+            raise UnreadBodyError(f"body non lu invalide ({e}) : fermeture de la connexion") from None
+
+    def close(self) -> None:
+        """Supprime le fichier temporaire éventuel."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,183 @@
+"""
+Construction des réponses HTTP.
+
+Le début de l'en-tête (ligne de statut, Content-Type, Cache-Control,
+Connection) est précalculé une fois par combinaison ; seuls Content-Length
+et les headers propres à la réponse sont formatés à chaque requête. Le
+corps n'est jamais concaténé à l'en-tête : les deux buffers sont passés
+ensemble à writer.writelines().
+"""
+
+import asyncio
+from http import HTTPStatus
+from typing import Dict, List, Optional, Tuple
+
+STATUS_MESSAGES = {
+    100: "Continue",
+    200: "OK",
+    206: "Partial Content",
+    301: "Moved Permanently",
+    302: "Found",
+    303: "See Other",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    416: "Range Not Satisfiable",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    501: "Not Implemented",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+# Statuts sans corps : pas de Content-Length (RFC 9110, 8.6)
+NO_CONTENT_LENGTH = frozenset((100, 101, 204, 304))
+
+
+def reason_phrase(status: int) -> str:
+    """Message d'un code de statut (celui de http.HTTPStatus si absent de STATUS_MESSAGES)."""
+    message = STATUS_MESSAGES.get(status)
+    if message is None:
+        try:
+            message = HTTPStatus(status).phrase
+        except ValueError:
+            message = "Unknown"
+    return message
+
+
+# Headers intégrés au préfixe précalculé (ignorés dans les headers propres à la réponse)
+PREFIX_HEADERS = frozenset(('Content-Type', 'content-type', 'Cache-Control', 'cache-control'))
+
+# (statut, Content-Type, Cache-Control, keep-alive) -> préfixe encodé
+_prefixes: Dict[Tuple[int, Optional[str], Optional[str], bool], bytes] = {}
+
+# Borne du cache de préfixes (Content-Type et Cache-Control peuvent venir de PHP)
+MAX_PREFIXES = 256
+
+
+def response_prefix(status: int, content_type: Optional[str] = None,
+                    cache_control: Optional[str] = None, keep_alive: bool = False) -> bytes:
+    """
+    Retourne la ligne de statut et les headers fixes d'une réponse.
+
+    Args:
+        status: Code de statut HTTP
+        content_type: Type de contenu (None = pas de Content-Type)
+        cache_control: Politique de cache (None = pas de Cache-Control)
+        keep_alive: True pour garder la connexion ouverte après la réponse
+
+    Returns:
+        bytes: Préfixe encodé, sans la ligne vide finale
+    """
+    key = (status, content_type, cache_control, keep_alive)
+    prefix = _prefixes.get(key)
+    if prefix is None:
+        lines = f"HTTP/1.1 {status} {reason_phrase(status)}\r\n"
+        if content_type:
+            lines += f"Content-Type: {content_type}\r\n"
+        if cache_control:
+            lines += f"Cache-Control: {cache_control}\r\n"
+        lines += "Connection: keep-alive\r\n" if keep_alive else "Connection: close\r\n"
+        prefix = lines.encode('utf-8', 'surrogateescape')
+        if len(_prefixes) < MAX_PREFIXES:
+            _prefixes[key] = prefix
+    return prefix
+
+
+def response_head(status: int, content_type: Optional[str] = None,
+                  headers: Optional[Dict[str, str]] = None,
+                  content_length: Optional[int] = None, keep_alive: bool = False,
+                  cache_control: Optional[str] = None) -> bytes:
+    """
+    Construit l'en-tête complet d'une réponse.
+
+    Content-Type et Cache-Control présents dans headers sont utilisés pour
+    le préfixe précalculé s'ils ne sont pas passés explicitement.
+
+    Args:
+        status: Code de statut HTTP
+        content_type: Type de contenu
+        headers: Headers propres à la réponse (ETag, Location...)
+        content_length: Taille du corps (None = pas de Content-Length, ignorée
+                        pour 1xx, 204 et 304)
+        keep_alive: True pour garder la connexion ouverte après la réponse
+        cache_control: Politique de cache
+
+    Returns:
+        bytes: En-tête terminé par la ligne vide
+    """
+    lines = ''
+    if headers:
+        if content_type is None:
+            content_type = headers.get('Content-Type') or headers.get('content-type')
+        if cache_control is None:
+            cache_control = headers.get('Cache-Control') or headers.get('cache-control')
+        for name, value in headers.items():
+            if name not in PREFIX_HEADERS:
+                lines += f"{name}: {value}\r\n"
+
+    prefix = response_prefix(status, content_type, cache_control, keep_alive)
+    if content_length is not None and status not in NO_CONTENT_LENGTH:
+        lines = f"Content-Length: {content_length}\r\n" + lines
+    if not lines:
+        return prefix + b'\r\n'
+    return prefix + lines.encode('utf-8', 'surrogateescape') + b'\r\n'
+
+
+def build_response(status: int, body: bytes = b'', content_type: Optional[str] = None,
+                   headers: Optional[Dict[str, str]] = None, keep_alive: bool = False,
+                   cache_control: Optional[str] = None,
+                   content_length: Optional[int] = None) -> List[bytes]:
+    """
+    Construit une réponse sous forme de buffers à envoyer avec writelines().
+
+    Args:
+        status: Code de statut HTTP
+        body: Corps de la réponse (jamais recopié)
+        content_type: Type de contenu
+        headers: Headers propres à la réponse
+        keep_alive: True pour garder la connexion ouverte après la réponse
+        cache_control: Politique de cache
+        content_length: Taille annoncée si le corps est envoyé à part (fichier sur disque)
+
+    Returns:
+        List[bytes]: [en-tête, corps] ou [en-tête]
+    """
+    if content_length is None:
+        content_length = len(body)
+    head = response_head(status, content_type, headers, content_length, keep_alive, cache_control)
+    return [head, body] if body else [head]
+
+
+def error_response(status: int, keep_alive: bool = False,
+                   headers: Optional[Dict[str, str]] = None,
+                   message: Optional[str] = None) -> List[bytes]:
+    """
+    Construit une réponse d'erreur en texte brut.
+
+    Args:
+        status: Code de statut HTTP
+        keep_alive: True pour garder la connexion ouverte après la réponse
+        headers: Headers supplémentaires (ex: Retry-After)
+        message: Corps (par défaut le message du statut)
+
+    Returns:
+        List[bytes]: Buffers de la réponse
+    """
+    text = message if message is not None else reason_phrase(status)
+    return build_response(status, text.encode('utf-8'), 'text/plain', headers, keep_alive)
+
+
+def write_response(writer: asyncio.StreamWriter, response: List[bytes],
+                   head_only: bool = False) -> None:
+    """
+    Envoie les buffers d'une réponse en un seul appel (sans les concaténer).
+
+    Args:
+        writer: Flux d'écriture vers le client
+        response: Buffers retournés par build_response()
+        head_only: True pour une requête HEAD (en-tête seul, Content-Length conservé)
+    """
+    writer.writelines(response[:1] if head_only else response)
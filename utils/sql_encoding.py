@@ -0,0 +1,166 @@
+"""
+Encodage JSON des résultats SQL.
+
+Les convertisseurs sont choisis une fois par colonne d'après le type MySQL
+(cursor.description), puis appliqués colonne par colonne : les colonnes
+déjà sérialisables (entiers, flottants, texte) ne sont pas parcourues.
+Le JSON est produit par orjson s'il est installé, par le module json sinon.
+"""
+
+import base64
+import datetime
+import json
+from typing import Any, Callable, List, Optional, Sequence
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Codes de type MySQL (pymysql.constants.FIELD_TYPE)
+DECIMAL = 0
+TIMESTAMP = 7
+DATE = 10
+TIME = 11
+DATETIME = 12
+NEWDATE = 14
+VARCHAR = 15
+BIT = 16
+NEWDECIMAL = 246
+TINY_BLOB = 249
+MEDIUM_BLOB = 250
+LONG_BLOB = 251
+BLOB = 252
+VAR_STRING = 253
+STRING = 254
+GEOMETRY = 255
+
+# Colonnes texte ou binaires : bytes si la collation est binaire, str sinon
+BINARY_CAPABLE = frozenset((VARCHAR, TINY_BLOB, MEDIUM_BLOB, LONG_BLOB, BLOB, VAR_STRING, STRING, GEOMETRY))
+
+
+def format_time(value: Any) -> str:
+    """
+    Formate une colonne TIME (timedelta, éventuellement négative ou > 24 h)
+    comme MySQL : '-838:59:59', '12:30:00.250000'.
+
+    Args:
+        value: timedelta (ou str pour une valeur invalide renvoyée telle quelle)
+
+    Returns:
+        str: Durée au format [-]HH:MM:SS[.ffffff]
+    """
+    if not isinstance(value, datetime.timedelta):
+        return str(value)
+    micros = (value.days * 86400 + value.seconds) * 1_000_000 + value.microseconds
+    sign = '-' if micros < 0 else ''
+    seconds, micros = divmod(abs(micros), 1_000_000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    text = f"{sign}{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{text}.{micros:06d}" if micros else text
+
+
+def format_bytes(value: Any) -> str:
+    """Colonne binaire (BLOB, VARBINARY...) : base64."""
+    return base64.b64encode(value).decode('ascii') if isinstance(value, bytes) else value
+
+
+def format_bit(value: Any) -> Any:
+    """Colonne BIT : entier."""
+    return int.from_bytes(value, 'big') if isinstance(value, bytes) else value
+
+
+# Type MySQL -> convertisseur (str() garde aussi les dates invalides '0000-00-00' renvoyées en texte)
+CONVERTERS = {
+    DECIMAL: str,           # Decimal -> '12.50' (sans perte de précision)
+    NEWDECIMAL: str,
+    DATE: str,              # '2024-01-31'
+    NEWDATE: str,
+    DATETIME: str,          # '2024-01-31 10:00:00'
+    TIMESTAMP: str,
+    TIME: format_time,
+    BIT: format_bit,
+}
+
+
+def column_converters(description: Optional[Sequence[Sequence]],
+                      rows: Sequence[Sequence] = ()) -> List[Optional[Callable]]:
+    """
+    Choisit le convertisseur de chaque colonne.
+
+    Les colonnes texte ne sont converties que si elles contiennent des bytes
+    (collation binaire) : la première valeur non NULL des lignes fournies
+    en décide.
+
+    Args:
+        description: cursor.description
+        rows: Lignes du résultat (ou d'un premier lot)
+
+    Returns:
+        List: Convertisseur par colonne (None = valeur déjà sérialisable)
+    """
+    converters = []
+    for index, column in enumerate(description or ()):
+        type_code = column[1]
+        converter = CONVERTERS.get(type_code)
+        if converter is None and type_code in BINARY_CAPABLE:
+            sample = next((row[index] for row in rows if row[index] is not None), None)
+            if isinstance(sample, bytes):
+                converter = format_bytes
+        converters.append(converter)
+    return converters
+
+
+def convert_rows(rows: Sequence[Sequence], converters: List[Optional[Callable]]) -> List[Sequence]:
+    """
+    Applique les convertisseurs aux lignes.
+
+    Args:
+        rows: Lignes (tuples) retournées par le curseur
+        converters: Résultat de column_converters()
+
+    Returns:
+        List: Lignes sérialisables (les tuples d'origine si rien n'est à convertir)
+    """
+    if not rows or not any(converters):
+        return rows if isinstance(rows, list) else list(rows)
+    # Transposition (zip en C) : chaque convertisseur ne parcourt que sa colonne
+    columns = list(zip(*rows))
+    for index, converter in enumerate(converters):
+        if converter is not None:
+            columns[index] = [None if value is None else converter(value) for value in columns[index]]
+    return list(zip(*columns))
+
+
+if orjson is not None:
+    def dumps(obj: Any) -> bytes:
+        """
+        Encode en JSON (orjson).
+
+        Args:
+            obj: Valeur à encoder (les types inconnus sont convertis avec str)
+
+        Returns:
+            bytes: JSON UTF-8
+        """
+        return orjson.dumps(obj, default=str)
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str)
+
+    def dumps(obj: Any) -> bytes:
+        """
+        Encode en JSON (module json).
+
+        Args:
+            obj: Valeur à encoder (les types inconnus sont convertis avec str)
+
+        Returns:
+            bytes: JSON UTF-8
+        """
+        return _encoder.encode(obj).encode('utf-8')
+
+
+def json_backend() -> str:
+    """Nom du moteur JSON utilisé ('orjson' ou 'json')."""
+    return 'orjson' if orjson is not None else 'json'